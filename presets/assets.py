@@ -0,0 +1,28 @@
+# presets/assets.py
+from functools import lru_cache
+
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+# Third-party front-end libraries, pinned. `python manage.py fetch_vendor_assets`
+# copies them under static/vendor/ so they are served (hashed and precompressed)
+# with the rest of the static files; until then pages fall back to the CDN.
+VENDOR_ASSETS = {
+    'pico.css': ('vendor/pico/pico.min.css', 'https://cdn.jsdelivr.net/npm/@picocss/pico@2.1.1/css/pico.min.css'),
+    'select2.css': ('vendor/select2/select2.min.css', 'https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/css/select2.min.css'),
+    'jquery.js': ('vendor/jquery/jquery.min.js', 'https://cdn.jsdelivr.net/npm/jquery@3.7.1/dist/jquery.min.js'),
+    'select2.js': ('vendor/select2/select2.min.js', 'https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/js/select2.min.js'),
+}
+
+
+@lru_cache(maxsize=None)
+def _is_vendored(path):
+    return finders.find(path) is not None
+
+
+def vendor_asset_url(name):
+    """Local (hashed) URL of a vendored library, or its CDN URL if it hasn't been fetched."""
+    path, cdn_url = VENDOR_ASSETS[name]
+    if _is_vendored(path):
+        return static(path)
+    return cdn_url
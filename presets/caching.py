@@ -0,0 +1,221 @@
+# presets/caching.py
+import hashlib
+import time
+
+import redis
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+# Cache aliases (see CACHES in settings). Each is its own key namespace, so
+# one kind of entry can be invalidated or inspected without the others.
+PAGES = 'pages'
+PERMISSIONS = 'permissions'
+VALIDATION = 'validation'
+RATELIMIT = 'ratelimit'
+
+OUTCOMES = ('hit', 'miss', 'stale')
+LOCK_POLL_SECONDS = 0.05
+
+# A cache outage must not take the site down: reads through these helpers
+# fall back to computing without the cache, as roll_log does for its buffer.
+CACHE_ERRORS = (redis.RedisError,)
+
+
+def in_memory_caches():
+    """The configured cache aliases, backed by per-process memory instead of Redis."""
+    return {
+        alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+        for alias in settings.CACHES
+    }
+
+
+def clear_alias(alias):
+    """
+    Drops every entry of one alias. For Redis, cache.clear() would flush the
+    whole database and take the other aliases with it, so only this alias's
+    key prefix is deleted.
+    """
+    cache = caches[alias]
+    if not isinstance(cache, RedisCache):
+        cache.clear()
+        return
+    client = cache._cache.get_client(write=True)
+    batch = []
+    for key in client.scan_iter(match=f'{cache.key_prefix}:*', count=500):
+        batch.append(key)
+        if len(batch) == 500:
+            client.delete(*batch)
+            batch = []
+    if batch:
+        client.delete(*batch)
+
+
+# --- Versioned keys ---
+
+def namespace_version(alias, namespace):
+    cache = caches[alias]
+    try:
+        version = cache.get(f'ns:{namespace}')
+        if version is None:
+            cache.add(f'ns:{namespace}', time.time_ns(), None)
+            version = cache.get(f'ns:{namespace}')
+    except CACHE_ERRORS as e:
+        print(f"Cache {alias} unavailable, using a throwaway {namespace} version: {e}")
+        return f'down-{time.time_ns()}'
+    return version
+
+def bump_namespace(alias, namespace):
+    """Invalidates every key built for `namespace`; the old entries simply expire."""
+    caches[alias].set(f'ns:{namespace}', time.time_ns(), None)
+
+def versioned_key(alias, namespace, *parts):
+    digest = hashlib.sha1('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'{namespace}:{namespace_version(alias, namespace)}:{digest}'
+
+
+# --- Stampede-safe reads ---
+
+def get_or_compute(alias, key, compute, timeout):
+    """
+    Returns the cached value for `key`, calling `compute()` and caching its
+    result when there is none. Entries outlive `timeout` by
+    CACHE_STALE_SECONDS: while one caller holds the refresh lock and
+    recomputes, everyone else is served the stale value. On a cold miss,
+    callers that lose the lock wait up to CACHE_LOCK_WAIT_SECONDS for the
+    winner's result before computing it themselves. None is a valid result.
+    Exceptions from `compute` propagate and nothing is cached. While the
+    cache is unavailable, `compute()` is simply called every time.
+    """
+    cache = caches[alias]
+    try:
+        found, value, lock_key = _lookup(alias, cache, key)
+    except CACHE_ERRORS as e:
+        print(f"Cache {alias} unavailable, computing {key} directly: {e}")
+        return compute()
+    if found:
+        return value
+
+    try:
+        value = compute()
+        _store(cache, key, value, timeout)
+    finally:
+        if lock_key:
+            _release(cache, lock_key)
+    return value
+
+def _lookup(alias, cache, key):
+    """
+    (found, value, lock_key): a usable cached value, or the refresh lock to
+    release once the caller has recomputed it (None when waiting for another
+    worker's result timed out).
+    """
+    lock_key = f'lock:{key}'
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() < fresh_until:
+            record(alias, 'hit')
+            return True, value, None
+        record(alias, 'stale')
+        if not cache.add(lock_key, True, settings.CACHE_LOCK_SECONDS):
+            return True, value, None
+        return False, None, lock_key
+    record(alias, 'miss')
+    if cache.add(lock_key, True, settings.CACHE_LOCK_SECONDS):
+        return False, None, lock_key
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_SECONDS)
+        entry = cache.get(key)
+        if entry is not None:
+            return True, entry[0], None
+    return False, None, None
+
+def _store(cache, key, value, timeout):
+    try:
+        cache.set(key, (value, time.time() + timeout), timeout + settings.CACHE_STALE_SECONDS)
+    except CACHE_ERRORS as e:
+        print(f"Unable to cache {key}: {e}")
+
+def _release(cache, lock_key):
+    try:
+        cache.delete(lock_key)
+    except CACHE_ERRORS as e:
+        print(f"Unable to release {lock_key}: {e}")
+
+
+def cache_get(alias, key):
+    """caches[alias].get(key), or None while the cache is unavailable."""
+    try:
+        return caches[alias].get(key)
+    except CACHE_ERRORS as e:
+        print(f"Cache {alias} unavailable: {e}")
+        return None
+
+def cache_set(alias, key, value, timeout):
+    """caches[alias].set(...), skipped while the cache is unavailable."""
+    try:
+        caches[alias].set(key, value, timeout)
+    except CACHE_ERRORS as e:
+        print(f"Unable to cache {key}: {e}")
+
+
+# --- Rate limits ---
+
+def rate_limited(scope, ident, limit, window):
+    """
+    Counts one request by `ident` against `limit` per `window` seconds and
+    returns True once the limit is exceeded. Fixed windows, shared by every
+    worker using the cache. While the cache is unavailable nothing is
+    counted and no request is limited.
+    """
+    cache = caches[RATELIMIT]
+    key = f'{scope}:{ident}:{int(time.time() // window)}'
+    try:
+        if cache.add(key, 1, window):
+            return limit < 1
+        try:
+            return cache.incr(key) > limit
+        except ValueError:
+            # The window rolled over between add() and incr().
+            cache.add(key, 1, window)
+            return limit < 1
+    except CACHE_ERRORS as e:
+        print(f"Rate limit cache unavailable, not limiting {scope}: {e}")
+        return False
+
+
+# --- Metrics ---
+
+def record(alias, outcome):
+    """Counts a hit, miss or stale read in the alias itself, so all workers share the totals."""
+    cache = caches[alias]
+    key = f'metrics:{outcome}'
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+    except CACHE_ERRORS:
+        # Only a counter; the outage is reported by whoever needed the entry.
+        pass
+
+def cache_stats():
+    stats = {}
+    for alias in settings.CACHES:
+        counts = caches[alias].get_many([f'metrics:{outcome}' for outcome in OUTCOMES])
+        stats[alias] = {outcome: counts.get(f'metrics:{outcome}', 0) for outcome in OUTCOMES}
+    return stats
+
+def render_cache_prometheus():
+    """Cache read outcomes in the Prometheus text exposition format."""
+    lines = [
+        '# HELP seedbot_cache_reads_total Cache reads by alias and outcome.',
+        '# TYPE seedbot_cache_reads_total counter',
+    ]
+    for alias, counts in cache_stats().items():
+        for outcome, count in counts.items():
+            lines.append(f'seedbot_cache_reads_total{{cache="{alias}",outcome="{outcome}"}} {count}')
+    return '\n'.join(lines) + '\n'
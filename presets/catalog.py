@@ -0,0 +1,103 @@
+# presets/catalog.py
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .caching import CACHE_ERRORS, PAGES
+
+# Changes whenever anything shown on the list or detail pages changes:
+# presets, featured presets and trending order. gen_counts (roll log flushes)
+# only change it once it is CATALOG_HTML_CACHE_SECONDS old; see
+# bump_catalog_version_for_counts.
+VERSION_KEY = 'catalog:version'
+
+
+def catalog_state():
+    """The current catalog version and when it last changed (epoch seconds)."""
+    cache = caches[PAGES]
+    try:
+        state = cache.get(VERSION_KEY)
+        if state is None:
+            # Nothing cached (first request or a cache flush): start a new version
+            # rather than risk confirming a page that is out of date.
+            cache.add(VERSION_KEY, {'version': time.time_ns(), 'modified': time.time()}, None)
+            state = cache.get(VERSION_KEY)
+    except CACHE_ERRORS as e:
+        # A version of its own for every request: no 304s and no cached
+        # markup shared until the cache is back.
+        print(f"Catalog version unavailable: {e}")
+        return {'version': time.time_ns(), 'modified': time.time()}
+    return state
+
+def bump_catalog_version():
+    caches[PAGES].set(VERSION_KEY, {'version': time.time_ns(), 'modified': time.time()}, None)
+
+def bump_catalog_version_for_counts():
+    """
+    Called after gen_counts change, which is every roll log flush (a few
+    seconds apart) under steady traffic. The version is only bumped once it
+    is CATALOG_HTML_CACHE_SECONDS old, so cached pages and ETags survive and
+    counts lag by at most that long (the trending update, every few minutes,
+    bumps it too).
+    """
+    if time.time() - catalog_state()['modified'] >= settings.CATALOG_HTML_CACHE_SECONDS:
+        bump_catalog_version()
+
+def catalog_cache_key(kind, *parts):
+    """Cache key for rendered catalog HTML; bumping the version orphans every old entry."""
+    digest = hashlib.sha1('\0'.join(parts).encode('utf-8')).hexdigest()
+    return f"catalog:{kind}:{catalog_state()['version']}:{digest}"
+
+
+def _viewer_key(request):
+    """
+    Pages for a logged-in user embed their CSRF token and depend on their
+    permissions (edit, pin and bulk roll controls), so the ETag covers the
+    session, the token and the permission flags: logging in again or a
+    permission change in the bot's database must not be answered with 304.
+    """
+    if not request.user.is_authenticated:
+        return 'anon'
+    from .decorators import get_user_permissions
+    account = request.user.socialaccount_set.filter(provider='discord').first()
+    permissions = get_user_permissions(account.uid) if account else None
+    viewer = '\0'.join([
+        str(request.user.pk), account.uid if account else '', str(permissions),
+        request.session.session_key or '', request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ])
+    return f"u{request.user.pk}-{hashlib.sha1(viewer.encode('utf-8')).hexdigest()[:16]}"
+
+def _etag(request, *args, **kwargs):
+    return f"{catalog_state()['version']}-{_viewer_key(request)}"
+
+def _last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(int(catalog_state()['modified']), tz=timezone.utc)
+
+
+def conditional_catalog_page(view_func):
+    """
+    Adds ETag/Last-Modified validators driven by the catalog version, so
+    unchanged pages are answered with 304 Not Modified. Anonymous responses
+    may be cached by browsers and a reverse proxy for CATALOG_CACHE_MAX_AGE
+    seconds; pages for logged-in users are private and always revalidated.
+    """
+    conditional_view = condition(etag_func=_etag, last_modified_func=_last_modified)(view_func)
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, max_age=settings.CATALOG_CACHE_MAX_AGE)
+            patch_vary_headers(response, ['Cookie'])
+        return response
+
+    return _wrapped_view
@@ -0,0 +1,149 @@
+# presets/dashboard.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from celery.backends.redis import RedisBackend
+from celery.result import AsyncResult
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+from kombu.exceptions import ChannelError
+
+from seedbot_project.celery import app
+from .caching import get_or_compute
+from .failures import recent_failures
+from .models import RollTiming
+
+ROLL_TASK = 'presets.tasks.create_local_seed_task'
+WORKER_TOTALS_KEY = 'ops:worker-totals'
+
+
+def _inspect():
+    """Asks every worker for its active tasks, stats and queues, as one round of broadcasts run side by side."""
+    inspector = app.control.inspect(timeout=settings.OPS_INSPECT_TIMEOUT)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        active, stats, queues = pool.map(lambda method: method() or {}, [inspector.active, inspector.stats, inspector.active_queues])
+    return active, stats, queues
+
+
+def queue_depths(names):
+    """Messages waiting in each named queue; None where the broker can't be asked."""
+    depths = dict.fromkeys(names)
+    try:
+        with app.connection_for_read() as conn:
+            for name in names:
+                try:
+                    depths[name] = conn.default_channel.queue_declare(queue=name, passive=True).message_count
+                except ChannelError:
+                    # Brokers drop empty queues, and a passive declare of one reports it missing.
+                    depths[name] = 0
+    except Exception as e:
+        print(f"Unable to read Celery queue depths: {e}")
+    return depths
+
+
+def _progress(task_ids):
+    """The PROGRESS status text of each task that reported one."""
+    backend = app.backend
+    if isinstance(backend, RedisBackend):
+        raw = backend.client.mget([backend.get_key_for_task(task_id) for task_id in task_ids]) if task_ids else []
+        metas = {task_id: backend.decode_result(value) for task_id, value in zip(task_ids, raw) if value}
+    else:
+        metas = {}
+        for task_id in task_ids:
+            result = AsyncResult(task_id)
+            metas[task_id] = {'status': result.state, 'result': result.info}
+    return {
+        task_id: meta['result'].get('status')
+        for task_id, meta in metas.items()
+        if meta['status'] == 'PROGRESS' and isinstance(meta.get('result'), dict)
+    }
+
+
+def _throughput(stats):
+    """
+    Tasks completed per minute by each worker since the previous snapshot,
+    or over the worker's lifetime when there is no earlier sample.
+    """
+    cache = caches['default']
+    now = time.time()
+    previous = cache.get(WORKER_TOTALS_KEY) or {}
+    totals = {worker: sum(info.get('total', {}).values()) for worker, info in stats.items()}
+    cache.set(WORKER_TOTALS_KEY, {worker: (total, now) for worker, total in totals.items()}, 3600)
+
+    rates = {}
+    for worker, total in totals.items():
+        last_total, last_seen = previous.get(worker, (None, None))
+        if last_total is not None and now > last_seen and total >= last_total:
+            rates[worker] = (total - last_total) / (now - last_seen) * 60
+        else:
+            uptime = stats[worker].get('uptime') or 0
+            rates[worker] = total / uptime * 60 if uptime else 0.0
+    return totals, rates
+
+
+def roll_summary(minutes):
+    """Local rolls finished in the last `minutes`: count, failures and mean duration of the successful ones."""
+    since = timezone.now() - timedelta(minutes=minutes)
+    summary = RollTiming.objects.filter(stage='total', created_at__gte=since).aggregate(
+        rolls=Count('id'),
+        failed=Count('id', filter=Q(succeeded=False)),
+        mean_ms=Avg('duration_ms', filter=Q(succeeded=True)),
+    )
+    summary['failure_rate'] = summary['failed'] / summary['rolls'] if summary['rolls'] else 0.0
+    summary['window_minutes'] = minutes
+    return summary
+
+
+def _build_snapshot():
+    active, stats, worker_queues = _inspect()
+
+    queue_names = {app.conf.task_default_queue}
+    for queues in worker_queues.values():
+        queue_names.update(queue['name'] for queue in queues)
+
+    tasks = [dict(task, worker=worker) for worker, worker_tasks in active.items() for task in worker_tasks]
+    progress = _progress([task['id'] for task in tasks])
+    totals, rates = _throughput(stats)
+    now = time.time()
+
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'queues': [{'name': name, 'depth': depth} for name, depth in sorted(queue_depths(sorted(queue_names)).items())],
+        'workers': [
+            {
+                'name': worker,
+                'concurrency': info.get('pool', {}).get('max-concurrency'),
+                'active': len(active.get(worker, [])),
+                'processed': totals[worker],
+                'per_minute': round(rates[worker], 2),
+                'uptime_seconds': info.get('uptime'),
+            }
+            for worker, info in sorted(stats.items())
+        ],
+        'active_tasks': [
+            {
+                'id': task['id'],
+                'name': task['name'].rsplit('.', 1)[-1],
+                'worker': task['worker'],
+                # create_local_seed_task(preset_pk, discord_id, user_name)
+                'preset': task['args'][0] if task['name'] == ROLL_TASK and task.get('args') else None,
+                'status': progress.get(task['id']),
+                'running_seconds': round(now - task['time_start'], 1) if task.get('time_start') else None,
+            }
+            for task in sorted(tasks, key=lambda task: task.get('time_start') or now)
+        ],
+        'rolls': roll_summary(settings.OPS_DASHBOARD_WINDOW_MINUTES),
+        'failures': recent_failures(settings.OPS_DASHBOARD_FAILURES),
+    }
+
+
+def dashboard_snapshot():
+    """
+    Everything the ops dashboard shows, in one dict. Worker broadcasts are
+    slow, so the snapshot is shared by every viewer for
+    OPS_DASHBOARD_CACHE_SECONDS.
+    """
+    return get_or_compute('default', 'ops:dashboard', _build_snapshot, settings.OPS_DASHBOARD_CACHE_SECONDS)
@@ -1,7 +1,39 @@
 from functools import wraps
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
 from django.shortcuts import redirect
 from django.urls import reverse # <-- Add this import
 from allauth.socialaccount.models import SocialAccount
+from .models import UserPermission
+from .caching import PERMISSIONS, get_or_compute
+
+
+def get_user_permissions(user_id):
+    """
+    A user's (bot_admin, race_admin) flags, or None without a permissions row.
+    The bot edits these directly, so they are cached for PERMISSION_CACHE_SECONDS.
+    """
+    def load():
+        permissions = UserPermission.objects.filter(user_id=user_id).first()
+        if permissions is None:
+            return None
+        return permissions.bot_admin == 1, permissions.race_admin == 1
+    return get_or_compute(PERMISSIONS, f'user:{int(user_id)}', load, settings.PERMISSION_CACHE_SECONDS)
+
+def client_ip(request):
+    """
+    The address a request came from. Behind TRUSTED_PROXIES reverse proxies,
+    REMOTE_ADDR is the nearest proxy, so the client is read from the entries
+    the proxies appended to X-Forwarded-For.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    if not settings.TRUSTED_PROXIES:
+        return remote_addr
+    forwarded = [addr.strip() for addr in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if addr.strip()]
+    if len(forwarded) < settings.TRUSTED_PROXIES:
+        # Not relayed by the proxies, e.g. a scraper on the same host.
+        return remote_addr
+    return forwarded[-settings.TRUSTED_PROXIES]
 
 def discord_login_required(view_func):
     """
@@ -23,4 +55,18 @@ def discord_login_required(view_func):
             
         return view_func(request, *args, **kwargs)
 
-    return _wrapped_view
\ No newline at end of file
+    return _wrapped_view
+
+def bot_admin_required(view_func):
+    """
+    Decorator for operator-only views. Builds on discord_login_required and
+    additionally requires the bot_admin flag in the SeedBot users table.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        discord_id = request.user.socialaccount_set.get(provider='discord').uid
+        if not UserPermission.objects.filter(user_id=discord_id, bot_admin=1).exists():
+            raise PermissionDenied("This page is only available to bot admins.")
+        return view_func(request, *args, **kwargs)
+
+    return discord_login_required(_wrapped_view)
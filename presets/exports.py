@@ -0,0 +1,107 @@
+# presets/exports.py
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models.expressions import RawSQL
+from django.http import StreamingHttpResponse
+
+from .models import SeedLog
+from .rollstats import first_row_id_at, parse_timestamp
+
+EXPORT_FIELDS = [
+    'timestamp', 'creator_id', 'creator_name', 'seed_type', 'share_url',
+    'server_name', 'server_id', 'channel_name', 'channel_id',
+]
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+# Rows out of rowid order by more than this are missed at the edges of a date range.
+RANGE_SLACK_ROWS = 1000
+
+
+def roll_chunks(creator_id=None, start=None, end=None):
+    """
+    Yields lists of SeedLog rows (as dicts) in insertion order, at most
+    EXPORT_CHUNK_SIZE at a time. Each chunk is one keyset query on
+    rowid, so memory stays flat and no cursor is held between chunks.
+    A start/end datetime range is mapped to a rowid range first (the text
+    timestamps can't be filtered in SQL) and then checked row by row.
+    """
+    rows = SeedLog.objects.annotate(row_id=RawSQL('rowid', [])).order_by('row_id')
+    if creator_id is not None:
+        rows = rows.filter(creator_id=creator_id)
+    last_row_id = 0
+    if start is not None:
+        last_row_id = max(0, first_row_id_at(start) - RANGE_SLACK_ROWS - 1)
+    stop_row_id = None
+    if end is not None:
+        stop_row_id = first_row_id_at(end) + RANGE_SLACK_ROWS
+
+    while True:
+        page = rows.filter(row_id__gt=last_row_id)
+        if stop_row_id is not None:
+            page = page.filter(row_id__lte=stop_row_id)
+        chunk = list(page.values('row_id', *EXPORT_FIELDS)[:settings.EXPORT_CHUNK_SIZE])
+        if not chunk:
+            return
+        last_row_id = chunk[-1]['row_id']
+        if start is not None or end is not None:
+            chunk = [row for row in chunk if _in_range(row['timestamp'], start, end)]
+        for row in chunk:
+            del row['row_id']
+        if chunk:
+            yield chunk
+
+
+def _in_range(timestamp, start, end):
+    rolled_at = parse_timestamp(timestamp)
+    if rolled_at is None:
+        return False
+    return (start is None or rolled_at >= start) and (end is None or rolled_at < end)
+
+
+class _Echo:
+    """File-like object for csv.writer that hands each line straight back."""
+    def write(self, value):
+        return value
+
+
+def _render_lines(chunks, export_format):
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for chunk in chunks:
+            yield ''.join(writer.writerow([row[field] for field in EXPORT_FIELDS]) for row in chunk)
+    else:
+        for chunk in chunks:
+            yield ''.join(json.dumps(row) + '\n' for row in chunk)
+
+
+async def _render_lines_async(chunks, export_format):
+    """Same output, but each chunk is fetched off the event loop so ASGI workers stream it too."""
+    lines = _render_lines(chunks, export_format)
+    fetch = sync_to_async(next)
+    while True:
+        line = await fetch(lines, None)
+        if line is None:
+            return
+        yield line
+
+
+def stream_rolls(request, filename, export_format, **filters):
+    """
+    Streams roll history as CSV or JSON lines. Under ASGI the body is an
+    async iterator; Django would otherwise buffer a sync one in memory.
+    """
+    chunks = roll_chunks(**filters)
+    if isinstance(request, ASGIRequest):
+        body = _render_lines_async(chunks, export_format)
+    else:
+        body = _render_lines(chunks, export_format)
+    response = StreamingHttpResponse(body, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,126 @@
+# presets/failures.py
+import hashlib
+import re
+import subprocess
+import traceback
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import RollFailure
+from .seed_pool import pool_key
+
+# Numbers, addresses and paths differ between otherwise identical failures.
+_VOLATILE = re.compile(r'(/[^\s:\'"]+)|(0x[0-9a-fA-F]+)|(\d+)')
+MESSAGE_CHARS = 300
+
+
+def _normalize(line):
+    return _VOLATILE.sub(lambda m: '<path>' if m.group(1) else '#', line).strip()
+
+
+def _last_line(text):
+    lines = [line for line in (text or '').splitlines() if line.strip()]
+    return lines[-1].strip() if lines else ''
+
+
+def describe(exc):
+    """
+    The parts of a failed roll worth keeping: exit code (for generator
+    failures), a one-line message and the tail of the generator's stderr,
+    or of the traceback when the failure wasn't in a generator.
+    """
+    exit_code = None
+    if isinstance(exc, subprocess.CalledProcessError):
+        exit_code = exc.returncode
+        output = exc.stderr or exc.stdout or ''
+        message = _last_line(output) or f"Exited with status {exc.returncode}."
+    elif isinstance(exc, subprocess.TimeoutExpired):
+        output = exc.stderr or ''
+        if isinstance(output, bytes):
+            output = output.decode('utf-8', errors='replace')
+        message = f"Timed out after {exc.timeout:g}s."
+    else:
+        output = ''.join(traceback.format_exception(exc))
+        message = f"{type(exc).__name__}: {exc}"
+    return {
+        'error_type': type(exc).__name__,
+        'exit_code': exit_code,
+        'message': message[:MESSAGE_CHARS],
+        'stderr': output[-settings.ROLL_FAILURE_STDERR_CHARS:],
+    }
+
+
+def user_message(exc):
+    """What the roll status poll shows for a failure: one line, never the whole stderr."""
+    if isinstance(exc, (subprocess.CalledProcessError, subprocess.TimeoutExpired)):
+        return f"A script failed to run: {describe(exc)['message']}"
+    return f"An error occurred: {str(exc)[:MESSAGE_CHARS]}"
+
+
+def failure_signature(script_dir, details):
+    """Groups failures that are the same error, whatever preset hit it or which numbers it mentions."""
+    source = '\0'.join([
+        script_dir or '', details['error_type'], str(details['exit_code']), _normalize(details['message']),
+    ])
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def record_failure(preset, timer, exc):
+    """
+    Stores a failed roll. A failure matching an existing group's signature
+    only bumps its count and refreshes the latest example; a new group may
+    push the least recently seen ones out (ROLL_FAILURE_MAX_GROUPS). Never
+    raises: recording must not hide the original error.
+    """
+    try:
+        details = describe(exc)
+        now = timezone.now()
+        latest = {
+            'preset_name': preset.preset_name,
+            'flags_hash': pool_key(preset),
+            'stderr': details['stderr'],
+            'message': details['message'],
+            'timings': {stage: round(ms, 1) for stage, ms in timer.durations.items()},
+            'last_seen': now,
+        }
+        signature = failure_signature(timer.script_dir, details)
+        if RollFailure.objects.filter(signature=signature).update(count=F('count') + 1, **latest):
+            return
+        try:
+            RollFailure.objects.create(
+                signature=signature, script_dir=timer.script_dir, error_type=details['error_type'],
+                exit_code=details['exit_code'], first_seen=now, **latest,
+            )
+        except IntegrityError:
+            # Another worker created the group first.
+            RollFailure.objects.filter(signature=signature).update(count=F('count') + 1, **latest)
+            return
+        _rotate()
+    except Exception as e:
+        print(f"Unable to record roll failure: {e}")
+
+
+def _rotate():
+    expired = RollFailure.objects.order_by('-last_seen').values_list('pk', flat=True)[settings.ROLL_FAILURE_MAX_GROUPS:]
+    RollFailure.objects.filter(pk__in=list(expired)).delete()
+
+
+def recent_failures(limit):
+    """The most recently seen failure groups, newest first."""
+    return [
+        {
+            'when': failure.last_seen.isoformat(),
+            'first_seen': failure.first_seen.isoformat(),
+            'count': failure.count,
+            'preset': failure.preset_name,
+            'script_dir': failure.script_dir,
+            'exit_code': failure.exit_code,
+            'error': failure.message,
+            'stderr': failure.stderr,
+            'timings': failure.timings,
+        }
+        for failure in RollFailure.objects.order_by('-last_seen')[:limit]
+    ]
@@ -0,0 +1,209 @@
+# presets/flag_index.py
+import hashlib
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from . import flag_processor
+from .catalog import bump_catalog_version
+from .models import Preset, PresetFlag, PresetFlagSet
+
+# Flag/value pairs matched per query when intersecting posting lists; keeps
+# the OR chain well under SQLite's expression depth limit.
+TERM_BATCH_SIZE = 100
+# Bumped when what gets indexed changes, so the next sync re-indexes everything.
+INDEX_VERSION = 2
+# Cosmetic flags (names, portraits, sprites, palettes) and the spoiler log
+# don't change the game, so presets differing only in them are duplicates.
+FINGERPRINT_IGNORED_FLAGS = {'-name', '-cpor', '-cspr', '-cspp', '-sl'}
+
+
+def parse_flags(flagstring):
+    """
+    Splits a flag string into {flag: value}, e.g. '-cg -oa 2.3.3 -sl' gives
+    {'-cg': '', '-oa': '2.3.3', '-sl': ''}. Whitespace is normalized and a
+    repeated flag keeps its last value, as wc.py's argument parser would.
+    """
+    flags = {}
+    current = None
+    for token in (flagstring or '').split():
+        if token.startswith('-') and len(token) > 1 and not token[1].isdigit():
+            current = token
+            flags[current] = []
+        elif current is not None:
+            flags[current].append(token)
+    return {flag: ' '.join(values) for flag, values in flags.items()}
+
+
+def effective_flags(preset):
+    """The flags a roll of `preset` actually runs with: its flags with its arguments applied."""
+    return parse_flags(flag_processor.apply_args(preset.flags or '', preset.arguments or ''))
+
+
+def flag_fingerprint(flags):
+    """
+    Canonical hash of a parsed flag set: flags sorted, cosmetic ones dropped.
+    Presets that roll the same game share a fingerprint however their flags
+    are ordered or spaced. Empty for a preset without flags.
+    """
+    canonical = ' '.join(
+        f"{flag} {value}".rstrip() for flag, value in sorted(flags.items())
+        if flag not in FINGERPRINT_IGNORED_FLAGS
+    )
+    if not canonical:
+        return ''
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _source_hash(preset):
+    source = f"{INDEX_VERSION}\0{preset.flags or ''}\0{preset.arguments or ''}\0{int(bool(preset.hidden))}"
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+# --- Maintenance ---
+
+def index_preset(preset):
+    """
+    Rewrites a preset's rows in the flag index, and its fingerprint, if its
+    flags, arguments or visibility changed since it was last indexed. Hidden
+    presets keep an empty entry so their flags can't be found through search
+    or duplicate warnings. Returns True if the preset was (re)indexed.
+    """
+    source_hash = _source_hash(preset)
+    if PresetFlagSet.objects.filter(preset_name=preset.preset_name, source_hash=source_hash).exists():
+        return False
+    flags = {} if preset.hidden else effective_flags(preset)
+    with transaction.atomic():
+        PresetFlag.objects.filter(preset_name=preset.preset_name).delete()
+        PresetFlag.objects.bulk_create([
+            PresetFlag(preset_name=preset.preset_name, flag=flag, value=value)
+            for flag, value in flags.items()
+        ])
+        PresetFlagSet.objects.update_or_create(
+            preset_name=preset.preset_name,
+            defaults={'source_hash': source_hash, 'flag_count': len(flags), 'fingerprint': flag_fingerprint(flags)},
+        )
+    return True
+
+
+def remove_preset(preset_name):
+    with transaction.atomic():
+        PresetFlag.objects.filter(preset_name=preset_name).delete()
+        PresetFlagSet.objects.filter(preset_name=preset_name).delete()
+
+
+def sync_flag_index(full=False):
+    """
+    Brings the index in line with the presets table, which the bot also
+    writes to directly. Only presets whose flags changed are rewritten unless
+    `full` is set. Returns counts of indexed and removed presets.
+    """
+    if full:
+        PresetFlagSet.objects.all().delete()
+        PresetFlag.objects.all().delete()
+    indexed = 0
+    seen = set()
+    for preset in Preset.objects.only('preset_name', 'flags', 'arguments', 'hidden').iterator(chunk_size=500):
+        seen.add(preset.preset_name)
+        if index_preset(preset):
+            indexed += 1
+    gone = set(PresetFlagSet.objects.values_list('preset_name', flat=True)) - seen
+    for preset_name in gone:
+        remove_preset(preset_name)
+    if indexed or gone:
+        bump_catalog_version()
+    return {'indexed': indexed, 'removed': len(gone)}
+
+
+# --- Queries ---
+
+def presets_with_flag(flag, value=None):
+    """Names of the (visible) presets that roll with `flag`, optionally with exactly `value`."""
+    matches = PresetFlag.objects.filter(flag=flag)
+    if value is not None:
+        matches = matches.filter(value=value)
+    return list(matches.values_list('preset_name', flat=True).distinct())
+
+
+def flag_usage(prefix='', with_values=False, limit=20):
+    """The most used flags (or flag/value pairs) across the catalog, with the number of presets using each."""
+    fields = ['flag', 'value'] if with_values else ['flag']
+    rows = (
+        PresetFlag.objects.filter(flag__startswith=prefix)
+        .values(*fields).annotate(presets=Count('id')).order_by('-presets', *fields)
+    )
+    return list(rows[:limit])
+
+
+def _overlapping(terms, exclude, min_score, limit):
+    """
+    Presets whose indexed flags overlap `terms` (flag/value pairs), as
+    (preset_name, jaccard) pairs, best first. Overlaps are counted from the
+    index's posting lists for `terms`, so only presets sharing at least one
+    pair are ever looked at.
+    """
+    if not terms:
+        return []
+    shared = Counter()
+    for start in range(0, len(terms), TERM_BATCH_SIZE):
+        batch = terms[start:start + TERM_BATCH_SIZE]
+        matches = (
+            PresetFlag.objects.filter(reduce(or_, (Q(flag=flag, value=value) for flag, value in batch)))
+            .exclude(preset_name=exclude)
+            .values_list('preset_name').annotate(shared=Count('id'))
+        )
+        shared.update(dict(matches))
+    sizes = dict(PresetFlagSet.objects.filter(preset_name__in=list(shared)).values_list('preset_name', 'flag_count'))
+    scored = []
+    for other, overlap in shared.items():
+        score = overlap / (len(terms) + sizes.get(other, overlap) - overlap)
+        if score >= min_score:
+            scored.append((other, score))
+    scored.sort(key=lambda pair: (-pair[1], pair[0]))
+    return scored[:limit]
+
+
+def similar_presets(preset_name, limit=None):
+    """Presets whose flag sets overlap most with `preset_name`'s, as (preset_name, jaccard) pairs."""
+    terms = list(PresetFlag.objects.filter(preset_name=preset_name).values_list('flag', 'value'))
+    return _overlapping(terms, preset_name, settings.SIMILAR_PRESETS_MIN_SCORE, limit or settings.SIMILAR_PRESETS_SHOWN)
+
+
+def duplicate_presets(flags, exclude=None):
+    """
+    Existing visible presets that roll the same flags as the parsed `flags`:
+    exact duplicates by fingerprint (one indexed lookup), and near
+    duplicates sharing at least DUPLICATE_PRESET_MIN_SCORE of their flags.
+    Returns (exact names, [(name, jaccard), ...]).
+    """
+    fingerprint = flag_fingerprint(flags)
+    if not fingerprint:
+        return [], []
+    exact = list(
+        PresetFlagSet.objects.filter(fingerprint=fingerprint).exclude(preset_name=exclude)
+        .order_by('preset_name').values_list('preset_name', flat=True)
+    )
+    near = [
+        (name, score) for name, score in
+        _overlapping(list(flags.items()), exclude, settings.DUPLICATE_PRESET_MIN_SCORE, settings.SIMILAR_PRESETS_SHOWN + len(exact))
+        if name not in exact
+    ]
+    return exact, near[:settings.SIMILAR_PRESETS_SHOWN]
+
+
+def diff_flags(preset_name, other_name):
+    """Flags only in the first preset, only in the second, and set to different values in both."""
+    rows = PresetFlag.objects.filter(preset_name__in=[preset_name, other_name]).values_list('preset_name', 'flag', 'value')
+    flags = {preset_name: {}, other_name: {}}
+    for name, flag, value in rows:
+        flags[name][flag] = value
+    mine, theirs = flags[preset_name], flags[other_name]
+    return {
+        'removed': sorted(set(mine) - set(theirs)),
+        'added': sorted(set(theirs) - set(mine)),
+        'changed': sorted(flag for flag in set(mine) & set(theirs) if mine[flag] != theirs[flag]),
+    }
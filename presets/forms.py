@@ -1,7 +1,4 @@
-import requests
-import json
 import subprocess
-import uuid
 from pathlib import Path
 
 from django import forms
@@ -9,6 +6,11 @@ from django.conf import settings
 from .models import Preset
 from profanity import profanity
 from . import flag_processor
+from .wc_api import get_client, WCApiError
+from .caching import VALIDATION, get_or_compute, versioned_key
+from .flag_index import duplicate_presets, parse_flags
+from .sandbox import run_sandboxed
+from .scratch import scratch_dir
 
 ARGUMENT_CHOICES = [
     ('paint', 'Paint'), ('kupo', 'Kupo'), ('loot', 'Loot'), ('fancygau', 'Fancy Gau'),
@@ -36,6 +38,10 @@ DIR_MAP = {
     'ws': 'WorldsCollide_shuffle_by_world', 'csi': 'WorldsCollide_shuffle_by_world',
 }
 
+class FlagValidationUnavailable(Exception):
+    """The flags could not be checked this time (the validator ran out of time or resources); not a verdict."""
+
+
 class PresetForm(forms.ModelForm):
     arguments = forms.MultipleChoiceField(
         choices=ARGUMENT_CHOICES,
@@ -43,6 +49,8 @@ class PresetForm(forms.ModelForm):
         required=False,
         label="Arguments"
     )
+    # Only shown (as a checkbox) once the flags have been flagged as a duplicate.
+    allow_duplicate = forms.BooleanField(required=False, widget=forms.HiddenInput, label="Save anyway")
 
     def __init__(self, *args, **kwargs):
         is_official = kwargs.pop('is_official', False)
@@ -58,8 +66,12 @@ class PresetForm(forms.ModelForm):
         self.instance.arguments = ' '.join(selected_args)
         return super().save(commit=commit)
 
-    def _validate_flags_locally(self, flags, arguments):
-        """Uses a local wc.py script to validate flags."""
+    def _local_flag_error(self, flags, arguments):
+        """
+        Uses a local wc.py script to validate flags. Returns an error message,
+        or None if they are valid. Raises FlagValidationUnavailable when the
+        run timed out or hit a sandbox limit, which says nothing about the flags.
+        """
         final_flags = flag_processor.apply_args(flags, ' '.join(arguments))
         
         project_root = settings.BASE_DIR.parent
@@ -76,42 +88,83 @@ class PresetForm(forms.ModelForm):
         wc_script = script_dir / 'wc.py'
         input_smc = main_wc_dir / 'ff3.smc'
         
-        temp_filename = f"validation_{uuid.uuid4().hex[:8]}.smc"
-        temp_output_smc = main_wc_dir / 'seeds' / temp_filename
+        with scratch_dir() as temp_path:
+            command = ["python3", str(wc_script), "-i", str(input_smc), "-o", str(temp_path / 'validation.smc')]
+            command.extend(final_flags.split())
+            try:
+                run_sandboxed(command, cwd=script_dir, timeout=120)
+            except subprocess.TimeoutExpired:
+                raise FlagValidationUnavailable(
+                    "Validating these flags took too long, so they could not be checked. Please try again shortly."
+                )
+            except subprocess.CalledProcessError as e:
+                if e.limit_hit:
+                    raise FlagValidationUnavailable(
+                        "The flag validator ran out of resources, so these flags could not be checked. Please try again shortly."
+                    )
+                error_details = e.stderr or e.stdout
+                return f"Invalid Flags (local validation): {error_details}"
 
-        command = ["python3", str(wc_script), "-i", str(input_smc), "-o", str(temp_output_smc)]
-        command.extend(final_flags.split())
+        return None
 
+    def _api_flag_error(self, flags):
+        """
+        Uses the public API to validate flags. Returns an error message, or
+        None if they are valid. Raises WCApiError if the API itself is failing.
+        """
         try:
-            subprocess.run(
-                command, cwd=script_dir, capture_output=True, text=True,
-                timeout=120, check=True
-            )
-        except subprocess.CalledProcessError as e:
-            error_details = e.stderr or e.stdout
-            self.add_error('flags', f"Invalid Flags (local validation): {error_details}")
-        finally:
-            temp_output_smc.unlink(missing_ok=True)
-            temp_output_smc.with_suffix('.txt').unlink(missing_ok=True)
-
-    def _validate_flags_api(self, flags):
-        """Uses the public API to validate flags."""
-        api_url = "https://api.ff6worldscollide.com/api/seed"
-        payload = {"key": settings.WC_API_KEY, "flags": flags}
-        headers = {"Content-Type": "application/json"}
+            get_client().generate_seed(flags)
+        except WCApiError as e:
+            if e.upstream_failure:
+                raise
+            if e.response is None:
+                return "These flags are invalid."
+            try:
+                api_error = e.response.json().get('error', 'API returned an error.')
+                return f"Invalid Flags (API validation): {api_error}"
+            except ValueError:
+                return "Invalid Flags: The API returned an unreadable error."
+        return None
+
+    def _validate_flags(self, flags, arguments):
+        """
+        Runs the local or API validation, caching the verdict per flags and
+        arguments: both generate a whole seed, and edits often resubmit
+        unchanged flags. Only real verdicts are cached: API outages, timeouts
+        and sandbox limit kills are reported but never cached.
+        """
+        local = any(arg in LOCAL_ROLL_ARGS for arg in arguments)
+        if local:
+            validate = lambda: self._local_flag_error(flags, arguments)
+        else:
+            validate = lambda: self._api_flag_error(flags)
+        key = versioned_key(VALIDATION, 'flags', 'local' if local else 'api', flags, ' '.join(arguments))
         try:
-            response = requests.post(api_url, data=json.dumps(payload), headers=headers, timeout=30)
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            error_message = "These flags are invalid."
-            if e.response:
-                try:
-                    api_error = e.response.json().get('error', 'API returned an error.')
-                    error_message = f"Invalid Flags (API validation): {api_error}"
-                except json.JSONDecodeError:
-                    error_message = "Invalid Flags: The API returned an unreadable error."
+            error_message = get_or_compute(VALIDATION, key, validate, settings.FLAG_VALIDATION_CACHE_SECONDS)
+        except WCApiError:
+            error_message = "The FF6WC API is unavailable right now, so these flags could not be validated. Please try again shortly."
+        except FlagValidationUnavailable as e:
+            error_message = str(e)
+        if error_message:
             self.add_error('flags', error_message)
 
+    def _duplicate_warning(self, flags, arguments):
+        """
+        Names existing presets that roll the same flags (or nearly), or
+        returns None. Unchanged flags on an edit aren't checked again.
+        """
+        arguments_string = ' '.join(arguments)
+        if self.instance.pk and flags == self.instance.flags and arguments_string == (self.instance.arguments or ''):
+            return None
+        final_flags = parse_flags(flag_processor.apply_args(flags, arguments_string))
+        exact, near = duplicate_presets(final_flags, exclude=self.instance.pk)
+        if exact:
+            return f"These flags roll the same game as {', '.join(exact[:3])}. Consider using that preset instead."
+        if near:
+            names = ', '.join(f"{name} ({round(score * 100)}% of flags shared)" for name, score in near[:3])
+            return f"These flags are nearly the same as {names}. Consider using that preset instead."
+        return None
+
     def clean(self):
         cleaned_data = super().clean()
         name = cleaned_data.get("preset_name")
@@ -126,11 +179,15 @@ class PresetForm(forms.ModelForm):
         if self.errors:
             return cleaned_data
 
+        if flags and not cleaned_data.get('allow_duplicate'):
+            warning = self._duplicate_warning(flags, arguments)
+            if warning:
+                self.add_error(None, warning)
+                self.fields['allow_duplicate'].widget = forms.CheckboxInput()
+                return cleaned_data
+
         if flags:
-            if any(arg in LOCAL_ROLL_ARGS for arg in arguments):
-                self._validate_flags_locally(flags, arguments)
-            else:
-                self._validate_flags_api(flags)
+            self._validate_flags(flags, arguments)
         
         return cleaned_data
 
@@ -0,0 +1,39 @@
+# presets/loop_clients.py
+import asyncio
+import weakref
+
+
+class LoopClients:
+    """
+    One async client per event loop, closed when its loop shuts down.
+
+    httpx and redis.asyncio clients belong to the loop that opened them.
+    Under ASGI that is the worker's loop, which lives as long as the process,
+    so each worker pools one client for good. Under WSGI, async views run
+    through async_to_sync, which starts a fresh loop with asyncio.run() for
+    every request: the client then lasts a single request, and is closed
+    when that loop finalizes its async generators instead of being leaked.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._clients = weakref.WeakKeyDictionary()
+
+    async def get(self):
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(loop)
+        if entry is None:
+            client = self._factory()
+            closer = _close_at_shutdown(client)
+            # Parks the generator at its yield; the loop only tracks it weakly.
+            await closer.__anext__()
+            entry = self._clients[loop] = (client, closer)
+        return entry[0]
+
+
+async def _close_at_shutdown(client):
+    try:
+        yield
+    finally:
+        # Runs from loop.shutdown_asyncgens(), which asyncio.run() calls before closing the loop.
+        await client.aclose()
@@ -0,0 +1,129 @@
+# presets/management/commands/check_import_times.py
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What each kind of process imports before it can serve its first request or task.
+ENTRY_POINTS = {
+    'web': (
+        "from seedbot_project.asgi import application\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    'worker': (
+        "from seedbot_project.celery import app\n"
+        "from celery.fixups.django import DjangoWorkerFixup\n"
+        "DjangoWorkerFixup(app).validate_models()\n"
+        "app.loader.import_default_modules()\n"
+    ),
+}
+# Modules each entry point may load. Unlike timings, the count is the same on
+# every machine, so it is the hard budget. Timings are only compared with a
+# baseline report from the same machine (--baseline).
+MODULE_BUDGETS = {
+    'web': 1050,
+    'worker': 950,
+}
+# Heavy integrations that are imported on first use and must stay out of startup.
+LAZY_MODULES = ['pygsheets', 'googleapiclient', 'google.oauth2']
+# Modules each entry point must not load at startup. Workers never serve
+# pages, so the views and URLconf (and their imports) stay out of them.
+EXCLUDED_MODULES = {
+    'web': LAZY_MODULES,
+    'worker': LAZY_MODULES + ['seedbot_project.urls', 'presets.views'],
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def _measure(code):
+    """Runs `code` in a fresh interpreter under -X importtime; returns {module: (self_us, cumulative_us, depth)}."""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'seedbot_project.settings')}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise CommandError(f"Entry point failed to import:\n{result.stderr[-2000:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures -X importtime for the web and worker entry points and fails if either '
+        'loads more modules than its budget, imports a module that should be loaded lazily, '
+        'or (with --baseline) has become slower than an earlier report from this machine.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per entry point; the median is reported.')
+        parser.add_argument('--top', type=int, default=10, help='Heaviest top-level imports to list per entry point.')
+        parser.add_argument('--output', help='Write the JSON report to this file.')
+        parser.add_argument('--baseline', help='A report written earlier by --output on this machine, e.g. from the main branch.')
+        parser.add_argument('--max-slowdown', type=float, default=50,
+                            help='Percent the median import time may exceed the baseline by (default 50).')
+
+    def handle(self, *args, **options):
+        baseline = {}
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Unable to read the baseline report: {e}")
+
+        report, failures = {}, []
+        for name, code in ENTRY_POINTS.items():
+            runs = [_measure(code) for _ in range(options['runs'])]
+            totals = [sum(self_us for self_us, _, _ in modules.values()) / 1000 for modules in runs]
+            total_ms = statistics.median(totals)
+            last = runs[-1]
+            heaviest = sorted(
+                ((module, cumulative / 1000) for module, (_, cumulative, depth) in last.items() if depth == 0),
+                key=lambda item: -item[1],
+            )[:options['top']]
+            eager = [module for module in EXCLUDED_MODULES[name] if module in last]
+            budget = MODULE_BUDGETS[name]
+            report[name] = {
+                'total_ms': round(total_ms, 1),
+                'runs_ms': [round(total, 1) for total in totals],
+                'modules': len(last),
+                'module_budget': budget,
+                'heaviest': [{'module': module, 'cumulative_ms': round(ms, 1)} for module, ms in heaviest],
+                'eager_lazy_modules': eager,
+            }
+
+            baseline_ms = baseline.get(name, {}).get('total_ms')
+            compared = f", baseline {baseline_ms} ms" if baseline_ms else ''
+            self.stdout.write(
+                f"{name}: {total_ms:.1f} ms across {len(last)} modules (budget {budget} modules{compared})"
+            )
+            for module, ms in heaviest:
+                self.stdout.write(f"    {ms:8.1f} ms  {module}")
+            if len(last) > budget:
+                failures.append(f"{name} loads {len(last)} modules, over the budget of {budget}")
+            if baseline_ms and total_ms > baseline_ms * (1 + options['max_slowdown'] / 100):
+                failures.append(
+                    f"{name} imports take {total_ms:.1f} ms, more than {options['max_slowdown']:g}% "
+                    f"over the baseline's {baseline_ms} ms"
+                )
+            if eager:
+                failures.append(f"{name} imports {', '.join(eager)} at startup")
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Import times are within budget.'))
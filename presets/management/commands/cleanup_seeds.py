@@ -1,37 +1,60 @@
 # presets/management/commands/cleanup_seeds.py
-import os
-import time
 from pathlib import Path
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 
+from presets.cleanup import run_cleanup, parse_size
+
+
 class Command(BaseCommand):
-    help = 'Deletes seed files from the media directory that are older than 30 days.'
+    help = (
+        'Deletes seed files from the media directory that are older than the retention '
+        'period, then evicts the oldest remaining files if the directory is over its size cap.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, default=settings.SEED_RETENTION_DAYS,
+                            help='Delete seeds older than this many days (default: %(default)s).')
+        parser.add_argument('--max-size', default=settings.SEED_MEDIA_MAX_BYTES,
+                            help="Total size cap for the media directory, e.g. '20G'. Oldest seeds go first.")
+        parser.add_argument('--workers', type=int, default=settings.SEED_CLEANUP_WORKERS,
+                            help='Threads used to unlink files in parallel.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be deleted without deleting anything.')
 
     def handle(self, *args, **options):
         self.stdout.write('Starting cleanup of old seed files...')
-        
+
         # Path to the seeds directory from settings.py
         seeds_dir = Path(settings.MEDIA_ROOT)
         if not seeds_dir.is_dir():
             self.stdout.write(self.style.ERROR(f"Directory not found: {seeds_dir}"))
             return
 
-        # 30 days in seconds (30 days * 24 hours/day * 60 minutes/hour * 60 seconds/minute)
-        retention_period_seconds = 30 * 24 * 60 * 60
-        now = time.time()
-        files_deleted = 0
-
-        for file_path in seeds_dir.glob('*.zip'):
-            if file_path.is_file():
-                try:
-                    # Get the file's modification time
-                    file_mod_time = os.path.getmtime(file_path)
-                    if (now - file_mod_time) > retention_period_seconds:
-                        file_path.unlink() # Delete the file
-                        self.stdout.write(f'Deleted old file: {file_path.name}')
-                        files_deleted += 1
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Error processing {file_path.name}: {e}"))
-        
-        self.stdout.write(self.style.SUCCESS(f'Cleanup complete. Deleted {files_deleted} file(s).'))
\ No newline at end of file
+        try:
+            max_size = parse_size(options['max_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        report = run_cleanup(
+            seeds_dir, max_age_days=options['days'], max_total_bytes=max_size,
+            dry_run=options['dry_run'], workers=options['workers'],
+        )
+
+        verb = 'Would delete' if report['dry_run'] else 'Deleted'
+        if options['verbosity'] > 1:
+            for reason, entries in (('expired', report['expired']), ('over size cap', report['over_budget'])):
+                for path, size, _ in entries:
+                    self.stdout.write(f'{verb} ({reason}): {Path(path).name} [{size} bytes]')
+        for error in report['errors']:
+            self.stdout.write(self.style.ERROR(f"Error deleting {error}"))
+
+        self.stdout.write(
+            f"Scanned {report['files_scanned']} file(s) in {report['duration_ms']:.0f}ms: "
+            f"{len(report['expired'])} expired, {len(report['over_budget'])} over the size cap."
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Cleanup complete. {verb} {report['files_deleted']} file(s), "
+            f"{report['bytes_reclaimed'] / 1024 ** 2:.1f} MiB reclaimed, "
+            f"{report['bytes_remaining'] / 1024 ** 2:.1f} MiB remaining, "
+            f"{report['artifacts_removed']} download record(s) removed."
+        ))
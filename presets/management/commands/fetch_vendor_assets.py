@@ -0,0 +1,35 @@
+# presets/management/commands/fetch_vendor_assets.py
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from presets.assets import VENDOR_ASSETS
+
+
+class Command(BaseCommand):
+    help = (
+        'Downloads the pinned front-end libraries (Pico, Select2, jQuery) into static/vendor/ '
+        'so collectstatic can hash and precompress them instead of pages loading them from a CDN.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-download files that already exist.')
+
+    def handle(self, *args, **options):
+        static_dir = Path(settings.STATICFILES_DIRS[0])
+        for name, (path, url) in VENDOR_ASSETS.items():
+            destination = static_dir / path
+            if destination.exists() and not options['force']:
+                self.stdout.write(f"{name}: already present")
+                continue
+            try:
+                response = requests.get(url, timeout=30)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                raise CommandError(f"Could not download {name} from {url}: {e}")
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            destination.write_bytes(response.content)
+            self.stdout.write(f"{name}: {len(response.content)} bytes -> {destination}")
+        self.stdout.write(self.style.SUCCESS('Vendor assets are in place. Run collectstatic to publish them.'))
@@ -0,0 +1,22 @@
+# presets/management/commands/flag_usage.py
+from django.core.management.base import BaseCommand
+
+from presets.flag_index import flag_usage
+
+
+class Command(BaseCommand):
+    help = 'Lists the most used flags across visible presets, from the flag index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='', help="Only flags starting with this; the leading dash is optional, e.g. 'o' for objectives.")
+        parser.add_argument('--values', action='store_true', help='Count flag/value pairs instead of flags.')
+        parser.add_argument('--top', type=int, default=20)
+
+    def handle(self, *args, **options):
+        # argparse won't take '-o' as an option value, so the dash is added here.
+        prefix = options['prefix']
+        if prefix and not prefix.startswith('-'):
+            prefix = '-' + prefix
+        for row in flag_usage(prefix=prefix, with_values=options['values'], limit=options['top']):
+            label = f"{row['flag']} {row['value']}".rstrip() if options['values'] else row['flag']
+            self.stdout.write(f"{row['presets']:>6}  {label}")
@@ -0,0 +1,24 @@
+# presets/management/commands/invalidate_cache.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from presets.caching import bump_namespace, clear_alias
+
+
+class Command(BaseCommand):
+    help = 'Invalidates one cache alias, or a single versioned namespace within it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('alias', help=f"One of: {', '.join(settings.CACHES)}.")
+        parser.add_argument('namespace', nargs='?', help="Bump only this namespace (e.g. 'flags' in validation) instead of clearing the alias.")
+
+    def handle(self, *args, **options):
+        alias = options['alias']
+        if alias not in settings.CACHES:
+            raise CommandError(f"Unknown cache alias '{alias}'.")
+        if options['namespace']:
+            bump_namespace(alias, options['namespace'])
+            self.stdout.write(self.style.SUCCESS(f"Bumped namespace '{options['namespace']}' in cache '{alias}'."))
+        else:
+            clear_alias(alias)
+            self.stdout.write(self.style.SUCCESS(f"Cleared cache '{alias}'."))
@@ -0,0 +1,47 @@
+# presets/management/commands/rehome_seeds.py
+import os
+from pathlib import Path
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from presets.cleanup import SEED_SUFFIX
+from presets.media import shard_relpath, seed_path
+
+
+class Command(BaseCommand):
+    help = 'Moves seed files from the flat media directory into hash-prefixed shard directories.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would move without moving anything.')
+
+    def handle(self, *args, **options):
+        seeds_dir = Path(settings.MEDIA_ROOT)
+        if not seeds_dir.is_dir():
+            self.stdout.write(self.style.ERROR(f"Directory not found: {seeds_dir}"))
+            return
+
+        moved, errors = 0, 0
+        with os.scandir(seeds_dir) as iterator:
+            flat_files = [
+                entry.name for entry in iterator
+                if entry.name.endswith(SEED_SUFFIX) and entry.is_file(follow_symlinks=False)
+            ]
+
+        for filename in flat_files:
+            destination = seed_path(shard_relpath(filename))
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{filename} -> {destination.relative_to(seeds_dir)}")
+            if options['dry_run']:
+                moved += 1
+                continue
+            try:
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                # Same filesystem, so this is an atomic rename rather than a copy.
+                os.replace(seeds_dir / filename, destination)
+                moved += 1
+            except OSError as e:
+                errors += 1
+                self.stdout.write(self.style.ERROR(f"Error moving {filename}: {e}"))
+
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {moved} seed file(s) into shards. {errors} error(s)."))
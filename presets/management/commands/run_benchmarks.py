@@ -0,0 +1,285 @@
+# presets/management/commands/run_benchmarks.py
+import json
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections, router
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from allauth.socialaccount.models import SocialAccount
+from celery.backends.cache import CacheBackend
+from seedbot_project.celery import app as celery_app
+from presets import flag_processor
+from presets.caching import in_memory_caches
+from presets.models import Preset, SeedLog, FeaturedPreset, UserPermission, RollTiming
+from presets.tasks import create_local_seed_task
+from presets.timing import stage_summaries
+
+BENCH_DISCORD_ID = 123456789012345678
+# The bot's roll log is a plain rowid table; timestamps are not unique there.
+SEEDLIST_DDL = '''
+CREATE TABLE seedlist (
+    creator_id INTEGER, creator_name TEXT, seed_type TEXT, share_url TEXT,
+    timestamp TEXT, server_name TEXT, server_id INTEGER,
+    channel_name TEXT, channel_id INTEGER
+)
+'''
+SAMPLE_FLAGS = [
+    "-cg -oa 2.3.3.2.14.14.4.27.27.6.8.8 -sc1 random -sc2 random -sl -move as -ccsr 20 -sisr 30",
+    "-open -oa 2.5.5.1.r.1.r -cspr 0.1.2.3.4.5.6.7.8.9.10.11.12.13.14.15.18.19.20.21 -ymascot -frm",
+    "-cg -sc1 terra -sc2 edgar -move bd -ccrt -sirt -hf -nxppd -sl",
+]
+SAMPLE_ARGUMENTS = ['', 'dash', 'kupo loot', 'fancygau emptychests emptyshops', 'yeet noflashes mystery', 'cg hundo spoilers']
+
+# Stand-in generator: writes a fake ROM and spoiler log to the -o path.
+STUB_WC_PY = '''
+import sys
+from pathlib import Path
+out = Path(sys.argv[sys.argv.index("-o") + 1])
+out.write_bytes(b"\\0" * 3 * 1024 * 1024)
+out.with_suffix(".txt").write_text("spoiler log\\n")
+'''
+STUB_JDM_PY = '''
+import sys
+from pathlib import Path
+Path(sys.argv[sys.argv.index("--spoiler") + 1]).write_text("music swaps\\n")
+'''
+
+
+class StubWCApiHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the WorldsCollide seed API."""
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({'url': 'https://ff6worldscollide.com/seed/benchmark'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _timings(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'p50_ms': round(samples[len(samples) // 2], 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'min_ms': round(samples[0], 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the offline benchmark suite (views, flag processing, local roll pipeline) '
+        'against scratch databases and prints machine-readable JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=int, nargs='+', default=[100, 1000, 5000],
+                            help='Number of synthetic presets to seed per run. Each preset gets ~10 roll log rows.')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed iterations per view benchmark.')
+        parser.add_argument('--pipeline-rolls', type=int, default=5, help='Local roll pipeline runs per scale.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--seed', type=int, default=1234, help='Random seed for synthetic data.')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with tempfile.TemporaryDirectory(prefix='seedbot-bench-') as scratch:
+            scratch = Path(scratch)
+            self._use_scratch_databases(scratch)
+            stub_root = self._build_stub_seedbot2000(scratch)
+            # Progress updates go to an in-process result store instead of Redis.
+            create_local_seed_task.backend = CacheBackend(app=celery_app, backend='memory')
+
+            api_server = ThreadingHTTPServer(('127.0.0.1', 0), StubWCApiHandler)
+            threading.Thread(target=api_server.serve_forever, daemon=True).start()
+            api_url = f'http://127.0.0.1:{api_server.server_address[1]}/api/seed'
+
+            results = [self._bench_apply_args()]
+            with override_settings(
+                ALLOWED_HOSTS=['testserver'], BASE_DIR=stub_root / 'seedbot_webapp',
+                MEDIA_ROOT=str(scratch / 'media'), PROFILING_SAMPLE_RATE=0, WC_API_URL=api_url,
+                ROLL_LOG_BUFFERED=False, CACHES=in_memory_caches(),
+            ), mock.patch('presets.roll_log.write_rows_to_gsheets'):
+                (scratch / 'media').mkdir()
+                for scale in options['scales']:
+                    self._seed_data(scale)
+                    results.extend(self._bench_views(scale, options['iterations']))
+                    results.extend(self._bench_pipeline(scale, options['pipeline_rolls']))
+            api_server.shutdown()
+
+        report = {'meta': self._meta(options), 'results': results}
+        body = json.dumps(report, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(body + '\n', encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}"))
+        else:
+            self.stdout.write(body)
+
+    # --- Environment ---
+
+    def _use_scratch_databases(self, scratch):
+        """Points every alias at a throwaway SQLite file and builds the schema there."""
+        for alias in connections:
+            connections[alias].close()
+            name = str(scratch / f'{alias}.sqlite3')
+            connections[alias].settings_dict['NAME'] = name
+            settings.DATABASES[alias]['NAME'] = name
+        for alias in connections:
+            call_command('migrate', database=alias, verbosity=0)
+        # The bot owns these tables, so migrations never create them.
+        with connections['seedbot_db'].schema_editor() as editor:
+            for model in apps.get_app_config('presets').get_models():
+                if not model._meta.managed and model is not SeedLog:
+                    editor.create_model(model)
+            editor.execute(SEEDLIST_DDL)
+
+    def _build_stub_seedbot2000(self, scratch):
+        root = scratch / 'root'
+        main_wc = root / 'seedbot2000' / 'WorldsCollide'
+        main_wc.mkdir(parents=True)
+        (root / 'seedbot_webapp').mkdir()
+        (main_wc / 'ff3.smc').write_bytes(b'\0' * 3 * 1024 * 1024)
+        (main_wc / 'wc.py').write_text(STUB_WC_PY)
+        (root / 'seedbot2000' / 'run_johnnydmad.py').write_text(STUB_JDM_PY)
+        return root
+
+    def _meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'scales': options['scales'],
+            'seed': options['seed'],
+        }
+
+    # --- Synthetic data ---
+
+    def _seed_data(self, scale):
+        # Raw deletes: skip per-row delete signals when resetting between scales.
+        for model in (Preset, SeedLog, FeaturedPreset, UserPermission, RollTiming):
+            with connections[router.db_for_write(model)].cursor() as cursor:
+                cursor.execute(f'DELETE FROM {model._meta.db_table}')
+
+        presets = [
+            Preset(
+                preset_name=f'Bench Preset {i}', creator_id=BENCH_DISCORD_ID if i % 20 == 0 else 1000 + i,
+                creator_name=f'user{i % 50}', created_at='Jan 01 2025',
+                flags=random.choice(SAMPLE_FLAGS), description=f'Synthetic preset number {i}',
+                arguments=random.choice(SAMPLE_ARGUMENTS), official=i % 10 == 0,
+                hidden=i % 15 == 0, gen_count=random.randint(0, 5000),
+            )
+            for i in range(scale)
+        ]
+        Preset.objects.bulk_create(presets, batch_size=500)
+        FeaturedPreset.objects.bulk_create(FeaturedPreset(preset_name=p.preset_name) for p in presets[:5])
+
+        start = datetime(2025, 1, 1)
+        SeedLog.objects.bulk_create((
+            SeedLog(
+                creator_id=BENCH_DISCORD_ID if i % 5 == 0 else 1000 + i % 300,
+                creator_name='bench', seed_type=f'Bench Preset {random.randrange(scale)}',
+                share_url=f'/media/bench_{i}.zip', server_name='WebApp',
+                timestamp=(start + timedelta(seconds=i)).strftime('%b %d %Y %H:%M:%S'),
+            )
+            for i in range(scale * 10)
+        ), batch_size=1000)
+        UserPermission.objects.create(user_id=BENCH_DISCORD_ID, bot_admin=1, git_user=0, race_admin=1)
+
+    def _bench_client(self):
+        user, _ = get_user_model().objects.get_or_create(username='bench')
+        SocialAccount.objects.get_or_create(user=user, provider='discord', uid=str(BENCH_DISCORD_ID))
+        client = Client()
+        client.force_login(user)
+        return client
+
+    # --- Benchmarks ---
+
+    def _bench_apply_args(self):
+        pairs = [(flags, args) for flags in SAMPLE_FLAGS for args in SAMPLE_ARGUMENTS]
+        calls = 20000
+        start = time.perf_counter()
+        for i in range(calls):
+            flags, args = pairs[i % len(pairs)]
+            flag_processor.apply_args(flags, args)
+        elapsed = time.perf_counter() - start
+        return {'name': 'flag_processor.apply_args', 'scale': None, 'calls': calls,
+                'calls_per_sec': round(calls / elapsed, 1)}
+
+    def _bench_views(self, scale, iterations):
+        anonymous = Client()
+        logged_in = self._bench_client()
+        detail_url = reverse('preset-detail', args=[f'Bench Preset {scale // 2}'])
+        roll_url = reverse('roll-seed', args=['Bench Preset 1'])
+        cases = [
+            ('preset_list_view', lambda: anonymous.get(reverse('preset-list'))),
+            ('preset_list_view[search]', lambda: anonymous.get(reverse('preset-list'), {'q': 'number 1'})),
+            ('preset_list_view[logged_in]', lambda: logged_in.get(reverse('preset-list'))),
+            ('preset_detail_view', lambda: anonymous.get(detail_url)),
+            ('my_presets_view', lambda: logged_in.get(reverse('my-presets'))),
+            ('roll_seed_dispatcher_view[api]', lambda: anonymous.post(roll_url)),
+        ]
+        results = []
+        for name, fn in cases:
+            response = fn()
+            if response.status_code != 200:
+                raise RuntimeError(f'{name} returned HTTP {response.status_code}')
+            results.append({'name': name, 'scale': scale, **_timings(fn, iterations)})
+        return results
+
+    def _bench_pipeline(self, scale, rolls):
+        preset = Preset.objects.order_by('preset_name').first()
+        preset.arguments = 'tunes'
+        preset.save(update_fields=['arguments'])
+
+        def roll():
+            result = create_local_seed_task.apply(args=[preset.pk, BENCH_DISCORD_ID, 'bench'])
+            if result.failed():
+                raise RuntimeError(f'Local roll failed: {result.result}')
+
+        results = [{'name': 'create_local_seed_task', 'scale': scale, **_timings(roll, rolls)}]
+        for summary in stage_summaries(hours=1):
+            result = {
+                'name': f"create_local_seed_task.{summary['stage']}", 'scale': scale,
+                'iterations': summary['count'], 'mean_ms': round(summary['mean'], 3),
+                'p50_ms': round(summary['p50'], 3), 'p95_ms': round(summary['p95'], 3),
+            }
+            if summary['cpu_mean'] is not None:
+                result['cpu_mean_ms'] = round(summary['cpu_mean'], 3)
+            if summary['max_rss_kb'] is not None:
+                result['max_rss_kb'] = summary['max_rss_kb']
+            results.append(result)
+        return results
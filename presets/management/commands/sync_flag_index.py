@@ -0,0 +1,17 @@
+# presets/management/commands/sync_flag_index.py
+from django.core.management.base import BaseCommand
+
+from presets.flag_index import sync_flag_index
+
+
+class Command(BaseCommand):
+    help = 'Backfills the flag index from the presets table, re-indexing presets whose flags changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Drop the index and rebuild it from scratch.')
+
+    def handle(self, *args, **options):
+        result = sync_flag_index(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {result['indexed']} preset(s), removed {result['removed']} stale entr{'y' if result['removed'] == 1 else 'ies'}."
+        ))
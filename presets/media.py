@@ -0,0 +1,68 @@
+# presets/media.py
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import reverse
+
+# Seeds live two hash-prefixed levels deep, e.g. 'ab/cd/<name>.zip', which keeps
+# every directory small no matter how many seeds accumulate.
+SHARD_DEPTH = 2
+
+
+def shard_relpath(filename):
+    """Returns the sharded path of a seed file, relative to MEDIA_ROOT."""
+    digest = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+    parts = [digest[i * 2:i * 2 + 2] for i in range(SHARD_DEPTH)]
+    return '/'.join(parts + [filename])
+
+def seed_path(relpath):
+    return Path(settings.MEDIA_ROOT) / relpath
+
+def seed_url(relpath):
+    return f'{settings.MEDIA_URL}{relpath}'
+
+def relpath_from_url(share_url):
+    """The MEDIA_ROOT-relative path behind a local share URL, or None for external URLs."""
+    if not share_url or not share_url.startswith(settings.MEDIA_URL):
+        return None
+    return share_url[len(settings.MEDIA_URL):]
+
+def download_url_for(share_url):
+    """The tracked download URL for a locally stored seed, or the share URL unchanged."""
+    relpath = relpath_from_url(share_url)
+    if relpath is None:
+        return share_url
+    return reverse('seed-download', args=[relpath])
+
+def is_safe_relpath(relpath):
+    parts = relpath.split('/')
+    return bool(relpath) and not relpath.startswith('/') and '..' not in parts and '' not in parts
+
+def store_seed(source, filename):
+    """Moves a finished seed archive into its shard and returns its relative path."""
+    relpath = shard_relpath(filename)
+    destination = seed_path(relpath)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    # Scratch space is usually tmpfs, so this is a copy; land it under a
+    # temporary name and rename it into place so no partial seed is visible.
+    partial = destination.with_name(destination.name + '.part')
+    shutil.move(source, partial)
+    os.replace(partial, destination)
+    return relpath
+
+def resolve_legacy_seed(filename):
+    """
+    Finds a seed that was stored under the old flat layout. Returns its
+    current relative path (sharded if it has been rehomed), or None.
+    """
+    if '/' in filename or filename.startswith('.'):
+        return None
+    sharded = shard_relpath(filename)
+    if seed_path(sharded).is_file():
+        return sharded
+    if seed_path(filename).is_file():
+        return filename
+    return None
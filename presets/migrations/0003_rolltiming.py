@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0002_seedlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollTiming',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('roll_id', models.CharField(db_index=True, max_length=255)),
+                ('preset_name', models.CharField(max_length=255)),
+                ('script_dir', models.CharField(blank=True, max_length=255)),
+                ('stage', models.CharField(max_length=32)),
+                ('duration_ms', models.FloatField()),
+                ('succeeded', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['stage', 'created_at'], name='presets_rol_stage_d661f7_idx')],
+            },
+        ),
+    ]
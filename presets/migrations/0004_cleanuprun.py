@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0003_rolltiming'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CleanupRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('dry_run', models.BooleanField(default=False)),
+                ('files_scanned', models.IntegerField(default=0)),
+                ('files_deleted', models.IntegerField(default=0)),
+                ('bytes_reclaimed', models.BigIntegerField(default=0)),
+                ('bytes_remaining', models.BigIntegerField(default=0)),
+                ('duration_ms', models.FloatField(default=0)),
+            ],
+        ),
+    ]
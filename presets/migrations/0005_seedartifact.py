@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0004_cleanuprun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeedArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('relpath', models.CharField(max_length=512, unique=True)),
+                ('preset_name', models.CharField(max_length=255)),
+                ('creator_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('download_count', models.IntegerField(default=0)),
+                ('last_downloaded_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0005_seedartifact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PooledSeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('preset_name', models.CharField(max_length=255)),
+                ('flags_hash', models.CharField(max_length=64)),
+                ('relpath', models.CharField(max_length=512, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['preset_name', 'claimed_at', 'created_at'], name='presets_poo_preset__a2d19f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0006_pooledseed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkRollBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('preset_name', models.CharField(max_length=255)),
+                ('creator_id', models.BigIntegerField()),
+                ('creator_name', models.CharField(max_length=255)),
+                ('requested', models.IntegerField()),
+                ('completed', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('status', models.CharField(default='running', max_length=16)),
+                ('archive_relpath', models.CharField(blank=True, max_length=512)),
+                ('manifest', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0007_bulkrollbatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresetTrendingScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('preset_name', models.CharField(max_length=255, unique=True)),
+                ('score', models.FloatField(db_index=True)),
+                ('last_row_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
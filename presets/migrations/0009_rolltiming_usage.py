@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0008_presettrendingscore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rolltiming',
+            name='cpu_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rolltiming',
+            name='max_rss_kb',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
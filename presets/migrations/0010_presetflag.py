@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0009_rolltiming_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresetFlagSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('preset_name', models.CharField(max_length=255, unique=True)),
+                ('source_hash', models.CharField(max_length=64)),
+                ('flag_count', models.IntegerField(default=0)),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PresetFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('preset_name', models.CharField(db_index=True, max_length=255)),
+                ('flag', models.CharField(max_length=64)),
+                ('value', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['flag', 'value'], name='presets_pre_flag_8b68ff_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0010_presetflag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='presetflagset',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
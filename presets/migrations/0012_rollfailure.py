@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0011_presetflagset_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollFailure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signature', models.CharField(max_length=64, unique=True)),
+                ('script_dir', models.CharField(blank=True, max_length=255)),
+                ('error_type', models.CharField(max_length=64)),
+                ('exit_code', models.IntegerField(blank=True, null=True)),
+                ('preset_name', models.CharField(max_length=255)),
+                ('flags_hash', models.CharField(max_length=64)),
+                ('message', models.CharField(max_length=300)),
+                ('stderr', models.TextField(blank=True)),
+                ('timings', models.JSONField(blank=True, default=dict)),
+                ('count', models.IntegerField(default=1)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0012_rollfailure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seedartifact',
+            name='shared',
+            field=models.BooleanField(default=False),
+        ),
+    ]
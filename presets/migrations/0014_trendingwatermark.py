@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:49
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def watermark_from_scores(apps, schema_editor):
+    """Carries over the highest rowid the existing scores have folded in, so nothing is counted twice."""
+    PresetTrendingScore = apps.get_model('presets', 'PresetTrendingScore')
+    TrendingWatermark = apps.get_model('presets', 'TrendingWatermark')
+    last_row_id = PresetTrendingScore.objects.using(schema_editor.connection.alias).aggregate(last=Max('last_row_id'))['last']
+    if last_row_id is not None:
+        TrendingWatermark.objects.using(schema_editor.connection.alias).create(pk=1, last_row_id=last_row_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0013_seedartifact_shared'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_row_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(watermark_from_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presets', '0014_trendingwatermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trendingwatermark',
+            name='last_timestamp',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
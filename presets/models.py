@@ -1,7 +1,9 @@
 from django.db import models
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .catalog import bump_catalog_version
+
 class Preset(models.Model):
     preset_name = models.CharField(max_length=255, primary_key=True)
     creator_id = models.BigIntegerField() 
@@ -58,6 +60,188 @@ class SeedLog(models.Model):
         managed = False
         db_table = 'seedlist'
 
+
+# --- Webapp-owned models (stored in the default database) ---
+class RollTiming(models.Model):
+    """
+    Wall-clock duration of a single stage of the local roll pipeline.
+    Every local roll writes one row per stage it reached. Stages that run a
+    sandboxed subprocess also record its CPU time and peak RSS. The metrics
+    sheet append is timed once per roll log write, with no roll_id.
+    """
+    roll_id = models.CharField(max_length=255, db_index=True)
+    preset_name = models.CharField(max_length=255)
+    script_dir = models.CharField(max_length=255, blank=True)
+    stage = models.CharField(max_length=32)
+    duration_ms = models.FloatField()
+    cpu_ms = models.FloatField(null=True, blank=True)
+    max_rss_kb = models.IntegerField(null=True, blank=True)
+    succeeded = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['stage', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.preset_name} [{self.stage}] {self.duration_ms:.0f}ms"
+
+class SeedArtifact(models.Model):
+    """
+    A seed archive stored under MEDIA_ROOT. Tracks who rolled it (for download
+    ownership checks), when (for expiry) and how often it has been downloaded.
+    Shared seeds (those of a bulk roll) can be downloaded by anyone with the link.
+    """
+    relpath = models.CharField(max_length=512, unique=True)
+    preset_name = models.CharField(max_length=255)
+    creator_id = models.BigIntegerField()
+    shared = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    download_count = models.IntegerField(default=0)
+    last_downloaded_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return self.relpath
+
+class CleanupRun(models.Model):
+    """Outcome of one pass of the seed retention policy over MEDIA_ROOT."""
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    dry_run = models.BooleanField(default=False)
+    files_scanned = models.IntegerField(default=0)
+    files_deleted = models.IntegerField(default=0)
+    bytes_reclaimed = models.BigIntegerField(default=0)
+    bytes_remaining = models.BigIntegerField(default=0)
+    duration_ms = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"Cleanup {self.created_at:%Y-%m-%d %H:%M}: {self.files_deleted} file(s)"
+
+class PooledSeed(models.Model):
+    """
+    A seed generated ahead of demand for a popular preset. Unclaimed entries
+    are handed out instantly on roll; `flags_hash` ties each one to the
+    preset's flags at generation time so stale seeds are never served.
+    """
+    preset_name = models.CharField(max_length=255)
+    flags_hash = models.CharField(max_length=64)
+    relpath = models.CharField(max_length=512, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['preset_name', 'claimed_at', 'created_at'])]
+
+    def __str__(self):
+        state = 'claimed' if self.claimed_at else 'available'
+        return f"{self.preset_name}: {self.relpath} ({state})"
+
+class BulkRollBatch(models.Model):
+    """A race admin's request for many seeds of one preset, generated in parallel."""
+    STATUS_RUNNING = 'running'
+    STATUS_FINISHED = 'finished'
+    STATUS_FAILED = 'failed'
+
+    preset_name = models.CharField(max_length=255)
+    creator_id = models.BigIntegerField()
+    creator_name = models.CharField(max_length=255)
+    requested = models.IntegerField()
+    completed = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    status = models.CharField(max_length=16, default=STATUS_RUNNING)
+    archive_relpath = models.CharField(max_length=512, blank=True)
+    manifest = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.preset_name} x{self.requested} ({self.status})"
+
+class PresetTrendingScore(models.Model):
+    """
+    Time-decayed roll count of a preset, maintained incrementally from the
+    roll log (see presets.trending). `score` is stored in log2 space relative
+    to a fixed epoch, so ordering by it ranks presets by their decayed
+    popularity at any moment without rewriting old rows as time passes.
+    """
+    preset_name = models.CharField(max_length=255, unique=True)
+    score = models.FloatField(db_index=True)
+    # Highest seedlist rowid folded into this score.
+    last_row_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.preset_name}: {self.score:.3f}"
+
+class TrendingWatermark(models.Model):
+    """
+    The highest seedlist rowid folded into the trending scores. A single row,
+    kept apart from the scores so that it also advances past rolls that
+    score nothing (deleted presets, or anything before the first score).
+    The seedlist has no INTEGER PRIMARY KEY, so a VACUUM may renumber its
+    rowids; `last_timestamp` is that row's timestamp, checked before the
+    watermark is trusted.
+    """
+    last_row_id = models.BigIntegerField(default=0)
+    last_timestamp = models.CharField(max_length=64, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"trending watermark at row {self.last_row_id}"
+
+class RollFailure(models.Model):
+    """
+    A group of failed rolls sharing an error signature (see presets.failures).
+    Repeats only bump `count` and refresh the latest example, and the number
+    of groups is capped, so failures can't grow the table without bound.
+    """
+    signature = models.CharField(max_length=64, unique=True)
+    script_dir = models.CharField(max_length=255, blank=True)
+    error_type = models.CharField(max_length=64)
+    exit_code = models.IntegerField(null=True, blank=True)
+    # Latest occurrence.
+    preset_name = models.CharField(max_length=255)
+    flags_hash = models.CharField(max_length=64)
+    message = models.CharField(max_length=300)
+    stderr = models.TextField(blank=True)
+    timings = models.JSONField(default=dict, blank=True)
+    count = models.IntegerField(default=1)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.error_type} x{self.count}: {self.message}"
+
+class PresetFlag(models.Model):
+    """
+    One flag of a preset, as rolled (arguments applied), for flag-level
+    search and analytics (see presets.flag_index). Derived from
+    Preset.flags; never edited directly.
+    """
+    preset_name = models.CharField(max_length=255, db_index=True)
+    flag = models.CharField(max_length=64)
+    value = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['flag', 'value'])]
+
+    def __str__(self):
+        return f"{self.preset_name}: {self.flag} {self.value}".rstrip()
+
+class PresetFlagSet(models.Model):
+    """
+    Which version of a preset's flags is in the PresetFlag index, how many
+    flags it has and its canonical flag fingerprint, used to spot presets
+    that duplicate one another.
+    """
+    preset_name = models.CharField(max_length=255, unique=True)
+    source_hash = models.CharField(max_length=64)
+    flag_count = models.IntegerField(default=0)
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.preset_name} ({self.flag_count} flags)"
+
+
 @receiver(post_delete, sender=Preset)
 def delete_featured_preset_on_preset_delete(sender, instance, **kwargs):
     """
@@ -68,4 +252,52 @@ def delete_featured_preset_on_preset_delete(sender, instance, **kwargs):
         FeaturedPreset.objects.filter(preset_name=instance.pk).delete()
         print(f"Cleaned up featured entry for deleted preset: {instance.pk}")
     except Exception as e:
-        print(f"Error during featured preset cleanup: {e}")
\ No newline at end of file
+        print(f"Error during featured preset cleanup: {e}")
+@receiver(post_save, sender=Preset)
+def invalidate_seed_pool_on_preset_save(sender, instance, update_fields=None, **kwargs):
+    """Drops pooled seeds that no longer match the preset's flags or arguments."""
+    if update_fields and set(update_fields) <= {'gen_count'}:
+        return
+    from .seed_pool import invalidate_pool
+    try:
+        invalidate_pool(instance)
+    except Exception as e:
+        print(f"Error during seed pool invalidation: {e}")
+
+@receiver(post_delete, sender=Preset)
+def delete_seed_pool_on_preset_delete(sender, instance, **kwargs):
+    from .seed_pool import invalidate_pool
+    try:
+        invalidate_pool(instance, keep_current=False)
+    except Exception as e:
+        print(f"Error during seed pool cleanup: {e}")
+
+@receiver(post_save, sender=Preset)
+def index_flags_on_preset_save(sender, instance, update_fields=None, **kwargs):
+    """Keeps the flag index current for presets edited through the site."""
+    if update_fields and set(update_fields) <= {'gen_count'}:
+        return
+    from .flag_index import index_preset
+    try:
+        index_preset(instance)
+    except Exception as e:
+        print(f"Error during flag indexing: {e}")
+
+@receiver(post_delete, sender=Preset)
+def remove_flags_on_preset_delete(sender, instance, **kwargs):
+    from .flag_index import remove_preset
+    try:
+        remove_preset(instance.pk)
+    except Exception as e:
+        print(f"Error during flag index cleanup: {e}")
+
+@receiver(post_save, sender=Preset)
+@receiver(post_delete, sender=Preset)
+@receiver(post_save, sender=FeaturedPreset)
+@receiver(post_delete, sender=FeaturedPreset)
+def bump_catalog_version_on_change(sender, **kwargs):
+    """Pages validated against the old catalog version must be re-rendered."""
+    try:
+        bump_catalog_version()
+    except Exception as e:
+        print(f"Error during catalog version bump: {e}")
@@ -0,0 +1,212 @@
+# presets/profiling.py
+import cProfile
+import hmac
+import io
+import json
+import pstats
+import random
+import re
+import time
+import uuid
+from contextlib import ExitStack
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+PROFILE_HEADER = 'HTTP_X_SEEDBOT_PROFILE'
+MAX_RECORDED_QUERIES = 500
+PROFILE_TEXT_LINES = 60
+
+_current_profile = ContextVar('seedbot_profile', default=None)
+
+
+# --- Template timing ---
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current_profile.get()
+        if profile is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile['template_ms'] += (time.perf_counter() - start) * 1000
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """
+    The stock Django template backend, except top-level renders are timed
+    while a request is being profiled. Includes are counted in their parent.
+    """
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return ProfiledTemplate(template.template, self)
+
+
+# --- Middleware ---
+
+class _QueryRecorder:
+    def __init__(self, alias, profile):
+        self.alias = alias
+        self.profile = profile
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stats = self.profile['databases'].setdefault(self.alias, {'queries': 0, 'time_ms': 0.0})
+            stats['queries'] += 1
+            stats['time_ms'] += elapsed_ms
+            if len(self.profile['sql']) < MAX_RECORDED_QUERIES:
+                self.profile['sql'].append({'alias': self.alias, 'sql': sql, 'time_ms': elapsed_ms})
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in per-request profiling. A request is profiled when it carries an
+    `X-Seedbot-Profile` header matching settings.PROFILING_TOKEN, or when it
+    is picked by settings.PROFILING_SAMPLE_RATE. Profiled requests record
+    wall time, SQL count/time per database alias, template render time and
+    a cProfile summary into the local store under settings.PROFILING_DIR.
+
+    Under ASGI, unprofiled requests stay on the event loop. Profiled ones run
+    the rest of the chain in the thread-sensitive worker so that cProfile and
+    the query recorders see the work the request actually does.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _should_profile(self, request):
+        if request.path.startswith('/ops/profiles/'):
+            return False
+        token = request.META.get(PROFILE_HEADER)
+        if token and settings.PROFILING_TOKEN and hmac.compare_digest(token, settings.PROFILING_TOKEN):
+            return True
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._should_profile(request):
+            return self.get_response(request)
+        return self._profile(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not self._should_profile(request):
+            return await self.get_response(request)
+        return await sync_to_async(self._profile)(request, async_to_sync(self.get_response))
+
+    def _profile(self, request, get_response):
+        profile = {
+            'id': uuid.uuid4().hex[:12],
+            'method': request.method,
+            'path': request.get_full_path(),
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'databases': {},
+            'sql': [],
+            'template_ms': 0.0,
+        }
+        token = _current_profile.set(profile)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_QueryRecorder(alias, profile)))
+                profiler.enable()
+                try:
+                    response = get_response(request)
+                finally:
+                    profiler.disable()
+        finally:
+            _current_profile.reset(token)
+
+        profile['wall_ms'] = (time.perf_counter() - start) * 1000
+        profile['status'] = response.status_code
+        profile['profile_text'] = _format_profile(profiler)
+        save_profile(profile)
+        response['X-Seedbot-Profile-Id'] = profile['id']
+        return response
+
+
+def _format_profile(profiler):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(PROFILE_TEXT_LINES)
+    return stream.getvalue()
+
+
+# --- Rotating store ---
+
+def _profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+def save_profile(profile):
+    """Writes one profile record and drops the oldest beyond PROFILING_MAX_RECORDS."""
+    try:
+        directory = _profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')
+        with open(directory / f"{stamp}-{profile['id']}.json", 'w', encoding='utf-8') as f:
+            json.dump(profile, f)
+
+        records = sorted(directory.glob('*.json'))
+        for stale in records[:-settings.PROFILING_MAX_RECORDS]:
+            stale.unlink(missing_ok=True)
+    except OSError as e:
+        print(f"Unable to save request profile: {e}")
+
+def list_profiles(limit=100):
+    """Returns the newest profile records without their SQL or cProfile payloads."""
+    directory = _profile_dir()
+    if not directory.is_dir():
+        return []
+    summaries = []
+    for path in sorted(directory.glob('*.json'), reverse=True)[:limit]:
+        try:
+            with open(path, encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            continue
+        record.pop('sql', None)
+        record.pop('profile_text', None)
+        record['total_queries'] = sum(db['queries'] for db in record['databases'].values())
+        summaries.append(record)
+    return summaries
+
+def load_profile(profile_id):
+    if not re.fullmatch(r'[0-9a-f]{12}', profile_id):
+        return None
+    matches = list(_profile_dir().glob(f'*-{profile_id}.json'))
+    if not matches:
+        return None
+    with open(matches[0], encoding='utf-8') as f:
+        record = json.load(f)
+    record['repeated_sql'] = _group_repeated_sql(record['sql'])
+    return record
+
+def _group_repeated_sql(queries):
+    """Groups statements by shape (literals stripped) so N+1 patterns stand out."""
+    groups = {}
+    for query in queries:
+        shape = re.sub(r"'[^']*'|\b\d+\b", '?', query['sql'])
+        group = groups.setdefault((query['alias'], shape), {'alias': query['alias'], 'sql': shape, 'count': 0, 'time_ms': 0.0})
+        group['count'] += 1
+        group['time_ms'] += query['time_ms']
+    return sorted((g for g in groups.values() if g['count'] > 1), key=lambda g: -g['count'])
@@ -0,0 +1,150 @@
+# presets/roll_log.py
+import json
+import time
+import uuid
+from collections import Counter
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import Preset, SeedLog
+from .catalog import bump_catalog_version_for_counts
+from .timing import record_stage
+from .utils import write_rows_to_gsheets
+
+# Roll log entries wait in BUFFER_KEY until the flush task moves a batch to
+# PROCESSING_KEY and writes it. A batch is only dropped from PROCESSING_KEY
+# once its transaction has committed, so a failed or interrupted flush is
+# retried by the next one instead of losing rolls.
+BUFFER_KEY = 'seedbot:roll_log'
+PROCESSING_KEY = 'seedbot:roll_log:processing'
+LOCK_KEY = 'seedbot:roll_log:lock'
+LOCK_TIMEOUT = 60
+
+_TAKE_BATCH = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('RPUSH', KEYS[2], unpack(items))
+    redis.call('LTRIM', KEYS[1], #items, -1)
+end
+return items
+"""
+
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_RENEW_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_redis = None
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=5)
+    return _redis
+
+
+def log_rolls(entries):
+    """
+    Records rolls in the shared roll log. `entries` are dicts of SeedLog
+    fields. They are staged in Redis for the next flush; if Redis can't be
+    reached they are written straight away instead.
+    """
+    if settings.ROLL_LOG_BUFFERED:
+        try:
+            get_redis().rpush(BUFFER_KEY, *[json.dumps(entry) for entry in entries])
+            return
+        except redis.RedisError as e:
+            print(f"Roll log buffer unavailable, writing directly: {e}")
+    write_rolls(entries)
+
+
+def _insert_rolls(entries):
+    """
+    Writes roll log entries and their gen_count increments to the SeedBot
+    database in a single transaction. Entries already in the seedlist (a
+    batch retried after a crash between commit and cleanup) are skipped, so
+    a retry never double counts. Returns the entries actually written.
+    """
+    with transaction.atomic(using='seedbot_db'):
+        existing = set(
+            SeedLog.objects.filter(timestamp__in={entry['timestamp'] for entry in entries})
+            .values_list('timestamp', 'creator_id', 'share_url')
+        )
+        fresh = [
+            entry for entry in entries
+            if (entry['timestamp'], entry['creator_id'], entry.get('share_url')) not in existing
+        ]
+        SeedLog.objects.bulk_create([SeedLog(**entry) for entry in fresh])
+        for preset_name, count in Counter(entry['seed_type'] for entry in fresh).items():
+            Preset.objects.filter(pk=preset_name).update(gen_count=F('gen_count') + count)
+    return fresh
+
+
+def _after_write(entries):
+    """Side effects of written rolls. Best effort: the rolls are committed either way."""
+    if not entries:
+        return
+    try:
+        # gen_count is shown on the catalog pages.
+        bump_catalog_version_for_counts()
+    except Exception as e:
+        print(f"Unable to bump the catalog version after a roll log write: {e}")
+    started = time.perf_counter()
+    try:
+        write_rows_to_gsheets(entries)
+        succeeded = True
+    except Exception as e:
+        print(f"Unable to append rolls to the metrics sheet: {e}")
+        succeeded = False
+    # Timed per write (a flush batch, or one roll when unbuffered) as the 'metrics' stage.
+    record_stage('metrics', (time.perf_counter() - started) * 1000, succeeded)
+
+
+def write_rolls(entries):
+    """Writes roll log entries straight to the SeedBot database, then to the metrics sheet."""
+    _after_write(_insert_rolls(entries))
+
+
+def flush_roll_log():
+    """
+    Drains the Redis buffer into the SeedBot database, one transaction per
+    ROLL_LOG_BATCH_SIZE entries. Only one flush runs at a time: the lock is
+    renewed before every batch and a flush that has lost it stops. Returns
+    the number of entries written.
+    """
+    client = get_redis()
+    token = uuid.uuid4().hex
+    if not client.set(LOCK_KEY, token, nx=True, ex=LOCK_TIMEOUT):
+        return 0
+    try:
+        written = 0
+        # Entries left behind by a flush that failed or was interrupted go first.
+        batch = client.lrange(PROCESSING_KEY, 0, -1)
+        while True:
+            if not client.eval(_RENEW_LOCK, 1, LOCK_KEY, token, LOCK_TIMEOUT):
+                print("Roll log flush lost its lock; leaving the rest to the next flush.")
+                return written
+            if not batch:
+                batch = client.eval(_TAKE_BATCH, 2, BUFFER_KEY, PROCESSING_KEY, settings.ROLL_LOG_BATCH_SIZE)
+            if not batch:
+                return written
+            entries = _insert_rolls([json.loads(item) for item in batch])
+            # Committed: the batch must not be written again, whatever happens next.
+            client.delete(PROCESSING_KEY)
+            _after_write(entries)
+            written += len(entries)
+            batch = None
+    finally:
+        client.eval(_RELEASE_LOCK, 1, LOCK_KEY, token)
@@ -0,0 +1,148 @@
+# presets/rolling.py
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from .models import SeedArtifact
+from .roll_log import log_rolls
+from .media import store_seed, relpath_from_url
+from .sandbox import run_sandboxed
+from .scratch import scratch_dir
+
+# Arguments that need a specific WorldsCollide fork rather than the main one.
+DIR_MAP = {
+    'practice': 'WorldsCollide_practice', 'doors': 'WorldsCollide_Door_Rando',
+    'dungeoncrawl': 'WorldsCollide_Door_Rando', 'doorslite': 'WorldsCollide_Door_Rando',
+    'maps': 'WorldsCollide_Door_Rando', 'mapx': 'WorldsCollide_Door_Rando',
+    'lg1': 'WorldsCollide_location_gating1', 'lg2': 'WorldsCollide_location_gating1',
+    'ws': 'WorldsCollide_shuffle_by_world', 'csi': 'WorldsCollide_shuffle_by_world',
+}
+
+
+def script_dir_name_for(args_list):
+    for arg in args_list:
+        if arg in DIR_MAP:
+            return DIR_MAP[arg]
+    return 'WorldsCollide'
+
+
+def build_seed(preset, final_flags, timer, progress=None):
+    """
+    Generates a seed locally: runs wc.py (plus JohnnyDMad for tunes presets)
+    in a scratch directory, zips the results and stores the archive under
+    MEDIA_ROOT.
+    Returns the archive's MEDIA_ROOT-relative path. Both scripts run in the
+    generator sandbox; failures are raised as subprocess.CalledProcessError.
+    """
+    progress = progress or (lambda status: None)
+    unique_id = str(uuid.uuid4())[:8]
+    filename_base = f"{preset.preset_name.replace(' ', '_').replace('/', '-')}_{unique_id}"
+    args_list = preset.arguments.split() if preset.arguments else []
+
+    project_root = settings.BASE_DIR.parent
+    seedbot2000_dir = project_root / 'seedbot2000'
+    main_wc_dir = seedbot2000_dir / 'WorldsCollide'
+
+    with scratch_dir() as temp_path:
+        output_smc = temp_path / f"{filename_base}.smc"
+
+        script_dir_name = script_dir_name_for(args_list)
+        script_dir = seedbot2000_dir / script_dir_name
+        timer.script_dir = script_dir_name
+        wc_script = script_dir / 'wc.py'
+
+        command = [
+            "python3", str(wc_script),
+            "-i", str(main_wc_dir / 'ff3.smc'),
+            "-o", str(output_smc)
+        ]
+        command.extend(final_flags.split())
+
+        progress('Generating Seed...')
+        with timer.stage('generator'):
+            result = run_sandboxed(command, cwd=script_dir, timeout=120)
+        timer.record_usage('generator', result.usage)
+
+        music_was_randomized = False
+        jdm_type = "standard"
+
+        if 'tunes' in args_list or 'ctunes' in args_list:
+            progress('Applying Tunes...')
+            music_was_randomized = True
+            music_log_path = temp_path / f"{filename_base}_music.txt"
+
+            if 'ctunes' in args_list:
+                jdm_type = "chaos"
+
+            runner_script = seedbot2000_dir / 'run_johnnydmad.py'
+            jdm_command = [
+                "python3", str(runner_script),
+                "--type", jdm_type,
+                "--input", str(output_smc),
+                "--output", str(output_smc),
+                "--spoiler", str(music_log_path)
+            ]
+            with timer.stage('johnnydmad'):
+                result = run_sandboxed(jdm_command, timeout=60)
+            timer.record_usage('johnnydmad', result.usage)
+
+        progress('Packaging Seed...')
+        zip_filename = f"{filename_base}.zip"
+        original_log_path = temp_path / f"{filename_base}.txt"
+        zip_path = temp_path / zip_filename
+        with timer.stage('zip'):
+            with zipfile.ZipFile(zip_path, 'w') as zf:
+                zf.write(output_smc, arcname=f"{jdm_type}_{filename_base}.smc")
+                if original_log_path.exists():
+                    zf.write(original_log_path, arcname=f"{jdm_type}_{filename_base}.txt")
+                if music_was_randomized and music_log_path.exists():
+                    zf.write(music_log_path, arcname=f"{jdm_type}_{filename_base}_music_swaps.txt")
+
+        with timer.stage('move'):
+            return store_seed(zip_path, zip_filename)
+
+
+def record_roll(preset, share_url, discord_id, user_name, timer):
+    """
+    Books a finished roll: download tracking for local seeds, plus the shared
+    roll log, the preset's gen_count and the metrics sheet (see roll_log).
+    """
+    timestamp = datetime.now().strftime('%b %d %Y %H:%M:%S')
+    with timer.stage('db'):
+        relpath = relpath_from_url(share_url)
+        if relpath:
+            SeedArtifact.objects.create(relpath=relpath, preset_name=preset.preset_name, creator_id=discord_id)
+        log_rolls([_log_entry(preset, share_url, discord_id, user_name, timestamp)])
+
+
+def record_rolls(preset, share_urls, discord_id, user_name):
+    """
+    Bulk counterpart of record_roll for a batch of seeds rolled together.
+    The seeds are handed out to racers, so their downloads are shared by
+    link. Each roll log row gets its own timestamp, one second apart and
+    ending now, since the bot's log has second resolution.
+    """
+    now = datetime.now()
+    relpaths = [relpath for relpath in map(relpath_from_url, share_urls) if relpath]
+    SeedArtifact.objects.bulk_create([
+        SeedArtifact(relpath=relpath, preset_name=preset.preset_name, creator_id=discord_id, shared=True)
+        for relpath in relpaths
+    ])
+    log_rolls([
+        _log_entry(preset, share_url, discord_id, user_name,
+                   (now - timedelta(seconds=len(share_urls) - index)).strftime('%b %d %Y %H:%M:%S'))
+        for index, share_url in enumerate(share_urls, start=1)
+    ])
+
+
+def _log_entry(preset, share_url, discord_id, user_name, timestamp):
+    return {
+        'creator_id': discord_id,
+        'creator_name': user_name,
+        'seed_type': preset.preset_name,
+        'share_url': share_url,
+        'timestamp': timestamp,
+        'server_name': 'WebApp',
+    }
@@ -0,0 +1,74 @@
+# presets/rollstats.py
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.db.models import Max, Min
+from django.db.models.expressions import RawSQL
+
+from .models import SeedLog
+
+# Format of SeedLog.timestamp, shared with the bot.
+TIMESTAMP_FORMAT = '%b %d %Y %H:%M:%S'
+
+
+def parse_timestamp(value):
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def recent_rolls(since, chunk_size=500):
+    """
+    Yields (seed_type, rolled_at) for every roll logged at or after `since`,
+    roughly newest first. The seedlist timestamps are text, so instead of
+    filtering on them this walks the table backwards by rowid (insertion
+    order) and stops at the first chunk holding no roll newer than `since`,
+    which tolerates a few rows logged out of order.
+    """
+    rows = SeedLog.objects.annotate(row_id=RawSQL('rowid', [])).order_by('-row_id')
+    last_row_id = None
+    while True:
+        page = rows if last_row_id is None else rows.filter(row_id__lt=last_row_id)
+        chunk = list(page.values_list('row_id', 'seed_type', 'timestamp')[:chunk_size])
+        if not chunk:
+            return
+        found = False
+        for row_id, seed_type, timestamp in chunk:
+            rolled_at = parse_timestamp(timestamp)
+            if rolled_at is not None and rolled_at >= since:
+                found = True
+                yield seed_type, rolled_at
+        if not found:
+            return
+        last_row_id = chunk[-1][0]
+
+
+def first_row_id_at(moment):
+    """
+    Binary-searches the seedlist for where rolls logged at or after `moment`
+    begin, as a rowid bound: every earlier row is older, the first row from
+    it on is not. Assumes rowid order follows time (it does, give or take a
+    few rows). Returns one past the last rowid when every roll is older.
+    """
+    rows = SeedLog.objects.annotate(row_id=RawSQL('rowid', [])).order_by('row_id')
+    bounds = rows.aggregate(low=Min('row_id'), high=Max('row_id'))
+    if bounds['high'] is None:
+        return 1
+    low, high = bounds['low'], bounds['high'] + 1
+    while low < high:
+        middle = (low + high) // 2
+        row_id, timestamp = rows.filter(row_id__gte=middle).values_list('row_id', 'timestamp')[0]
+        rolled_at = parse_timestamp(timestamp)
+        if rolled_at is not None and rolled_at >= moment:
+            high = middle
+        else:
+            low = row_id + 1
+    return low
+
+
+def roll_rates(hours):
+    """Rolls per hour for each preset over the last `hours` hours."""
+    since = datetime.now() - timedelta(hours=hours)
+    counts = Counter(seed_type for seed_type, _ in recent_rolls(since))
+    return {name: count / hours for name, count in counts.items()}
@@ -0,0 +1,239 @@
+# presets/sandbox.py
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from .cleanup import parse_size
+
+
+# Runs in the child ahead of the generator: joins the cgroup and applies the
+# limits to itself, then execs the command. The limits are in place before
+# the generator's first instruction, without a preexec_fn (unsafe to fork
+# with in threaded web workers).
+_LAUNCHER = """
+import os, resource, sys
+cgroup, (memory, cpu_seconds, open_files, nice), command = sys.argv[1], map(int, sys.argv[2:6]), sys.argv[6:]
+if cgroup:
+    with open(os.path.join(cgroup, 'cgroup.procs'), 'w') as f:
+        f.write(str(os.getpid()))
+if nice:
+    os.nice(nice)
+if memory:
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+if cpu_seconds:
+    # SIGXCPU at the soft limit, SIGKILL a few seconds later if it is ignored.
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+if open_files:
+    resource.setrlimit(resource.RLIMIT_NOFILE, (open_files, open_files))
+os.execvp(command[0], command)
+"""
+# Longest pause between checks on a running child; shorter at first, so quick runs return quickly.
+POLL_INTERVAL = 0.05
+
+
+def _limits():
+    return {
+        'memory': parse_size(settings.GENERATOR_MEMORY_LIMIT),
+        'cpu_seconds': settings.GENERATOR_CPU_SECONDS,
+        'open_files': settings.GENERATOR_OPEN_FILES,
+        'nice': settings.GENERATOR_NICE,
+        'cgroup': settings.GENERATOR_CGROUP,
+    }
+
+
+def _launch_command(command, limits, cgroup):
+    numbers = [limits['memory'] or 0, limits['cpu_seconds'] or 0, limits['open_files'] or 0, limits['nice'] or 0]
+    return [sys.executable, '-I', '-S', '-c', _LAUNCHER, cgroup or '', *map(str, numbers), *command]
+
+
+def _run_cgroup(group):
+    """
+    A child of GENERATOR_CGROUP for one run, so that its memory.peak is the
+    run's own. Limits set on GENERATOR_CGROUP still cap all runs together.
+    """
+    if not group:
+        return None
+    path = os.path.join(group, f'run-{uuid.uuid4().hex[:12]}')
+    try:
+        os.mkdir(path)
+    except OSError as e:
+        print(f"Unable to create a cgroup for a generator run, using {group} itself: {e}")
+        return None
+    return path
+
+
+def _finish_cgroup(path, sampled_kb):
+    """
+    The run's peak RSS in KB: its cgroup's memory.peak when it ran in one
+    and the memory controller reports it, else the sampled VmHWM. Removes
+    the run's cgroup.
+    """
+    if not path:
+        return sampled_kb
+    peak_kb = sampled_kb
+    try:
+        with open(os.path.join(path, 'memory.peak')) as f:
+            peak_kb = int(f.read()) // 1024
+    except (OSError, ValueError):
+        # The memory controller isn't enabled for GENERATOR_CGROUP's children.
+        pass
+    try:
+        os.rmdir(path)
+    except OSError as e:
+        print(f"Unable to remove generator cgroup {path}: {e}")
+    return peak_kb
+
+
+def _peak_rss_kb(pid):
+    """
+    The process's current VmHWM (peak RSS of its own address space, reset by
+    exec), or None once it has exited. ru_maxrss can't be used: the kernel
+    carries the spawning worker's RSS over into it.
+    """
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _reap(process, timeout):
+    """
+    Waits for the child with os.wait4, which also returns its resource usage,
+    sampling its VmHWM in between. Returns (rusage, last VmHWM sample).
+    Raises TimeoutExpired after `timeout` seconds, leaving the child running.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    interval, peak_kb = 0.001, None
+    while True:
+        pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return rusage, peak_kb
+        # VmHWM only grows within one address space, so the latest sample
+        # is the generator's peak once the launcher has exec'd it.
+        peak_kb = _peak_rss_kb(process.pid) or peak_kb
+        if deadline is not None and time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(interval)
+        interval = min(interval * 2, POLL_INTERVAL)
+
+
+def _kill(process):
+    process.kill()
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return rusage
+
+
+def _read_all(process):
+    """
+    Reads stdout and stderr to the end on threads, so a chatty child never
+    blocks on a full pipe. Returns a function that waits for both.
+    """
+    output = {}
+
+    def read(name, stream):
+        output[name] = stream.read()
+        stream.close()
+
+    readers = [
+        threading.Thread(target=read, args=(name, stream), daemon=True)
+        for name, stream in (('stdout', process.stdout), ('stderr', process.stderr))
+    ]
+    for reader in readers:
+        reader.start()
+
+    def collect():
+        for reader in readers:
+            reader.join()
+        return output.get('stdout', ''), output.get('stderr', '')
+    return collect
+
+
+def _usage(rusage, peak_kb):
+    return {
+        'cpu_ms': (rusage.ru_utime + rusage.ru_stime) * 1000,
+        # None when neither the run's cgroup nor a VmHWM sample measured it.
+        'max_rss_kb': peak_kb,
+    }
+
+
+def _describe_signal(returncode, limits):
+    signum = -returncode
+    if signum == signal.SIGXCPU or (signum == signal.SIGKILL and limits['cpu_seconds']):
+        return f"The generator was stopped by a signal ({signal.Signals(signum).name}); it may have exceeded its {limits['cpu_seconds']}s CPU limit."
+    return f"The generator was stopped by a signal ({signal.Signals(signum).name})."
+
+
+def _hit_limit(returncode, stderr, usage, limits):
+    """
+    True when the run was most likely stopped by the sandbox rather than
+    failing on its own: killed by a signal (SIGXCPU, SIGKILL from the CPU
+    limit or the cgroup's OOM killer), out of address space (Python reports
+    RLIMIT_AS as MemoryError) or out of CPU time.
+    """
+    if returncode < 0:
+        return True
+    if limits['memory'] and 'MemoryError' in stderr:
+        return True
+    return bool(limits['cpu_seconds']) and usage['cpu_ms'] >= limits['cpu_seconds'] * 1000
+
+def run_sandboxed(command, cwd=None, timeout=None):
+    """
+    Runs a generator script like subprocess.run(capture_output=True, check=True)
+    but confined: address space, CPU seconds and open files are capped with
+    setrlimit, the process is reniced and, if GENERATOR_CGROUP is set, placed
+    in a cgroup of its own under it. The returned CompletedProcess has a
+    `usage` dict with the child's CPU time (ms) and peak RSS (KB, None if it
+    couldn't be measured). Failures raise subprocess.CalledProcessError /
+    TimeoutExpired as subprocess.run would; the error also carries `usage`,
+    and a CalledProcessError carries `limit_hit`, True when one of the
+    limits (not the script itself) most likely ended the run.
+    """
+    limits = _limits()
+    cgroup = _run_cgroup(limits['cgroup'])
+    try:
+        process = subprocess.Popen(
+            _launch_command(command, limits, cgroup or limits['cgroup']), cwd=cwd,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding='utf-8', errors='replace',
+        )
+    except BaseException:
+        _finish_cgroup(cgroup, None)
+        raise
+    collect = _read_all(process)
+    try:
+        rusage, peak_kb = _reap(process, timeout)
+    except subprocess.TimeoutExpired as e:
+        rusage = _kill(process)
+        e.cmd = command
+        e.stdout, e.stderr = collect()
+        e.usage = _usage(rusage, _finish_cgroup(cgroup, None))
+        raise
+    except BaseException:
+        _kill(process)
+        collect()
+        _finish_cgroup(cgroup, None)
+        raise
+    stdout, stderr = collect()
+
+    usage = _usage(rusage, _finish_cgroup(cgroup, peak_kb))
+    if process.returncode != 0:
+        if process.returncode < 0 and not stderr:
+            stderr = _describe_signal(process.returncode, limits)
+        error = subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+        error.usage = usage
+        error.limit_hit = _hit_limit(process.returncode, stderr, usage, limits)
+        raise error
+    completed = subprocess.CompletedProcess(command, 0, stdout, stderr)
+    completed.usage = usage
+    return completed
@@ -0,0 +1,96 @@
+# presets/scratch.py
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+from .cleanup import parse_size
+
+_local = threading.local()
+
+
+def scratch_root():
+    """
+    Where generator output is staged: SEED_SCRATCH_DIR (tmpfs by default) while
+    it has SEED_SCRATCH_MIN_FREE bytes to spare, the regular temp dir otherwise.
+    """
+    root = Path(settings.SEED_SCRATCH_DIR)
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        if shutil.disk_usage(root).free >= (parse_size(settings.SEED_SCRATCH_MIN_FREE) or 0):
+            return root
+        print(f"Scratch space at {root} is nearly full; staging on disk instead.")
+    except OSError as e:
+        print(f"Scratch space at {root} is unavailable, staging on disk instead: {e}")
+    fallback = Path(tempfile.gettempdir()) / 'seedbot-scratch'
+    fallback.mkdir(parents=True, exist_ok=True)
+    return fallback
+
+
+def _sweep(directory):
+    """Empties a scratch directory in one pass. Generators write flat files, so this is mostly unlinks."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+@contextmanager
+def scratch_dir():
+    """
+    Yields an empty directory for one job. Each worker process and thread
+    keeps its own directory and reuses it for every job, sweeping it clean
+    afterwards instead of creating and deleting a fresh temp dir each time.
+    """
+    depth = getattr(_local, 'depth', 0)
+    directory = scratch_root() / f"w{os.getpid()}-{threading.get_ident()}-{depth}"
+    directory.mkdir(exist_ok=True)
+    # Leftovers from a job that was killed mid-run.
+    _sweep(directory)
+    _local.depth = depth + 1
+    try:
+        yield directory
+    finally:
+        _local.depth = depth
+        _sweep(directory)
+
+
+def sweep_stale_scratch():
+    """
+    Removes scratch directories left by worker processes that no longer
+    exist. Each is renamed out of the way first so a live worker can never
+    be handed a half-deleted directory. Returns the number removed.
+    """
+    removed = 0
+    roots = {Path(settings.SEED_SCRATCH_DIR), Path(tempfile.gettempdir()) / 'seedbot-scratch'}
+    for root in roots:
+        if not root.is_dir():
+            continue
+        for entry in os.scandir(root):
+            if not entry.name.startswith('w') or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                pid = int(entry.name[1:].split('-')[0])
+                os.kill(pid, 0)
+                continue
+            except ProcessLookupError:
+                pass
+            except (ValueError, PermissionError):
+                continue
+            doomed = root / f".stale-{entry.name}"
+            try:
+                os.rename(entry.path, doomed)
+            except OSError:
+                continue
+            shutil.rmtree(doomed, ignore_errors=True)
+            removed += 1
+    return removed
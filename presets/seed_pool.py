@@ -0,0 +1,118 @@
+# presets/seed_pool.py
+import hashlib
+import math
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from kombu.exceptions import ChannelError
+
+from .models import Preset, PooledSeed
+from .media import seed_path
+from .rollstats import roll_rates
+
+# Claimed rows are only kept around for pool statistics.
+CLAIMED_RETENTION = timedelta(days=1)
+
+
+def pool_key(preset):
+    """Identifies the flags a pooled seed was generated with."""
+    source = f"{preset.flags}\0{preset.arguments or ''}"
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def available_seeds(preset_name, flags_hash):
+    """Unclaimed, still fresh pool entries for a preset, oldest first."""
+    fresh_after = timezone.now() - timedelta(hours=settings.SEED_POOL_MAX_AGE_HOURS)
+    return PooledSeed.objects.filter(
+        preset_name=preset_name, flags_hash=flags_hash,
+        claimed_at__isnull=True, created_at__gte=fresh_after,
+    ).order_by('created_at')
+
+
+def claim_pooled_seed(preset):
+    """
+    Hands out one pooled seed for `preset`, or None if the pool is empty.
+    The claim is a conditional UPDATE, so two concurrent rolls can never
+    receive the same seed.
+    """
+    for candidate in available_seeds(preset.preset_name, pool_key(preset))[:5]:
+        claimed = PooledSeed.objects.filter(pk=candidate.pk, claimed_at__isnull=True).update(claimed_at=timezone.now())
+        if not claimed:
+            continue
+        path = seed_path(candidate.relpath)
+        try:
+            # Retention counts from when the seed was handed out, not generated.
+            os.utime(path)
+        except FileNotFoundError:
+            candidate.delete()
+            continue
+        return candidate
+    return None
+
+
+def _discard(entries):
+    """Deletes pool entries along with their seed files."""
+    for entry in entries:
+        try:
+            os.unlink(seed_path(entry.relpath))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Unable to delete pooled seed {entry.relpath}: {e}")
+    PooledSeed.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+
+
+def invalidate_pool(preset, keep_current=True):
+    """Discards a preset's unclaimed seeds, keeping those matching its current flags if asked."""
+    stale = PooledSeed.objects.filter(preset_name=preset.preset_name, claimed_at__isnull=True)
+    if keep_current:
+        stale = stale.exclude(flags_hash=pool_key(preset))
+    _discard(list(stale))
+
+
+def expire_pool():
+    """Discards unclaimed seeds past their freshness window and forgets old claims."""
+    now = timezone.now()
+    _discard(list(PooledSeed.objects.filter(
+        claimed_at__isnull=True,
+        created_at__lt=now - timedelta(hours=settings.SEED_POOL_MAX_AGE_HOURS),
+    )))
+    PooledSeed.objects.filter(claimed_at__lt=now - CLAIMED_RETENTION).delete()
+
+
+def target_size(rolls_per_hour):
+    """Pool size for a preset: its forecast demand over the horizon, within the configured bounds."""
+    expected = math.ceil(rolls_per_hour * settings.SEED_POOL_HORIZON_MINUTES / 60)
+    return max(settings.SEED_POOL_MIN_SIZE, min(settings.SEED_POOL_MAX_SIZE, expected))
+
+
+def plan_refill():
+    """
+    Returns (preset, target, missing) for every pooled preset that is short
+    of its target. Pooled presets are the top SEED_POOL_TOP_N by gen_count.
+    """
+    rates = roll_rates(settings.SEED_POOL_DEMAND_HOURS)
+    plan = []
+    for preset in Preset.objects.order_by('-gen_count')[:settings.SEED_POOL_TOP_N]:
+        target = target_size(rates.get(preset.preset_name, 0))
+        missing = target - available_seeds(preset.preset_name, pool_key(preset)).count()
+        if missing > 0:
+            plan.append((preset, target, missing))
+    return plan
+
+
+def broker_queue_depth():
+    """Messages waiting in the default Celery queue, or None if the broker can't be asked."""
+    from seedbot_project.celery import app
+    try:
+        with app.connection_for_read() as conn:
+            declared = conn.default_channel.queue_declare(queue=app.conf.task_default_queue, passive=True)
+            return declared.message_count
+    except ChannelError:
+        # Brokers drop empty queues, and a passive declare of one reports it missing.
+        return 0
+    except Exception as e:
+        print(f"Unable to read the Celery queue depth: {e}")
+        return None
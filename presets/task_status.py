@@ -0,0 +1,31 @@
+# presets/task_status.py
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from celery.backends.redis import RedisBackend
+from celery.result import AsyncResult
+from django.conf import settings
+
+from seedbot_project.celery import app
+from .loop_clients import LoopClients
+
+# redis.asyncio connections belong to the event loop that opened them.
+_clients = LoopClients(lambda: aioredis.from_url(settings.CELERY_RESULT_BACKEND, socket_connect_timeout=1))
+
+
+async def get_task_state(task_id):
+    """
+    Returns (state, info) for a Celery task the way AsyncResult would, but
+    reads the Redis result backend with an async client so status polls don't
+    tie up a thread. Other result backends go through AsyncResult.
+    """
+    backend = app.backend
+    if not isinstance(backend, RedisBackend):
+        result = AsyncResult(task_id)
+        return await sync_to_async(lambda: (result.state, result.info))()
+
+    client = await _clients.get()
+    raw = await client.get(backend.get_key_for_task(task_id))
+    if raw is None:
+        return 'PENDING', None
+    meta = backend.decode_result(raw)
+    return meta['status'], meta.get('result')
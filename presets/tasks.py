@@ -1,19 +1,25 @@
-import subprocess
-import uuid
-import os
+import json
 import zipfile
 from pathlib import Path
-from datetime import datetime
-import tempfile
-import shutil
-import traceback
 
 from celery import shared_task
+from celery.signals import worker_shutdown
 from celery.exceptions import Ignore
 from django.conf import settings
-from .models import Preset, SeedLog
+from django.db.models import F
+from django.utils import timezone
+from .models import Preset, PooledSeed, BulkRollBatch, SeedArtifact
 from . import flag_processor
-from .utils import write_to_gsheets
+from .timing import RollTimer
+from .cleanup import run_cleanup, parse_size
+from .media import seed_url, seed_path, store_seed, download_url_for
+from .rolling import build_seed, record_roll, record_rolls
+from .roll_log import flush_roll_log
+from .scratch import scratch_dir, sweep_stale_scratch
+from .failures import record_failure, user_message
+from .trending import update_trending_scores
+from .flag_index import sync_flag_index
+from .seed_pool import available_seeds, broker_queue_depth, expire_pool, plan_refill, pool_key
 
 class RollException(Exception):
     """Custom exception for seed rolling errors."""
@@ -26,116 +32,203 @@ class RollException(Exception):
 @shared_task(bind=True)
 def create_local_seed_task(self, preset_pk, discord_id, user_name):
     preset = Preset.objects.get(pk=preset_pk)
-    final_flags = flag_processor.apply_args(preset.flags, preset.arguments)
-    unique_id = str(uuid.uuid4())[:8]
-    filename_base = f"{preset.preset_name.replace(' ', '_').replace('/', '-')}_{unique_id}"
-    args_list = preset.arguments.split() if preset.arguments else []
-
-    project_root = settings.BASE_DIR.parent
-    seedbot2000_dir = project_root / 'seedbot2000'
-    main_wc_dir = seedbot2000_dir / 'WorldsCollide'
-
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        output_smc = temp_path / f"{filename_base}.smc"
-
-        dir_map = {
-            'practice': 'WorldsCollide_practice', 'doors': 'WorldsCollide_Door_Rando',
-            'dungeoncrawl': 'WorldsCollide_Door_Rando', 'doorslite': 'WorldsCollide_Door_Rando',
-            'maps': 'WorldsCollide_Door_Rando', 'mapx': 'WorldsCollide_Door_Rando',
-            'lg1': 'WorldsCollide_location_gating1', 'lg2': 'WorldsCollide_location_gating1',
-            'ws': 'WorldsCollide_shuffle_by_world', 'csi': 'WorldsCollide_shuffle_by_world',
-        }
-        
-        script_dir_name = 'WorldsCollide'
-        for arg in args_list:
-            if arg in dir_map:
-                script_dir_name = dir_map[arg]
-                break
-        
-        script_dir = seedbot2000_dir / script_dir_name
-        wc_script = script_dir / 'wc.py'
-        
-        command = [
-            "python3", str(wc_script),
-            "-i", str(main_wc_dir / 'ff3.smc'),
-            "-o", str(output_smc)
-        ]
-        command.extend(final_flags.split())
+    timer = RollTimer(self.request.id, preset.preset_name)
+    with timer.stage('flags'):
+        final_flags = flag_processor.apply_args(preset.flags, preset.arguments)
+
+    def progress(status):
+        self.update_state(state='PROGRESS', meta={'status': status})
+
+    try:
+        relpath = build_seed(preset, final_flags, timer, progress=progress)
+        share_url = seed_url(relpath)
+        record_roll(preset, share_url, discord_id, user_name, timer)
+
+        timer.save(succeeded=True)
+        return share_url
+
+    except Exception as e:
+        timer.save(succeeded=False)
+        record_failure(preset, timer, e)
+        self.update_state(state='FAILURE', meta={'exc_type': type(e).__name__, 'exc_message': user_message(e)})
+        raise Ignore()
+
+
+@shared_task
+def cleanup_seeds_task():
+    """Periodic retention pass over MEDIA_ROOT (see CELERY_BEAT_SCHEDULE)."""
+    report = run_cleanup(
+        settings.MEDIA_ROOT,
+        max_age_days=settings.SEED_RETENTION_DAYS,
+        max_total_bytes=parse_size(settings.SEED_MEDIA_MAX_BYTES),
+        workers=settings.SEED_CLEANUP_WORKERS,
+    )
+    return {
+        'stale_scratch_dirs': sweep_stale_scratch(),
+        'files_scanned': report['files_scanned'],
+        'files_deleted': report['files_deleted'],
+        'bytes_reclaimed': report['bytes_reclaimed'],
+        'bytes_remaining': report['bytes_remaining'],
+        'artifacts_removed': report['artifacts_removed'],
+        'errors': len(report['errors']),
+    }
+
 
-        try:
-            self.update_state(state='PROGRESS', meta={'status': 'Generating Seed...'})
-            subprocess.run(
-                command, cwd=script_dir, capture_output=True,
-                encoding='utf-8', timeout=120, check=True
-            )
-            
-            music_was_randomized = False
-            jdm_type = "standard"
-
-            if 'tunes' in args_list or 'ctunes' in args_list:
-                self.update_state(state='PROGRESS', meta={'status': 'Applying Tunes...'})
-                music_was_randomized = True
-                music_log_path = temp_path / f"{filename_base}_music.txt"
-                
-                if 'ctunes' in args_list:
-                    jdm_type = "chaos"
-                
-                runner_script = seedbot2000_dir / 'run_johnnydmad.py'
-                jdm_command = [
-                    "python3", str(runner_script),
-                    "--type", jdm_type,
-                    "--input", str(output_smc),
-                    "--output", str(output_smc),
-                    "--spoiler", str(music_log_path)
-                ]
-                subprocess.run(
-                    jdm_command, capture_output=True, encoding='utf-8',
-                    timeout=60, check=True
-                )
-            
-            self.update_state(state='PROGRESS', meta={'status': 'Packaging Seed...'})
-            zip_filename = f"{filename_base}.zip"
-            original_log_path = temp_path / f"{filename_base}.txt"
-            zip_path = temp_path / zip_filename
-            with zipfile.ZipFile(zip_path, 'w') as zf:
-                zf.write(output_smc, arcname=f"{jdm_type}_{filename_base}.smc")
-                if original_log_path.exists():
-                    zf.write(original_log_path, arcname=f"{jdm_type}_{filename_base}.txt")
-                if music_was_randomized and music_log_path.exists():
-                    zf.write(music_log_path, arcname=f"{jdm_type}_{filename_base}_music_swaps.txt")
-            
-            final_destination = Path(settings.MEDIA_ROOT) / zip_filename
-            shutil.move(zip_path, final_destination)
-            
-            preset.gen_count += 1
-            preset.save(update_fields=['gen_count'])
-            share_url = f'{settings.MEDIA_URL}{zip_filename}'
-            timestamp = datetime.now().strftime('%b %d %Y %H:%M:%S')
-            SeedLog.objects.create(
-                creator_id=discord_id,
-                creator_name=user_name,
-                seed_type=preset.preset_name,
-                share_url=share_url,
-                timestamp=timestamp,
-                server_name='WebApp'
-            )
-            metrics_data = { 'creator_id': discord_id, 'creator_name': user_name, 'seed_type': preset.preset_name, 'share_url': share_url, 'timestamp': timestamp, }
-            write_to_gsheets(metrics_data)
-
-            return share_url
 
+@shared_task(ignore_result=True)
+def flush_roll_log_task():
+    """Writes buffered roll log entries to the SeedBot database (see CELERY_BEAT_SCHEDULE)."""
+    if settings.ROLL_LOG_BUFFERED:
+        return flush_roll_log()
+
+@worker_shutdown.connect
+def flush_roll_log_on_shutdown(**kwargs):
+    """Don't leave rolls sitting in the buffer while no worker is around to flush them."""
+    if settings.ROLL_LOG_BUFFERED:
+        try:
+            flush_roll_log()
         except Exception as e:
-            log_path = Path('/tmp/debug_task.log')
-            err_msg = f"An error occurred: {str(e)}"
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(f"\n--- Task Failed: {datetime.now()} ---\n")
-                traceback.print_exc(file=f)
-                if isinstance(e, subprocess.CalledProcessError):
-                    f.write("\n--- Subprocess STDOUT ---\n")
-                    f.write(e.stdout or "N/A")
-                    f.write("\n--- Subprocess STDERR ---\n")
-                    f.write(e.stderr or "N/A")
-                    err_msg = f"A script failed to run: {e.stderr or e.stdout}"
-            self.update_state(state='FAILURE', meta={'exc_type': type(e).__name__, 'exc_message': err_msg})
-            raise Ignore()
\ No newline at end of file
+            print(f"Unable to flush the roll log on shutdown: {e}")
+
+@shared_task
+def update_trending_scores_task():
+    """Keeps the trending sort's scores current (see CELERY_BEAT_SCHEDULE)."""
+    return {'rolls': update_trending_scores()}
+
+
+@shared_task
+def sync_flag_index_task():
+    """Picks up presets the bot created or edited directly (see CELERY_BEAT_SCHEDULE)."""
+    return sync_flag_index()
+
+
+@shared_task
+def refill_seed_pool_task():
+    """
+    Periodic top-up of the seed pool (see CELERY_BEAT_SCHEDULE). Only queues
+    new generations while the workers are otherwise idle.
+    """
+    if not settings.SEED_POOL_ENABLED:
+        return {'queued': 0}
+    expire_pool()
+    depth = broker_queue_depth()
+    if depth is None or depth > settings.SEED_POOL_IDLE_QUEUE_DEPTH:
+        return {'queued': 0, 'queue_depth': depth}
+    queued = 0
+    for preset, target, missing in plan_refill():
+        for _ in range(missing):
+            generate_pooled_seed_task.delay(preset.pk, target)
+            queued += 1
+    return {'queued': queued}
+
+
+@shared_task(bind=True)
+def generate_pooled_seed_task(self, preset_pk, target):
+    """Generates one seed into the pool, unless the pool filled up in the meantime."""
+    try:
+        preset = Preset.objects.get(pk=preset_pk)
+    except Preset.DoesNotExist:
+        return None
+    flags_hash = pool_key(preset)
+    if available_seeds(preset.preset_name, flags_hash).count() >= target:
+        return None
+
+    timer = RollTimer(self.request.id, preset.preset_name)
+    with timer.stage('flags'):
+        final_flags = flag_processor.apply_args(preset.flags, preset.arguments)
+    try:
+        relpath = build_seed(preset, final_flags, timer)
+    except Exception as e:
+        timer.save(succeeded=False)
+        record_failure(preset, timer, e)
+        print(f"Pooled seed generation failed for {preset.preset_name}: {e}")
+        return None
+    timer.save(succeeded=True)
+    PooledSeed.objects.create(preset_name=preset.preset_name, flags_hash=flags_hash, relpath=relpath)
+    return relpath
+
+
+@shared_task(bind=True)
+def generate_bulk_seed_task(self, batch_id, preset_pk, final_flags):
+    """
+    One seed of a bulk roll. The flags were resolved once for the whole batch.
+    Returns the seed's relative path, or None if it failed, so the batch's
+    chord callback always runs.
+    """
+    preset = Preset.objects.get(pk=preset_pk)
+    timer = RollTimer(self.request.id, preset.preset_name)
+    try:
+        relpath = build_seed(preset, final_flags, timer)
+    except Exception as e:
+        timer.save(succeeded=False)
+        record_failure(preset, timer, e)
+        BulkRollBatch.objects.filter(pk=batch_id).update(failed=F('failed') + 1)
+        print(f"Bulk roll {batch_id}: seed failed for {preset.preset_name}: {e}")
+        return None
+    timer.save(succeeded=True)
+    BulkRollBatch.objects.filter(pk=batch_id).update(completed=F('completed') + 1)
+    return relpath
+
+
+@shared_task
+def fail_bulk_roll_task(batch_id):
+    """
+    Error callback of a bulk roll's chord. Marks the batch failed if the
+    chord never got to finish it, so it doesn't show as running forever.
+    """
+    BulkRollBatch.objects.filter(pk=batch_id, status=BulkRollBatch.STATUS_RUNNING).update(
+        status=BulkRollBatch.STATUS_FAILED, finished_at=timezone.now(),
+    )
+
+
+@shared_task
+def finalize_bulk_roll_task(relpaths, batch_id):
+    """
+    Chord callback of a bulk roll: logs every seed in one go and packs them,
+    with a manifest, into a single archive for the organizer. The seeds'
+    download links in the manifest work for anyone; the archive is the
+    organizer's own.
+    """
+    try:
+        return _finalize_bulk_roll(relpaths, batch_id)
+    except Exception:
+        fail_bulk_roll_task(batch_id)
+        raise
+
+
+def _finalize_bulk_roll(relpaths, batch_id):
+    batch = BulkRollBatch.objects.get(pk=batch_id)
+    relpaths = [relpath for relpath in relpaths if relpath]
+    if not relpaths:
+        fail_bulk_roll_task(batch_id)
+        return None
+
+    preset = Preset.objects.get(pk=batch.preset_name)
+    share_urls = [seed_url(relpath) for relpath in relpaths]
+    record_rolls(preset, share_urls, batch.creator_id, batch.creator_name)
+
+    manifest = [
+        {'seed': index, 'filename': Path(relpath).name, 'download_url': download_url_for(share_url)}
+        for index, (relpath, share_url) in enumerate(zip(relpaths, share_urls), start=1)
+    ]
+    archive_name = f"{preset.preset_name.replace(' ', '_').replace('/', '-')}_bulk_{batch.pk}.zip"
+    with scratch_dir() as temp_path:
+        archive_path = temp_path / archive_name
+        # The seeds are zips already, so they are stored rather than recompressed.
+        with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_STORED) as zf:
+            for relpath in relpaths:
+                zf.write(seed_path(relpath), arcname=Path(relpath).name)
+            zf.writestr('manifest.json', json.dumps({
+                'preset': preset.preset_name,
+                'flags': None if preset.hidden else preset.flags,
+                'arguments': preset.arguments, 'seeds': manifest,
+            }, indent=2))
+        archive_relpath = store_seed(archive_path, archive_name)
+    SeedArtifact.objects.create(relpath=archive_relpath, preset_name=preset.preset_name, creator_id=batch.creator_id)
+
+    batch.archive_relpath = archive_relpath
+    batch.manifest = manifest
+    batch.status = BulkRollBatch.STATUS_FINISHED
+    batch.finished_at = timezone.now()
+    batch.save(update_fields=['archive_relpath', 'manifest', 'status', 'finished_at'])
+    return archive_relpath
@@ -0,0 +1,11 @@
+from django import template
+
+from presets.assets import vendor_asset_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor(name):
+    """{% vendor 'jquery.js' %} -> URL of a pinned front-end library."""
+    return vendor_asset_url(name)
@@ -1,3 +1,1205 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from allauth.socialaccount.models import SocialAccount
+
+from seedbot_project.celery import app
+
+from . import roll_log, views
+from .caching import in_memory_caches, rate_limited
+from .catalog import catalog_cache_key, catalog_state
+from .dashboard import dashboard_snapshot
+from .decorators import get_user_permissions
+from .forms import PresetForm
+from .cleanup import plan_cleanup, run_cleanup, scan_seed_files
+from .exports import EXPORT_FIELDS, roll_chunks
+from .failures import describe, record_failure, recent_failures
+from .flag_index import diff_flags, duplicate_presets, parse_flags, presets_with_flag, similar_presets, sync_flag_index
+from .loop_clients import LoopClients
+from .profiling import list_profiles, load_profile
+from .sandbox import run_sandboxed
+from .timing import RollTimer
+from .management.commands.run_benchmarks import SEEDLIST_DDL
+from .media import seed_path, seed_url, shard_relpath
+from .models import (
+    BulkRollBatch, FeaturedPreset, PooledSeed, Preset, PresetFlagSet, PresetTrendingScore, RollFailure,
+    RollTiming, SeedArtifact, SeedLog, TrendingWatermark, UserPermission,
+)
+from .rolling import record_rolls
+from .seed_pool import claim_pooled_seed, plan_refill, pool_key
+from .tasks import fail_bulk_roll_task, finalize_bulk_roll_task
+from .trending import order_by_trending, update_trending_scores
+from .wc_api import ApiHealth, CircuitOpenError, WCApiClient, WCApiError
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+def setUpModule():
+    # The bot owns these tables, so the test databases don't get them from migrations.
+    with connections['seedbot_db'].schema_editor() as editor:
+        for model in apps.get_app_config('presets').get_models():
+            if not model._meta.managed and model is not SeedLog:
+                editor.create_model(model)
+        editor.execute(SEEDLIST_DDL)
+
+
+# Tests run without collectstatic, so the manifest storage has nothing to look names up in.
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(
+    CACHES=in_memory_caches(), STORAGES=TEST_STORAGES, ROLL_LOG_BUFFERED=False, PROFILING_SAMPLE_RATE=0,
+)
+class SeedBotTestCase(TestCase):
+    databases = {'default', 'seedbot_db'}
+
+    def setUp(self):
+        for alias in caches:
+            caches[alias].clear()
+
+    def make_preset(self, name, flags='-cg -open', arguments='', creator_id=1, **fields):
+        return Preset.objects.create(
+            preset_name=name, creator_id=creator_id, creator_name='creator', created_at='Jan 01 2025',
+            flags=flags, arguments=arguments, **{'official': False, 'hidden': False, **fields},
+        )
+
+    def make_user(self, discord_id, bot_admin=False, race_admin=False):
+        user = get_user_model().objects.create(username=f'user{discord_id}')
+        SocialAccount.objects.create(user=user, provider='discord', uid=str(discord_id))
+        UserPermission.objects.create(
+            user_id=discord_id, bot_admin=int(bot_admin), git_user=0, race_admin=int(race_admin),
+        )
+        return user
+
+
+class CatalogConditionalGetTests(SeedBotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_preset('Catalog Preset')
+
+    def test_unchanged_catalog_is_not_modified(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        again = self.client.get('/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_catalog_change_invalidates_etag(self):
+        etag = self.client.get('/')['ETag']
+        self.make_preset('Another Preset')
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @mock.patch.object(roll_log, 'write_rows_to_gsheets')
+    def test_roll_counts_only_change_an_aged_version(self, write_rows):
+        etag = self.client.get('/')['ETag']
+        roll = {'creator_id': 7, 'creator_name': 'roller', 'seed_type': 'Catalog Preset'}
+        roll_log.write_rolls([{**roll, 'timestamp': 'Jan 01 2025 00:00:01'}])
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.settings(CATALOG_HTML_CACHE_SECONDS=0):
+            roll_log.write_rolls([{**roll, 'timestamp': 'Jan 01 2025 00:00:02'}])
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_new_session_is_not_served_an_old_page(self):
+        user = self.make_user(42)
+        self.client.force_login(user)
+        # The first page sets the CSRF cookie, which is part of the ETag.
+        self.client.get('/')
+        etag = self.client.get('/')['ETag']
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.logout()
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_permission_change_invalidates_etag(self):
+        self.client.force_login(self.make_user(42))
+        self.client.get('/')
+        etag = self.client.get('/')['ETag']
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        UserPermission.objects.filter(user_id=42).update(race_admin=1)
+        caches['permissions'].clear()
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class PresetListCacheTests(SeedBotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.preset = self.make_preset('Catalog Preset', creator_id=42)
+        self.page_key = catalog_cache_key('page', '', '', '')
+        render = mock.patch('presets.views.render', wraps=views.render)
+        self.render = render.start()
+        self.addCleanup(render.stop)
+
+    def test_second_anonymous_get_is_served_from_the_page_cache(self):
+        first = self.client.get('/')
+        second = self.client.get('/')
+        self.assertEqual(self.render.call_count, 1)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(caches['pages'].get(self.page_key), first.content)
+
+    def test_preset_save_invalidates_the_page(self):
+        self.client.get('/')
+        self.preset.description = 'Updated description.'
+        self.preset.save()
+        self.assertContains(self.client.get('/'), 'Updated description.')
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_feature_toggle_invalidates_the_page(self):
+        self.client.get('/')
+        self.client.force_login(self.make_user(7, race_admin=True))
+        response = self.client.post(f'/{self.preset.pk}/toggle-feature/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(FeaturedPreset.objects.filter(preset_name='Catalog Preset').exists())
+
+        self.client.logout()
+        self.render.reset_mock()
+        self.client.get('/')
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_logged_in_page_is_not_cached_for_anonymous_visitors(self):
+        self.client.force_login(self.make_user(42, race_admin=True))
+        viewer = self.client.get('/')
+        self.assertContains(viewer, 'discordId: "42", isRaceAdmin: true')
+        self.assertIsNone(caches['pages'].get(self.page_key))
+
+        self.client.logout()
+        anonymous = self.client.get('/')
+        self.assertEqual(self.render.call_count, 2)
+        self.assertContains(anonymous, 'discordId: "", isRaceAdmin: false')
+        # Owner and race-admin controls are revealed by script, never rendered visible.
+        self.assertContains(anonymous, 'class="js-owner-only" hidden>')
+        self.assertEqual(caches['pages'].get(self.page_key), anonymous.content)
+
+
+@unittest.skipUnless(fakeredis, 'needs fakeredis[lua]')
+class RollLogFlushTests(SeedBotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.preset = self.make_preset('Buffered Preset')
+        self.redis = fakeredis.FakeRedis()
+        patches = [
+            mock.patch.object(roll_log, 'get_redis', return_value=self.redis),
+            mock.patch.object(roll_log, 'write_rows_to_gsheets'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def entry(self, n):
+        return {
+            'creator_id': 7, 'creator_name': 'roller', 'seed_type': self.preset.preset_name,
+            'share_url': f'https://seedbot.net/seeds/{n}/', 'timestamp': f'Jan 01 2025 00:00:{n:02d}',
+            'server_name': 'WebApp',
+        }
+
+    def gen_count(self):
+        return Preset.objects.get(pk=self.preset.pk).gen_count
+
+    def test_flush_writes_buffered_rolls_once(self):
+        with self.settings(ROLL_LOG_BUFFERED=True):
+            roll_log.log_rolls([self.entry(1), self.entry(2)])
+        self.assertEqual(SeedLog.objects.count(), 0)
+
+        self.assertEqual(roll_log.flush_roll_log(), 2)
+        self.assertEqual(SeedLog.objects.count(), 2)
+        self.assertEqual(self.gen_count(), 2)
+        self.assertFalse(self.redis.exists(roll_log.BUFFER_KEY, roll_log.PROCESSING_KEY))
+        self.assertEqual(roll_log.flush_roll_log(), 0)
+
+    def test_retried_batch_is_not_counted_twice(self):
+        # A flush that committed but died before dropping its batch.
+        roll_log.write_rolls([self.entry(1)])
+        self.redis.rpush(roll_log.PROCESSING_KEY, json.dumps(self.entry(1)), json.dumps(self.entry(2)))
+
+        self.assertEqual(roll_log.flush_roll_log(), 1)
+        self.assertEqual(SeedLog.objects.count(), 2)
+        self.assertEqual(self.gen_count(), 2)
+
+    def test_failed_side_effects_do_not_leave_the_batch_behind(self):
+        self.redis.rpush(roll_log.BUFFER_KEY, json.dumps(self.entry(1)))
+        roll_log.write_rows_to_gsheets.side_effect = RuntimeError('sheets down')
+
+        self.assertEqual(roll_log.flush_roll_log(), 1)
+        self.assertFalse(self.redis.exists(roll_log.PROCESSING_KEY))
+        self.assertEqual(roll_log.flush_roll_log(), 0)
+        self.assertEqual(self.gen_count(), 1)
+
+    def test_flush_that_lost_its_lock_stops(self):
+        self.redis.rpush(roll_log.BUFFER_KEY, json.dumps(self.entry(1)))
+        real_eval = self.redis.eval
+
+        def eval_after_expiry(script, *args):
+            # Another flush took over once this one's lock expired.
+            if script == roll_log._RENEW_LOCK:
+                self.redis.set(roll_log.LOCK_KEY, 'someone else')
+            return real_eval(script, *args)
+
+        with mock.patch.object(self.redis, 'eval', side_effect=eval_after_expiry):
+            self.assertEqual(roll_log.flush_roll_log(), 0)
+        self.assertEqual(SeedLog.objects.count(), 0)
+        self.assertEqual(self.redis.get(roll_log.LOCK_KEY), b'someone else')
+
+
+class MetricsAccessTests(SeedBotTestCase):
+    @override_settings(METRICS_TOKEN='', METRICS_ALLOWED_IPS=['127.0.0.1'], TRUSTED_PROXIES=1)
+    def test_clients_behind_the_proxy_are_not_local(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 200)
+        relayed = self.client.get('/metrics/', HTTP_X_FORWARDED_FOR='127.0.0.1, 203.0.113.9')
+        self.assertEqual(relayed.status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_X_FORWARDED_FOR='127.0.0.1').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='scrape-me', METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'seedbot_cache_reads_total', response.content)
+
+    @override_settings(METRICS_TOKEN='', METRICS_ALLOWED_IPS=['127.0.0.1'])
+    @mock.patch.object(roll_log, 'write_rows_to_gsheets')
+    def test_metrics_sheet_writes_are_timed(self, write_rows):
+        rolls = [{'creator_id': 7, 'creator_name': 'roller', 'seed_type': 'Preset', 'timestamp': f'Jan 01 2025 00:00:0{n}'} for n in range(3)]
+        roll_log.write_rolls(rolls)
+        write_rows.side_effect = RuntimeError('sheets down')
+        roll_log.write_rolls([{**rolls[0], 'timestamp': 'Jan 02 2025 00:00:00'}])
+
+        timings = RollTiming.objects.filter(stage='metrics')
+        self.assertEqual(list(timings.values_list('succeeded', flat=True).order_by('pk')), [True, False])
+        self.assertIn(b'seedbot_roll_stage_seconds_count{stage="metrics"} 1', self.client.get('/metrics/').content)
+
+
+@override_settings(ROLL_RATE_LIMIT=1, SEED_POOL_ENABLED=False, TRUSTED_PROXIES=1)
+class AnonymousRollLimitTests(SeedBotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_preset('Local Preset', arguments='practice')
+        patch = mock.patch('presets.views.create_local_seed_task')
+        patch.start().delay.return_value.id = 'task-id'
+        self.addCleanup(patch.stop)
+
+    def roll(self, client_addr):
+        return self.client.post('/Local Preset/roll/', HTTP_X_FORWARDED_FOR=client_addr)
+
+    def test_anonymous_clients_are_limited_separately(self):
+        self.assertEqual(self.roll('203.0.113.1').status_code, 200)
+        self.assertEqual(self.roll('203.0.113.1').status_code, 429)
+        self.assertEqual(self.roll('203.0.113.2').status_code, 200)
+
+    def test_spoofed_forwarded_entries_are_ignored(self):
+        self.assertEqual(self.roll('203.0.113.1').status_code, 200)
+        self.assertEqual(self.roll('198.51.100.7, 203.0.113.1').status_code, 429)
+
+
+# Nothing listens on port 1, so every cache call fails with a connection error.
+UNREACHABLE_CACHES = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:1/1',
+        'OPTIONS': {'socket_connect_timeout': 0.2, 'socket_timeout': 0.2},
+    }
+    for alias in in_memory_caches()
+}
+
+
+@override_settings(SEED_POOL_ENABLED=False)
+class CacheOutageTests(SeedBotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_preset('Local Preset', arguments='practice')
+        self.make_user(42, race_admin=True)
+        patch = mock.patch('presets.views.create_local_seed_task')
+        patch.start().delay.return_value.id = 'task-id'
+        self.addCleanup(patch.stop)
+        settings_patch = self.settings(CACHES=UNREACHABLE_CACHES)
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+
+    def test_lookups_fall_back_to_computing(self):
+        self.assertIn('version', catalog_state())
+        self.assertEqual(get_user_permissions(42), (False, True))
+        self.assertFalse(rate_limited('roll', 'anon', 0, 60))
+
+    def test_preset_changes_are_saved_without_the_cache(self):
+        preset = self.make_preset('Saved While Down')
+        FeaturedPreset.objects.create(preset_name=preset.pk)
+        FeaturedPreset.objects.filter(preset_name=preset.pk).delete()
+        preset.delete()
+        self.assertFalse(Preset.objects.filter(pk='Saved While Down').exists())
+
+    def test_pages_are_served_without_the_cache(self):
+        self.assertEqual(self.client.get('/').status_code, 200)
+        self.assertEqual(self.client.get('/Local Preset/').status_code, 200)
+        self.assertEqual(self.client.post('/Local Preset/roll/').status_code, 200)
+
+
+class LoopClientsTests(SimpleTestCase):
+    class Client:
+        closed = False
+
+        async def aclose(self):
+            self.closed = True
+
+    def test_clients_are_shared_within_a_loop_and_closed_with_it(self):
+        clients = LoopClients(self.Client)
+
+        async def get_twice():
+            first = await clients.get()
+            self.assertIs(first, await clients.get())
+            self.assertFalse(first.closed)
+            return first
+
+        # Like async views under WSGI: a new loop per call.
+        first, second = async_to_sync(get_twice)(), async_to_sync(get_twice)()
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed and second.closed)
+
+
+@override_settings(GENERATOR_OPEN_FILES=64, GENERATOR_NICE=0, GENERATOR_CGROUP='')
+class SandboxTests(SimpleTestCase):
+    def test_limits_apply_before_the_command_starts(self):
+        result = run_sandboxed([sys.executable, '-c', 'import resource; print(resource.getrlimit(resource.RLIMIT_NOFILE))'])
+        self.assertEqual(result.stdout.strip(), '(64, 64)')
+        self.assertGreater(result.usage['cpu_ms'], 0)
+
+    def test_peak_rss_is_the_child_own(self):
+        grow = 'import time; block = bytearray(64 * 1024 * 1024); time.sleep(0.3)'
+        peak_kb = run_sandboxed([sys.executable, '-c', grow]).usage['max_rss_kb']
+        self.assertGreaterEqual(peak_kb, 64 * 1024)
+        self.assertLess(peak_kb, 160 * 1024)
+
+    def test_failures_carry_output_and_usage(self):
+        with self.assertRaises(subprocess.CalledProcessError) as raised:
+            run_sandboxed([sys.executable, '-c', 'import sys; sys.stderr.write("x" * 200000); sys.exit(3)'])
+        self.assertEqual(raised.exception.returncode, 3)
+        self.assertEqual(len(raised.exception.stderr), 200000)
+        self.assertIn('cpu_ms', raised.exception.usage)
+        self.assertFalse(raised.exception.limit_hit)
+
+    @override_settings(GENERATOR_MEMORY_LIMIT='300M')
+    def test_memory_limit_kills_are_flagged(self):
+        with self.assertRaises(subprocess.CalledProcessError) as raised:
+            run_sandboxed([sys.executable, '-c', 'bytearray(1024 ** 3)'])
+        self.assertIn('MemoryError', raised.exception.stderr)
+        self.assertTrue(raised.exception.limit_hit)
+
+
+@mock.patch('presets.roll_log.write_rows_to_gsheets')
+class BulkRollTests(SeedBotTestCase):
+    def test_each_seed_gets_its_own_roll_log_row(self, _sheets):
+        preset = self.make_preset('Race Preset')
+        relpaths = [f'ab/cd/race_{n}.zip' for n in range(3)]
+        record_rolls(preset, [seed_url(relpath) for relpath in relpaths], 7, 'organizer')
+
+        timestamps = list(SeedLog.objects.values_list('timestamp', flat=True))
+        self.assertEqual(len(set(timestamps)), 3)
+        self.assertEqual(Preset.objects.get(pk=preset.pk).gen_count, 3)
+        self.assertTrue(all(SeedArtifact.objects.filter(relpath__in=relpaths).values_list('shared', flat=True)))
+
+    def test_failed_callback_marks_the_batch_failed(self, _sheets):
+        batch = BulkRollBatch.objects.create(preset_name='Deleted Preset', creator_id=7, creator_name='organizer', requested=1)
+        with self.assertRaises(Preset.DoesNotExist):
+            finalize_bulk_roll_task(['ab/cd/race_0.zip'], batch.pk)
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, BulkRollBatch.STATUS_FAILED)
+        self.assertIsNotNone(batch.finished_at)
+
+    def test_error_callback_leaves_finished_batches_alone(self, _sheets):
+        batch = BulkRollBatch.objects.create(
+            preset_name='Race Preset', creator_id=7, creator_name='organizer', requested=1,
+            status=BulkRollBatch.STATUS_FINISHED,
+        )
+        fail_bulk_roll_task(batch.pk)
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, BulkRollBatch.STATUS_FINISHED)
+
+
+class SeedDownloadTests(SeedBotTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        patch = self.settings(MEDIA_ROOT=media.name, SEED_DOWNLOAD_BACKEND='python', SEED_RETENTION_DAYS=30)
+        patch.enable()
+        self.addCleanup(patch.disable)
+        self.owner = self.make_user(42)
+
+    def store(self, relpath, age_days=0):
+        path = seed_path(relpath)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'seed')
+        mtime = time.time() - age_days * 86400
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def download(self, relpath):
+        return self.client.get(f'/download/{relpath}')
+
+    def test_only_the_owner_can_download(self):
+        self.store('ab/cd/mine.zip')
+        SeedArtifact.objects.create(relpath='ab/cd/mine.zip', preset_name='P', creator_id=42)
+        self.assertEqual(self.download('ab/cd/mine.zip').status_code, 403)
+
+        self.client.force_login(self.make_user(43))
+        self.assertEqual(self.download('ab/cd/mine.zip').status_code, 403)
+
+        self.client.force_login(self.owner)
+        response = self.download('ab/cd/mine.zip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(SeedArtifact.objects.get(relpath='ab/cd/mine.zip').download_count, 1)
+
+    def test_anonymous_and_shared_seeds_download_by_link(self):
+        self.store('ab/cd/anon.zip')
+        self.store('ab/cd/bulk.zip')
+        SeedArtifact.objects.create(relpath='ab/cd/anon.zip', preset_name='P', creator_id=0)
+        SeedArtifact.objects.create(relpath='ab/cd/bulk.zip', preset_name='P', creator_id=42, shared=True)
+        self.assertEqual(self.download('ab/cd/anon.zip').status_code, 200)
+        self.assertEqual(self.download('ab/cd/bulk.zip').status_code, 200)
+
+    def test_expired_seeds_are_gone(self):
+        self.store('ab/cd/old.zip')
+        artifact = SeedArtifact.objects.create(relpath='ab/cd/old.zip', preset_name='P', creator_id=0)
+        SeedArtifact.objects.filter(pk=artifact.pk).update(created_at=timezone.now() - timedelta(days=31))
+        self.assertEqual(self.download('ab/cd/old.zip').status_code, 410)
+
+    def test_legacy_seeds_expire_from_their_file_time(self):
+        self.store('legacy.zip', age_days=31)
+        SeedLog.objects.create(
+            creator_id=0, creator_name='Anonymous', seed_type='P', share_url=seed_url('legacy.zip'),
+            timestamp='Jan 01 2025 00:00:00',
+        )
+        self.assertEqual(self.download('legacy.zip').status_code, 410)
+        artifact = SeedArtifact.objects.get(relpath='legacy.zip')
+        self.assertLess(artifact.created_at, timezone.now() - timedelta(days=30))
+
+    @override_settings(SEED_DOWNLOAD_BACKEND='x-accel')
+    def test_offloaded_headers_are_encoded(self):
+        self.store('ab/cd/Crème brûlée "race".zip')
+        SeedArtifact.objects.create(relpath='ab/cd/Crème brûlée "race".zip', preset_name='P', creator_id=0)
+        response = self.download('ab/cd/Crème brûlée "race".zip')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-seeds/ab/cd/Cr%C3%A8me%20br%C3%BBl%C3%A9e%20%22race%22.zip')
+        self.assertIn("filename*=utf-8''Cr%C3%A8me", response['Content-Disposition'])
+
+    def test_cleanup_drops_records_of_deleted_seeds(self):
+        self.store('ab/cd/old.zip', age_days=40)
+        self.store('ab/cd/new.zip')
+        for relpath in ('ab/cd/old.zip', 'ab/cd/new.zip'):
+            SeedArtifact.objects.create(relpath=relpath, preset_name='P', creator_id=42)
+
+        report = run_cleanup(seed_path(''), max_age_days=30)
+        self.assertEqual((report['files_deleted'], report['artifacts_removed']), (1, 1))
+        self.assertEqual(list(SeedArtifact.objects.values_list('relpath', flat=True)), ['ab/cd/new.zip'])
+
+    def test_rehome_moves_flat_seeds_into_shards(self):
+        self.store('flat.zip')
+        self.store('notes.txt')
+        self.store('ab/cd/sharded.zip')
+
+        call_command('rehome_seeds', '--dry-run', stdout=StringIO())
+        self.assertTrue(seed_path('flat.zip').is_file())
+
+        out = StringIO()
+        call_command('rehome_seeds', stdout=out)
+        self.assertIn('Moved 1 seed file(s) into shards. 0 error(s).', out.getvalue())
+        relpath = shard_relpath('flat.zip')
+        self.assertRegex(relpath, r'^[0-9a-f]{2}/[0-9a-f]{2}/flat\.zip$')
+        self.assertTrue(seed_path(relpath).is_file())
+        self.assertFalse(seed_path('flat.zip').exists())
+        self.assertTrue(seed_path('notes.txt').is_file())
+        self.assertTrue(seed_path('ab/cd/sharded.zip').is_file())
+
+    def test_flat_media_links_redirect_to_the_sharded_download(self):
+        self.store('flat.zip')
+        SeedLog.objects.create(
+            creator_id=0, creator_name='Anonymous', seed_type='P', share_url=seed_url('flat.zip'),
+            timestamp='Jan 01 2025 00:00:00',
+        )
+        self.assertRedirects(self.client.get('/media/flat.zip'), '/download/flat.zip', fetch_redirect_response=False)
+
+        call_command('rehome_seeds', stdout=StringIO())
+        relpath = shard_relpath('flat.zip')
+        response = self.client.get('/media/flat.zip')
+        self.assertRedirects(response, f'/download/{relpath}', fetch_redirect_response=False)
+        self.assertEqual(self.client.get(response['Location']).status_code, 200)
+        self.assertEqual(self.client.get('/media/missing.zip').status_code, 404)
+
+
+@mock.patch('presets.cleanup.SeedArtifact')
+@mock.patch('presets.cleanup.CleanupRun')
+class SeedCleanupTests(SimpleTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.root = media.name
+        patch = self.settings(MEDIA_ROOT=self.root)
+        patch.enable()
+        self.addCleanup(patch.disable)
+
+    def store(self, relpath, age_days=0, size=100):
+        path = seed_path(relpath)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x' * size)
+        mtime = time.time() - age_days * 86400
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def remaining(self):
+        return sorted(Path(path).relative_to(self.root).as_posix() for path, _, _ in scan_seed_files(self.root))
+
+    def test_plan_splits_expired_and_over_budget_files(self, cleanup_run, seed_artifact):
+        entries = [('new', 10, 900), ('old', 10, 100), ('middle', 10, 500), ('newer', 10, 950)]
+        expired, over_budget, kept = plan_cleanup(entries, now=1000, max_age_seconds=600, max_total_bytes=20)
+        self.assertEqual([e[0] for e in expired], ['old'])
+        self.assertEqual([e[0] for e in over_budget], ['middle'])
+        self.assertEqual([e[0] for e in kept], ['new', 'newer'])
+
+    def test_age_cutoff_deletes_only_expired_seeds(self, cleanup_run, seed_artifact):
+        self.store('ab/cd/old.zip', age_days=31)
+        self.store('flat-old.zip', age_days=45)
+        self.store('ab/cd/new.zip', age_days=29)
+        self.store('ab/cd/notes.txt', age_days=90)
+
+        report = run_cleanup(self.root, max_age_days=30)
+        self.assertEqual((report['files_scanned'], report['files_deleted'], report['bytes_reclaimed']), (3, 2, 200))
+        self.assertEqual(self.remaining(), ['ab/cd/new.zip'])
+        self.assertTrue(seed_path('ab/cd/notes.txt').exists())
+        seed_artifact.objects.filter.assert_called_once_with(relpath__in=['flat-old.zip', 'ab/cd/old.zip'])
+        self.assertEqual(cleanup_run.objects.create.call_args.kwargs['files_deleted'], 2)
+
+    def test_size_cap_evicts_the_oldest_seeds_first(self, cleanup_run, seed_artifact):
+        self.store('aa/aa/oldest.zip', age_days=3)
+        self.store('bb/bb/older.zip', age_days=2)
+        self.store('cc/cc/newest.zip', age_days=1)
+
+        report = run_cleanup(self.root, max_total_bytes=150)
+        self.assertEqual([Path(e[0]).name for e in report['over_budget']], ['oldest.zip', 'older.zip'])
+        self.assertEqual((report['files_deleted'], report['bytes_remaining']), (2, 100))
+        self.assertEqual(self.remaining(), ['cc/cc/newest.zip'])
+
+    def test_dry_run_command_deletes_nothing(self, cleanup_run, seed_artifact):
+        self.store('ab/cd/old.zip', age_days=31)
+        self.store('ab/cd/new.zip')
+
+        out = StringIO()
+        call_command('cleanup_seeds', '--days', '30', '--max-size', '1K', '--dry-run', verbosity=2, stdout=out)
+        self.assertIn('Would delete (expired): old.zip [100 bytes]', out.getvalue())
+        self.assertIn('Would delete 1 file(s)', out.getvalue())
+        self.assertEqual(self.remaining(), ['ab/cd/new.zip', 'ab/cd/old.zip'])
+        seed_artifact.objects.filter.assert_not_called()
+        self.assertTrue(cleanup_run.objects.create.call_args.kwargs['dry_run'])
+
+
+class TrendingScoreTests(SeedBotTestCase):
+    def roll(self, preset_name, hours_ago=0):
+        rolled_at = datetime.now() - timedelta(hours=hours_ago)
+        SeedLog.objects.create(
+            creator_id=7, creator_name='roller', seed_type=preset_name, timestamp=rolled_at.strftime('%b %d %Y %H:%M:%S'),
+        )
+
+    def test_watermark_advances_without_any_scores(self):
+        self.roll('Deleted Preset')
+        self.roll('Deleted Preset')
+        self.assertEqual(update_trending_scores(), 0)
+        self.assertFalse(PresetTrendingScore.objects.exists())
+        self.assertEqual(TrendingWatermark.objects.get().last_row_id, 2)
+
+        # Rolls already passed over are not read again, even once the preset exists.
+        self.make_preset('Deleted Preset')
+        self.assertEqual(update_trending_scores(), 0)
+
+    def test_each_roll_is_counted_once(self):
+        self.make_preset('Popular')
+        self.make_preset('Quiet')
+        for _ in range(3):
+            self.roll('Popular')
+        self.roll('Quiet', hours_ago=72)
+        self.assertEqual(update_trending_scores(), 4)
+        scores = dict(PresetTrendingScore.objects.values_list('preset_name', 'score'))
+
+        self.assertEqual(update_trending_scores(), 0)
+        self.assertEqual(dict(PresetTrendingScore.objects.values_list('preset_name', 'score')), scores)
+        ranked = order_by_trending(Preset.objects.order_by('preset_name'))
+        self.assertEqual([preset.preset_name for preset in ranked], ['Popular', 'Quiet'])
+
+
+    def test_renumbered_seedlist_rebuilds_the_scores(self):
+        self.make_preset('Popular')
+        for hours_ago in (3, 2, 1):
+            self.roll('Popular', hours_ago=hours_ago)
+        self.assertEqual(update_trending_scores(), 3)
+
+        # The bot prunes the oldest roll and a VACUUM closes the gap, renumbering the rest.
+        with connections['seedbot_db'].cursor() as cursor:
+            cursor.execute('DELETE FROM seedlist WHERE rowid = 1')
+            cursor.execute('UPDATE seedlist SET rowid = rowid - 1')
+        self.roll('Popular')
+
+        self.assertEqual(update_trending_scores(), 3)
+        watermark = TrendingWatermark.objects.get()
+        self.assertEqual(watermark.last_row_id, 3)
+        self.assertEqual(update_trending_scores(), 0)
+
+class FlagIndexTests(SeedBotTestCase):
+    def test_parse_flags(self):
+        self.assertEqual(
+            parse_flags('-cg  -oa 2.3.3 -sl -oa 1.1.1 -name Two Words'),
+            {'-cg': '', '-oa': '1.1.1', '-sl': '', '-name': 'Two Words'},
+        )
+
+    def test_saved_presets_are_searchable(self):
+        self.make_preset('Open', flags='-cg -open -oa 2.3.3')
+        self.make_preset('Other Objective', flags='-cg -open -oa 2.2.2')
+        self.make_preset('Hidden', flags='-cg -open -oa 2.3.3', hidden=True)
+
+        self.assertEqual(sorted(presets_with_flag('-oa')), ['Open', 'Other Objective'])
+        self.assertEqual(presets_with_flag('-oa', '2.3.3'), ['Open'])
+        self.assertEqual(diff_flags('Open', 'Other Objective'), {'removed': [], 'added': [], 'changed': ['-oa']})
+
+    def test_similar_presets_ranks_by_overlap(self):
+        shared = ' '.join(f'-s{letter}' for letter in 'abcdefgh')
+        self.make_preset('Base', flags=f'{shared} -xa -xb')
+        self.make_preset('Close', flags=f'{shared} -ya')
+        self.make_preset('Closer', flags=f'{shared} -xa')
+        self.make_preset('Unrelated', flags='-sa -za -zb -zc -zd')
+        self.make_preset('Hidden Copy', flags=f'{shared} -xa -xb', hidden=True)
+
+        self.assertEqual(similar_presets('Base'), [('Closer', 0.9), ('Close', 8 / 11)])
+        self.assertEqual(similar_presets('Base', limit=1), [('Closer', 0.9)])
+
+    def test_sync_drops_presets_deleted_outside_the_site(self):
+        self.make_preset('Bot Deleted', flags='-cg -open')
+        with connections['seedbot_db'].cursor() as cursor:
+            cursor.execute("DELETE FROM presets WHERE preset_name = 'Bot Deleted'")
+
+        self.assertEqual(sync_flag_index(), {'indexed': 0, 'removed': 1})
+        self.assertEqual(presets_with_flag('-cg'), [])
+        self.assertFalse(PresetFlagSet.objects.exists())
+
+
+class DuplicatePresetTests(SeedBotTestCase):
+    FLAGS = ' '.join(f'-d{letter} {number}' for number, letter in enumerate('abcdefghijklmnopqrst'))
+
+    def test_reordered_and_cosmetic_flags_are_exact_duplicates(self):
+        self.make_preset('Original', flags=f'{self.FLAGS} -name Terra')
+        reordered = ' '.join(f'{flag} {value}' for flag, value in reversed(parse_flags(self.FLAGS).items()))
+        self.assertEqual(
+            duplicate_presets(parse_flags(f'-sl  {reordered}   -name Celes -cpor 1.2.3')), (['Original'], []),
+        )
+
+    def test_near_duplicates_and_exclusions(self):
+        self.make_preset('Original', flags=self.FLAGS)
+        self.make_preset('Hidden Copy', flags=self.FLAGS, hidden=True)
+        changed = parse_flags(self.FLAGS.replace('-dt 19', '-dt 20'))
+
+        exact, near = duplicate_presets(changed)
+        self.assertEqual(exact, [])
+        self.assertEqual([name for name, _ in near], ['Original'])
+        self.assertAlmostEqual(near[0][1], 19 / 21)
+        # An edited preset isn't its own duplicate.
+        self.assertEqual(duplicate_presets(parse_flags(self.FLAGS), exclude='Original'), ([], []))
+        # Too different to warn about.
+        self.assertEqual(duplicate_presets(parse_flags(self.FLAGS.replace('-dt 19', '-dt 20 -du'))), ([], []))
+
+    @mock.patch.object(PresetForm, '_validate_flags')
+    def test_form_warns_until_saving_anyway(self, validate_flags):
+        self.make_preset('Original', flags=self.FLAGS)
+        data = {'preset_name': 'Copy', 'flags': self.FLAGS, 'description': 'A copy.'}
+
+        form = PresetForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('Original', form.non_field_errors()[0])
+        validate_flags.assert_not_called()
+
+        self.assertTrue(PresetForm({**data, 'allow_duplicate': 'on'}).is_valid())
+        validate_flags.assert_called_once()
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class RollExportTests(SeedBotTestCase):
+    def roll(self, creator_id, day, hour=12, timestamp=None):
+        return SeedLog.objects.create(
+            creator_id=creator_id, creator_name=f'roller{creator_id}', seed_type=f'Day {day}',
+            timestamp=timestamp or datetime(2025, 1, day, hour).strftime('%b %d %Y %H:%M:%S'),
+        )
+
+    def test_user_csv_export_pages_through_only_their_rolls(self):
+        for day in range(1, 6):
+            self.roll(42, day)
+            self.roll(43, day)
+        self.assertEqual([len(chunk) for chunk in roll_chunks(creator_id=42)], [2, 2, 1])
+
+        self.client.force_login(self.make_user(42))
+        response = self.client.get('/my-rolls/export/?format=csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('filename="my-rolls.csv"', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['seed_type'] for row in rows], [f'Day {day}' for day in range(1, 6)])
+        self.assertEqual({row['creator_id'] for row in rows}, {'42'})
+
+    def test_admin_range_export_checks_rows_near_the_edges(self):
+        for day in range(1, 6):
+            self.roll(7, day)
+        # Logged after Jan 5, but rolled inside the range: found through RANGE_SLACK_ROWS.
+        self.roll(7, 2, hour=18)
+        self.roll(7, 3, timestamp='not a timestamp')
+
+        self.client.force_login(self.make_user(1, bot_admin=True))
+        response = self.client.get('/ops/rolls/export/?start=2025-01-02&end=2025-01-04&format=jsonl')
+        self.assertIn('filename="rolls-2025-01-02-to-2025-01-04.jsonl"', response['Content-Disposition'])
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(
+            [row['timestamp'] for row in rows],
+            ['Jan 02 2025 12:00:00', 'Jan 03 2025 12:00:00', 'Jan 02 2025 18:00:00'],
+        )
+        self.assertEqual(set(rows[0]), set(EXPORT_FIELDS))
+
+        with mock.patch('presets.exports.RANGE_SLACK_ROWS', 0):
+            chunks = roll_chunks(start=datetime(2025, 1, 2), end=datetime(2025, 1, 4))
+            self.assertEqual([row['seed_type'] for chunk in chunks for row in chunk], ['Day 2', 'Day 3'])
+
+    def test_range_export_is_for_bot_admins(self):
+        self.client.force_login(self.make_user(42))
+        self.assertEqual(self.client.get('/ops/rolls/export/?start=2025-01-02&end=2025-01-04').status_code, 403)
+
+
+class RollFailureTests(SeedBotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.preset = self.make_preset('Failing')
+        self.minutes = 0
+
+    def record(self, stderr, script_dir='WorldsCollide', returncode=1):
+        self.minutes += 1
+        exc = subprocess.CalledProcessError(returncode, ['python3', 'wc.py'], stderr=stderr)
+        timer = RollTimer(None, self.preset.preset_name, script_dir)
+        timer.durations['generate'] = 1234.56
+        with mock.patch('presets.failures.timezone.now', return_value=timezone.now() + timedelta(minutes=self.minutes)):
+            record_failure(self.preset, timer, exc)
+
+    def test_describe_keeps_the_last_line_and_stderr_tail(self):
+        exc = subprocess.CalledProcessError(2, ['wc.py'], stderr='Traceback\n  File "wc.py"\nValueError: bad flag -x\n\n')
+        with self.settings(ROLL_FAILURE_STDERR_CHARS=10):
+            details = describe(exc)
+        self.assertEqual(details['exit_code'], 2)
+        self.assertEqual(details['message'], 'ValueError: bad flag -x')
+        self.assertEqual(details['stderr'], ' flag -x\n\n')
+
+    def test_same_error_is_grouped_whatever_its_numbers_and_paths(self):
+        self.record('KeyError: 123 in /tmp/seed_1/wc.py')
+        self.record('KeyError: 456 in /tmp/seed_2/wc.py')
+
+        failure = RollFailure.objects.get()
+        self.assertEqual(failure.count, 2)
+        self.assertEqual(failure.message, 'KeyError: 456 in /tmp/seed_2/wc.py')
+        self.assertEqual(failure.timings, {'generate': 1234.6})
+        self.assertLess(failure.first_seen, failure.last_seen)
+
+    def test_different_errors_start_new_groups(self):
+        self.record('KeyError: 1')
+        self.record('ValueError: 1')
+        self.record('KeyError: 1', script_dir='WorldsCollide_Door_Rando')
+        self.record('KeyError: 1', returncode=2)
+        self.assertEqual(RollFailure.objects.count(), 4)
+
+    def test_least_recently_seen_groups_are_dropped(self):
+        with self.settings(ROLL_FAILURE_MAX_GROUPS=2):
+            self.record('First 1')
+            self.record('Second')
+            self.record('First 2')
+            self.record('Third')
+
+        self.assertEqual([failure['error'] for failure in recent_failures(10)], ['Third', 'First 2'])
+        self.assertEqual(recent_failures(10)[1]['count'], 2)
+
+
+class OpsDashboardTests(SeedBotTestCase):
+    def setUp(self):
+        super().setUp()
+        started = time.time() - 5
+        active = {'worker1': [{
+            'id': 'task-1', 'name': 'presets.tasks.create_local_seed_task',
+            'args': ['Dash Preset', 42, 'roller'], 'time_start': started,
+        }]}
+        stats = {'worker1': {'pool': {'max-concurrency': 4}, 'total': {'presets.tasks.create_local_seed_task': 10}, 'uptime': 600}}
+        queues = {'worker1': [{'name': 'rolls'}]}
+        for target, value in (
+            ('_inspect', mock.Mock(return_value=(active, stats, queues))),
+            ('queue_depths', mock.Mock(side_effect=lambda names: {name: 3 for name in names})),
+            ('_progress', mock.Mock(return_value={'task-1': 'Generating seed...'})),
+        ):
+            patch = mock.patch(f'presets.dashboard.{target}', value)
+            setattr(self, target.lstrip('_'), patch.start())
+            self.addCleanup(patch.stop)
+
+        for duration_ms, succeeded in ((1000, True), (3000, True), (500, False)):
+            RollTiming.objects.create(
+                roll_id='r', preset_name='Dash Preset', stage='total', duration_ms=duration_ms, succeeded=succeeded,
+            )
+
+    def test_snapshot_summarises_workers_tasks_and_rolls(self):
+        snapshot = dashboard_snapshot()
+        self.assertEqual(
+            snapshot['queues'],
+            sorted([{'name': 'rolls', 'depth': 3}, {'name': app.conf.task_default_queue, 'depth': 3}], key=lambda q: q['name']),
+        )
+        self.assertEqual(snapshot['workers'], [{
+            'name': 'worker1', 'concurrency': 4, 'active': 1, 'processed': 10, 'per_minute': 1.0, 'uptime_seconds': 600,
+        }])
+        task = snapshot['active_tasks'][0]
+        self.assertEqual(
+            (task['name'], task['preset'], task['status']),
+            ('create_local_seed_task', 'Dash Preset', 'Generating seed...'),
+        )
+        self.assertGreaterEqual(task['running_seconds'], 5)
+        self.progress.assert_called_once_with(['task-1'])
+        rolls = snapshot['rolls']
+        self.assertEqual((rolls['rolls'], rolls['failed'], rolls['mean_ms']), (3, 1, 2000))
+        self.assertAlmostEqual(rolls['failure_rate'], 1 / 3)
+
+    def test_snapshot_is_shared_between_viewers(self):
+        self.assertEqual(dashboard_snapshot(), dashboard_snapshot())
+        self.inspect.assert_called_once()
+
+    def test_dashboard_data_is_for_bot_admins(self):
+        response = self.client.get('/ops/dashboard.json')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith('/accounts/login/'))
+
+        self.client.force_login(self.make_user(42))
+        self.assertEqual(self.client.get('/ops/dashboard.json').status_code, 403)
+        self.inspect.assert_not_called()
+
+        self.client.force_login(self.make_user(1, bot_admin=True))
+        response = self.client.get('/ops/dashboard.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['workers'][0]['name'], 'worker1')
+
+
+class ScriptedWCApiHandler(BaseHTTPRequestHandler):
+    """Stub WorldsCollide API answering with the server's scripted (status, body, delay) responses."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.requests.append(self.client_address)
+        status, body, delay = self.server.script.pop(0) if self.server.script else (200, b'{"url": "seed"}', 0)
+        time.sleep(delay)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubWCApiServer(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ScriptedWCApiHandler)
+        self.script = []
+        self.requests = []
+
+    def handle_error(self, request, client_address):
+        # The client gave up on a delayed response.
+        pass
+
+
+@override_settings(
+    CACHES=in_memory_caches(), WC_API_KEY='key', WC_API_RETRIES=1, WC_API_READ_TIMEOUT=0.3,
+    WC_API_BREAKER_THRESHOLD=2, WC_API_BREAKER_RESET_SECONDS=0.2,
+)
+class WCApiClientTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.server = StubWCApiServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        settings_patch = self.settings(WC_API_URL=f'http://127.0.0.1:{self.server.server_address[1]}/api/seed')
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        self.api = WCApiClient()
+        self.addCleanup(self.api.session.close)
+
+    def test_connections_are_reused(self):
+        self.assertEqual(self.api.generate_seed('-cg'), {'url': 'seed'})
+        self.assertEqual(self.api.generate_seed('-cg'), {'url': 'seed'})
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(len(set(self.server.requests)), 1)
+
+    def test_upstream_errors_are_retried(self):
+        for status in (503, 429):
+            self.server.script = [(status, b'', 0), (200, b'{"url": "seed"}', 0)]
+            self.assertEqual(self.api.generate_seed('-cg'), {'url': 'seed'})
+        self.assertEqual(len(self.server.requests), 4)
+        self.server.script = [(502, b'', 0), (502, b'', 0)]
+        with self.assertRaises(WCApiError) as raised:
+            self.api.generate_seed('-cg')
+        self.assertEqual(raised.exception.status_code, 502)
+        self.assertTrue(raised.exception.upstream_failure)
+
+    def test_async_client_retries_upstream_errors(self):
+        self.server.script = [(503, b'', 0), (200, b'{"url": "seed"}', 0)]
+        with mock.patch('presets.wc_api._retry_delay', return_value=0):
+            self.assertEqual(async_to_sync(self.api.agenerate_seed)('-cg'), {'url': 'seed'})
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_read_timeout_is_not_retried(self):
+        self.server.script = [(200, b'{"url": "late"}', 1)]
+        with self.assertRaises(WCApiError) as raised:
+            self.api.generate_seed('-cg')
+        self.assertIsNone(raised.exception.response)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_rejections_and_bad_responses(self):
+        self.server.script = [(400, b'{"error": "bad flags"}', 0)]
+        with self.assertRaises(WCApiError) as raised:
+            self.api.generate_seed('-nonsense')
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertFalse(raised.exception.upstream_failure)
+
+        self.server.script = [(200, b'not json', 0)]
+        with self.assertRaisesMessage(WCApiError, 'unreadable'):
+            self.api.generate_seed('-cg')
+        # The API answered both, so the breaker stays closed.
+        self.assertEqual(self.api.breaker.failures, 0)
+
+    def test_breaker_opens_and_recovers_half_open(self):
+        self.server.script = [(500, b'', 0)] * 4
+        for _ in range(2):
+            with self.assertRaises(WCApiError):
+                self.api.generate_seed('-cg')
+        self.assertTrue(self.api.should_use_local())
+        with self.assertRaises(CircuitOpenError):
+            self.api.generate_seed('-cg')
+        self.assertEqual(len(self.server.requests), 4)
+
+        time.sleep(0.25)
+        # One trial request is let through; its success closes the circuit.
+        self.assertEqual(self.api.generate_seed('-cg'), {'url': 'seed'})
+        self.assertFalse(self.api.breaker.is_open)
+        self.assertEqual(self.api.breaker.failures, 0)
+
+    def test_failed_trial_reopens_the_breaker(self):
+        self.server.script = [(500, b'', 0)] * 6
+        for _ in range(2):
+            with self.assertRaises(WCApiError):
+                self.api.generate_seed('-cg')
+        time.sleep(0.25)
+        with self.assertRaises(WCApiError):
+            self.api.generate_seed('-cg')
+        with self.assertRaises(CircuitOpenError):
+            self.api.generate_seed('-cg')
+
+
+@override_settings(SEED_POOL_ENABLED=False, WC_API_PROBE_INTERVAL_SECONDS=60)
+class RollRoutingTests(SeedBotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_preset('Standard Preset')
+        self.api = WCApiClient()
+        self.api.agenerate_seed = mock.AsyncMock(return_value={'url': 'https://ff6worldscollide.com/seed/1'})
+        patches = [
+            mock.patch('presets.views.get_client', return_value=self.api),
+            mock.patch.object(roll_log, 'write_rows_to_gsheets'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        patch = mock.patch('presets.views.create_local_seed_task')
+        self.local_task = patch.start()
+        self.local_task.delay.return_value.id = 'task-id'
+        self.addCleanup(patch.stop)
+
+    def roll(self):
+        return self.client.post('/Standard Preset/roll/').json()
+
+    def degrade(self):
+        for _ in range(ApiHealth.MIN_SAMPLES):
+            self.api.health.record(1.0, failed=True)
+
+    def test_healthy_api_rolls_through_the_api(self):
+        self.assertEqual(self.roll()['method'], 'api')
+        self.local_task.delay.assert_not_called()
+
+    def test_degraded_api_rolls_locally(self):
+        self.degrade()
+        self.api.health.claim_probe()
+        self.assertEqual(self.roll(), {'method': 'local', 'task_id': 'task-id'})
+        self.api.agenerate_seed.assert_not_called()
+
+    def test_one_probe_per_interval_reaches_a_degraded_api(self):
+        self.degrade()
+        self.assertEqual([self.roll()['method'] for _ in range(3)], ['api', 'local', 'local'])
+        self.api.agenerate_seed.assert_called_once()
+
+    def test_upstream_failure_falls_back_to_local(self):
+        self.api.agenerate_seed.side_effect = WCApiError('down')
+        self.assertEqual(self.roll(), {'method': 'local', 'task_id': 'task-id'})
+        self.api.agenerate_seed.side_effect = WCApiError('busy', mock.Mock(status_code=503))
+        self.assertEqual(self.roll()['method'], 'local')
+
+    def test_rejected_flags_are_reported(self):
+        self.api.agenerate_seed.side_effect = WCApiError('rejected', mock.Mock(status_code=400))
+        response = self.client.post('/Standard Preset/roll/')
+        self.assertEqual(response.status_code, 400)
+        self.local_task.delay.assert_not_called()
+
+
+@mock.patch('presets.forms.run_sandboxed')
+class LocalFlagValidationTests(SeedBotTestCase):
+    def validate(self):
+        form = PresetForm({'preset_name': 'Practice', 'flags': '-cg -open', 'description': 'x', 'arguments': ['practice']})
+        self.assertFalse(form.is_valid())
+        return form.errors['flags'][0]
+
+    def test_rejections_are_cached(self, run):
+        run.side_effect = subprocess.CalledProcessError(1, ['wc.py'], stderr='bad flag -open')
+        run.side_effect.limit_hit = False
+        self.assertIn('bad flag -open', self.validate())
+        self.assertIn('bad flag -open', self.validate())
+        run.assert_called_once()
+
+    def test_limit_kills_are_not_cached(self, run):
+        run.side_effect = subprocess.CalledProcessError(1, ['wc.py'], stderr='MemoryError')
+        run.side_effect.limit_hit = True
+        self.assertIn('ran out of resources', self.validate())
+        self.assertIn('ran out of resources', self.validate())
+        self.assertEqual(run.call_count, 2)
+
+    def test_timeouts_are_reported_not_raised(self, run):
+        run.side_effect = subprocess.TimeoutExpired(['wc.py'], 120)
+        self.assertIn('took too long', self.validate())
+        self.assertIn('took too long', self.validate())
+        self.assertEqual(run.call_count, 2)
+
+
+class SeedPoolTests(SeedBotTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        patch = self.settings(MEDIA_ROOT=media.name)
+        patch.enable()
+        self.addCleanup(patch.disable)
+        self.preset = self.make_preset('Popular', flags='-cg -open')
+
+    def pool(self, name, preset=None):
+        preset = preset or self.preset
+        relpath = f'ab/cd/{name}.zip'
+        path = seed_path(relpath)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'seed')
+        return PooledSeed.objects.create(preset_name=preset.preset_name, flags_hash=pool_key(preset), relpath=relpath)
+
+    def test_each_seed_is_handed_out_once(self):
+        seeds = [self.pool('first'), self.pool('second')]
+        claimed = [claim_pooled_seed(self.preset) for _ in range(3)]
+        self.assertEqual([seed.pk for seed in claimed[:2]], [seed.pk for seed in seeds])
+        self.assertIsNone(claimed[2])
+
+    def test_seed_claimed_by_a_concurrent_roll_is_skipped(self):
+        seeds = [self.pool('first'), self.pool('second')]
+        # Both rolls read the same candidates before either claims one.
+        candidates = PooledSeed.objects.filter(pk__in=[seed.pk for seed in seeds]).order_by('created_at')
+        with mock.patch('presets.seed_pool.available_seeds', return_value=candidates):
+            first = claim_pooled_seed(self.preset)
+            second = claim_pooled_seed(self.preset)
+        self.assertNotEqual(first.pk, second.pk)
+
+    def test_entries_without_a_file_are_dropped(self):
+        missing = self.pool('missing')
+        seed_path(missing.relpath).unlink()
+        present = self.pool('present')
+
+        self.assertEqual(claim_pooled_seed(self.preset).pk, present.pk)
+        self.assertFalse(PooledSeed.objects.filter(pk=missing.pk).exists())
+
+    def test_changed_flags_or_arguments_drop_stale_seeds(self):
+        kept = self.pool('kept')
+        self.preset.description = 'Only the description changed.'
+        self.preset.save()
+        self.assertTrue(PooledSeed.objects.filter(pk=kept.pk).exists())
+
+        self.preset.flags = '-cg -open -sl'
+        self.preset.save()
+        self.assertFalse(PooledSeed.objects.filter(pk=kept.pk).exists())
+        self.assertFalse(seed_path(kept.relpath).exists())
+
+        current = self.pool('current')
+        self.preset.arguments = 'loot'
+        self.preset.save()
+        self.assertFalse(PooledSeed.objects.filter(pk=current.pk).exists())
+
+    @override_settings(SEED_POOL_TOP_N=2, SEED_POOL_MIN_SIZE=2, SEED_POOL_MAX_SIZE=3, SEED_POOL_HORIZON_MINUTES=60)
+    def test_refill_targets_stay_within_bounds(self):
+        Preset.objects.filter(pk='Popular').update(gen_count=100)
+        self.make_preset('Quiet', gen_count=50)
+        self.make_preset('Unpopular', gen_count=1)
+        timestamp = datetime.now().strftime('%b %d %Y %H:%M:%S')
+        SeedLog.objects.bulk_create([
+            SeedLog(creator_id=7, creator_name='roller', seed_type='Popular', timestamp=timestamp) for _ in range(240)
+        ])
+        self.pool('waiting')
+
+        plan = {preset.preset_name: (target, missing) for preset, target, missing in plan_refill()}
+        # 10 rolls an hour would want 10 seeds, capped at 3; no demand still keeps 2.
+        self.assertEqual(plan, {'Popular': (3, 2), 'Quiet': (2, 2)})
+
+
+class ProfilingTests(SeedBotTestCase):
+    def setUp(self):
+        super().setUp()
+        profiles = tempfile.TemporaryDirectory()
+        self.addCleanup(profiles.cleanup)
+        patch = self.settings(PROFILING_DIR=profiles.name, PROFILING_TOKEN='profile-me')
+        patch.enable()
+        self.addCleanup(patch.disable)
+        self.make_preset('Profiled Preset')
+
+    def test_token_request_is_profiled_per_database(self):
+        response = self.client.get('/Profiled Preset/', HTTP_X_SEEDBOT_PROFILE='profile-me')
+        self.assertEqual(response.status_code, 200)
+
+        profile = load_profile(response['X-Seedbot-Profile-Id'])
+        self.assertEqual(profile['path'], '/Profiled%20Preset/')
+        self.assertEqual(profile['status'], 200)
+        self.assertGreater(profile['databases']['seedbot_db']['queries'], 0)
+        self.assertGreater(profile['template_ms'], 0)
+        self.assertIn('cumulative', profile['profile_text'])
+
+    def test_other_requests_are_left_alone(self):
+        for headers in ({}, {'HTTP_X_SEEDBOT_PROFILE': 'wrong'}):
+            response = self.client.get('/Profiled Preset/', **headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Seedbot-Profile-Id', response)
+        self.assertEqual(list_profiles(), [])
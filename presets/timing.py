@@ -0,0 +1,151 @@
+# presets/timing.py
+import math
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import RollTiming
+
+# Stages of the local roll pipeline, in the order they run. 'metrics' (the
+# metrics sheet append) runs once per roll log write, not per roll; see record_stage.
+ROLL_STAGES = ['flags', 'generator', 'johnnydmad', 'zip', 'move', 'db', 'metrics', 'total']
+QUANTILES = (0.5, 0.95)
+
+
+class RollTimer:
+    """Collects per-stage durations for one roll and saves them in a single write."""
+
+    def __init__(self, roll_id, preset_name, script_dir=''):
+        self.roll_id = roll_id or ''
+        self.preset_name = preset_name
+        self.script_dir = script_dir
+        self.durations = {}
+        self.usage = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.durations[name] = self.durations.get(name, 0) + elapsed_ms
+
+    def record_usage(self, stage, usage):
+        """Adds a sandboxed subprocess's CPU time and peak RSS (see presets.sandbox) to a stage."""
+        if not usage:
+            return
+        totals = self.usage.setdefault(stage, {'cpu_ms': 0.0, 'max_rss_kb': None})
+        totals['cpu_ms'] += usage['cpu_ms']
+        if usage['max_rss_kb'] is not None:
+            totals['max_rss_kb'] = max(totals['max_rss_kb'] or 0, usage['max_rss_kb'])
+
+    def save(self, succeeded=True):
+        """Writes one RollTiming row per recorded stage plus the overall total."""
+        self.durations['total'] = (time.perf_counter() - self._started) * 1000
+        rows = [
+            RollTiming(
+                roll_id=self.roll_id, preset_name=self.preset_name,
+                script_dir=self.script_dir, stage=stage,
+                duration_ms=duration, succeeded=succeeded,
+                cpu_ms=self.usage.get(stage, {}).get('cpu_ms'),
+                max_rss_kb=self.usage.get(stage, {}).get('max_rss_kb'),
+            )
+            for stage, duration in self.durations.items()
+        ]
+        try:
+            RollTiming.objects.bulk_create(rows)
+        except Exception as e:
+            # Timing must never break a roll.
+            print(f"Unable to save roll timings: {e}")
+
+
+def record_stage(stage, duration_ms, succeeded=True):
+    """
+    Saves the timing of a stage that runs once for a batch of rolls rather
+    than within one roll, so it has no roll or preset of its own.
+    """
+    try:
+        RollTiming.objects.create(roll_id='', preset_name='', stage=stage, duration_ms=duration_ms, succeeded=succeeded)
+    except Exception as e:
+        print(f"Unable to save {stage} timing: {e}")
+
+
+def _percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def stage_summaries(hours=24, preset_name=None, script_dir=None):
+    """
+    Returns per-stage count/mean/p50/p95 (in ms) for rolls recorded
+    in the last `hours`, optionally filtered by preset or script directory.
+    """
+    since = timezone.now() - timedelta(hours=hours)
+    rows = RollTiming.objects.filter(created_at__gte=since, succeeded=True)
+    if preset_name:
+        rows = rows.filter(preset_name=preset_name)
+    if script_dir:
+        rows = rows.filter(script_dir=script_dir)
+
+    by_stage, cpu_by_stage, rss_by_stage = {}, {}, {}
+    for stage, duration, cpu_ms, max_rss_kb in rows.values_list('stage', 'duration_ms', 'cpu_ms', 'max_rss_kb').iterator():
+        by_stage.setdefault(stage, []).append(duration)
+        if cpu_ms is not None:
+            cpu_by_stage.setdefault(stage, []).append(cpu_ms)
+        if max_rss_kb is not None:
+            rss_by_stage.setdefault(stage, []).append(max_rss_kb)
+
+    summaries = []
+    ordered = ROLL_STAGES + sorted(set(by_stage) - set(ROLL_STAGES))
+    for stage in ordered:
+        values = sorted(by_stage.get(stage, []))
+        if not values:
+            continue
+        summaries.append({
+            'stage': stage,
+            'count': len(values),
+            'sum': sum(values),
+            'mean': sum(values) / len(values),
+            'p50': _percentile(values, 0.5),
+            'p95': _percentile(values, 0.95),
+            'cpu_mean': sum(cpu_by_stage[stage]) / len(cpu_by_stage[stage]) if stage in cpu_by_stage else None,
+            'max_rss_kb': max(rss_by_stage[stage]) if stage in rss_by_stage else None,
+        })
+    return summaries
+
+
+def render_prometheus(summaries):
+    """Formats stage summaries in the Prometheus text exposition format."""
+    lines = [
+        '# HELP seedbot_roll_stage_seconds Duration of local roll pipeline stages.',
+        '# TYPE seedbot_roll_stage_seconds summary',
+    ]
+    for summary in summaries:
+        label = f'stage="{summary["stage"]}"'
+        for q in QUANTILES:
+            value = summary[f'p{round(q * 100)}']
+            lines.append(f'seedbot_roll_stage_seconds{{{label},quantile="{q}"}} {value / 1000:.6f}')
+        lines.append(f'seedbot_roll_stage_seconds_sum{{{label}}} {summary["sum"] / 1000:.6f}')
+        lines.append(f'seedbot_roll_stage_seconds_count{{{label}}} {summary["count"]}')
+    timed = [summary for summary in summaries if summary['cpu_mean'] is not None]
+    if timed:
+        lines += [
+            '# HELP seedbot_roll_stage_cpu_seconds_mean Mean CPU time of sandboxed generator stages.',
+            '# TYPE seedbot_roll_stage_cpu_seconds_mean gauge',
+        ]
+        lines += [f'seedbot_roll_stage_cpu_seconds_mean{{stage="{s["stage"]}"}} {s["cpu_mean"] / 1000:.6f}' for s in timed]
+    measured = [summary for summary in summaries if summary['max_rss_kb'] is not None]
+    if measured:
+        lines += [
+            '# HELP seedbot_roll_stage_max_rss_bytes Peak resident memory of sandboxed generator stages.',
+            '# TYPE seedbot_roll_stage_max_rss_bytes gauge',
+        ]
+        lines += [f'seedbot_roll_stage_max_rss_bytes{{stage="{s["stage"]}"}} {s["max_rss_kb"] * 1024}' for s in measured]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,128 @@
+# presets/trending.py
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.expressions import RawSQL
+
+from .models import Preset, SeedLog, PresetTrendingScore, TrendingWatermark
+from .rollstats import parse_timestamp
+from .catalog import bump_catalog_version
+
+# Scores are log2 of sum(2 ** ((rolled_at - EPOCH) / half_life)) over a preset's
+# rolls. Decaying every score by the same factor never changes the ranking, so
+# the stored values only change when new rolls arrive.
+EPOCH = datetime(2024, 1, 1)
+CHUNK_SIZE = 2000
+
+
+def _log2_add(a, b):
+    """log2(2**a + 2**b) without overflowing."""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def roll_weight(rolled_at):
+    """A single roll's contribution to a score, in log2 space."""
+    half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+    return (rolled_at - EPOCH).total_seconds() / half_life
+
+
+def current_value(score, now=None):
+    """Converts a stored score into today's decayed roll count."""
+    return 2 ** (score - roll_weight(now or datetime.now()))
+
+
+def update_trending_scores():
+    """
+    Folds roll log entries added since the last run into the scores. The
+    first run only looks back TRENDING_LOOKBACK_DAYS. If the seedlist's
+    rowids no longer match the watermark (a VACUUM renumbered them, or the
+    bot pruned rows), the scores are rebuilt the same way. Returns the
+    number of rolls processed.
+    """
+    watermark = TrendingWatermark.objects.filter(pk=1).values('last_row_id', 'last_timestamp').first()
+    if watermark and not _watermark_holds(watermark):
+        print("The seedlist no longer matches the trending watermark; rebuilding the trending scores.")
+        with transaction.atomic():
+            PresetTrendingScore.objects.all().delete()
+            TrendingWatermark.objects.all().delete()
+        watermark = None
+    oldest = datetime.now() - timedelta(days=settings.TRENDING_LOOKBACK_DAYS) if watermark is None else None
+    preset_names = set(Preset.objects.values_list('preset_name', flat=True))
+    rows = SeedLog.objects.annotate(row_id=RawSQL('rowid', [])).order_by('row_id')
+
+    processed = 0
+    last_row_id = watermark['last_row_id'] if watermark else 0
+    while True:
+        chunk = list(rows.filter(row_id__gt=last_row_id).values_list('row_id', 'seed_type', 'timestamp')[:CHUNK_SIZE])
+        if not chunk:
+            if processed:
+                bump_catalog_version()
+            return processed
+        increments = defaultdict(lambda: None)
+        for row_id, seed_type, timestamp in chunk:
+            rolled_at = parse_timestamp(timestamp)
+            if seed_type not in preset_names or rolled_at is None:
+                continue
+            if oldest and rolled_at < oldest:
+                continue
+            increments[seed_type] = _log2_add(increments[seed_type], roll_weight(rolled_at))
+            processed += 1
+        last_row_id, _, last_timestamp = chunk[-1]
+        _apply(increments, last_row_id, last_timestamp)
+
+
+def _watermark_holds(watermark):
+    """
+    Whether the seedlist row at the watermark is still the row folded in
+    last. The seedlist is the bot's table and has no INTEGER PRIMARY KEY, so
+    its rowids are only stable until a VACUUM renumbers them.
+    """
+    if not watermark['last_timestamp']:
+        # Carried over from the scores (migration 0014); recorded from the next chunk on.
+        return True
+    timestamp = (
+        SeedLog.objects.annotate(row_id=RawSQL('rowid', [])).filter(row_id=watermark['last_row_id'])
+        .values_list('timestamp', flat=True).first()
+    )
+    return timestamp == watermark['last_timestamp']
+
+
+def _apply(increments, last_row_id, last_timestamp):
+    with transaction.atomic():
+        existing = {
+            row.preset_name: row
+            for row in PresetTrendingScore.objects.select_for_update().filter(preset_name__in=list(increments))
+        }
+        changed, created = [], []
+        for preset_name, weight in increments.items():
+            row = existing.get(preset_name)
+            if row:
+                row.score = _log2_add(row.score, weight)
+                row.last_row_id = last_row_id
+                changed.append(row)
+            else:
+                created.append(PresetTrendingScore(preset_name=preset_name, score=weight, last_row_id=last_row_id))
+        PresetTrendingScore.objects.bulk_update(changed, ['score', 'last_row_id'])
+        PresetTrendingScore.objects.bulk_create(created)
+        # In the same transaction as the scores, so a chunk is never folded in twice.
+        TrendingWatermark.objects.update_or_create(
+            pk=1, defaults={'last_row_id': last_row_id, 'last_timestamp': last_timestamp or ''},
+        )
+
+
+def order_by_trending(presets):
+    """
+    Sorts presets by trending score. The scores live in the webapp database
+    and the presets in the bot's, so the ranking is applied in Python; presets
+    that haven't been rolled recently follow in their existing order.
+    """
+    ranked = PresetTrendingScore.objects.order_by('-score').values_list('preset_name', flat=True)
+    position = {name: index for index, name in enumerate(ranked)}
+    unranked = len(position)
+    return sorted(presets, key=lambda preset: position.get(preset.preset_name, unranked))
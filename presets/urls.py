@@ -6,8 +6,19 @@ urlpatterns = [
     # --- Non-PK routes first ---
     path('', views.preset_list_view, name='preset-list'),
     path('my-presets/', views.my_presets_view, name='my-presets'),
+    path('my-rolls/export/', views.my_rolls_export_view, name='my-rolls-export'),
     path('create/', views.preset_create_view, name='preset-create'),
+    path('csrf/', views.csrf_token_view, name='csrf-token'),
     path('roll-status/<str:task_id>/', views.get_local_seed_roll_status_view, name='get-local-seed-roll-status'),
+    path('bulk-roll/<int:batch_id>/', views.bulk_roll_status_view, name='bulk-roll-status'),
+    path('download/<path:relpath>', views.seed_download_view, name='seed-download'),
+    path('ops/', views.ops_dashboard_view, name='ops-dashboard'),
+    path('ops/dashboard.json', views.ops_dashboard_data_view, name='ops-dashboard-data'),
+    path('ops/rolls/export/', views.roll_export_view, name='ops-roll-export'),
+    path('ops/roll-timings/', views.roll_timings_view, name='ops-roll-timings'),
+    path('ops/profiles/', views.profile_list_view, name='ops-profile-list'),
+    path('ops/profiles/<str:profile_id>/', views.profile_detail_view, name='ops-profile-detail'),
+    path('metrics/', views.metrics_view, name='metrics'),
 
     # --- Routes that use the preset's PK ---
     path('<path:pk>/update/', views.preset_update_view, name='preset-update'),
@@ -16,6 +27,7 @@ urlpatterns = [
     
     # This is now the single endpoint for all seed rolling
     path('<path:pk>/roll/', views.roll_seed_dispatcher_view, name='roll-seed'),
+    path('<path:pk>/bulk-roll/', views.bulk_roll_view, name='bulk-roll'),
     
     # The general "catch-all" for a preset name comes last.
     path('<path:pk>/', views.preset_detail_view, name='preset-detail'),
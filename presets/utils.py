@@ -1,30 +1,54 @@
-import pygsheets
+import os
+
 from django.conf import settings
 
+_worksheet = None
+_worksheet_pid = None
+
+def _metrics_row(metrics_data):
+    """Orders a metrics dict into the columns of the metrics sheet."""
+    return [
+        metrics_data.get('creator_id'),
+        metrics_data.get('creator_name'),
+        metrics_data.get('seed_type'),
+        metrics_data.get('random_sprites', 'N/A'),
+        metrics_data.get('share_url'),
+        metrics_data.get('timestamp'),
+        metrics_data.get('server_name', 'WebApp'),
+        metrics_data.get('server_id', 'N/A'),
+        metrics_data.get('channel_name', 'N/A'),
+        metrics_data.get('channel_id', 'N/A'),
+    ]
+
 def write_to_gsheets(metrics_data):
     """Writes a row of data to the SeedBot Metrics Google Sheet."""
-    try:
+    write_rows_to_gsheets([metrics_data])
+
+def _metrics_worksheet():
+    """
+    The SeedBot Metrics worksheet, opened once per process. pygsheets drags in
+    the whole Google API client stack, so it is imported on the first write
+    instead of by every web and worker process at startup.
+    """
+    global _worksheet, _worksheet_pid
+    if _worksheet is None or _worksheet_pid != os.getpid():
+        import pygsheets
         # This path assumes the service file is in the 'db' folder of the adjacent project
         keyfile_path = settings.BASE_DIR.parent / 'seedbot2000' / 'db' / 'seedbot-metrics-56ffc0ce1d4f.json'
         gc = pygsheets.authorize(service_file=str(keyfile_path))
-        sh = gc.open('SeedBot Metrics')
-        wks = sh[0]
-        
-        # Prepare values in the correct order for the sheet
-        values_to_insert = [
-            metrics_data.get('creator_id'),
-            metrics_data.get('creator_name'),
-            metrics_data.get('seed_type'),
-            metrics_data.get('random_sprites', 'N/A'),
-            metrics_data.get('share_url'),
-            metrics_data.get('timestamp'),
-            metrics_data.get('server_name', 'WebApp'),
-            metrics_data.get('server_id', 'N/A'),
-            metrics_data.get('channel_name', 'N/A'),
-            metrics_data.get('channel_id', 'N/A'),
-        ]
-        
+        _worksheet = gc.open('SeedBot Metrics')[0]
+        _worksheet_pid = os.getpid()
+    return _worksheet
+
+def write_rows_to_gsheets(metrics_rows):
+    """Appends several rows to the SeedBot Metrics Google Sheet in a single request."""
+    global _worksheet
+    try:
+        wks = _metrics_worksheet()
+        values_to_insert = [_metrics_row(metrics_data) for metrics_data in metrics_rows]
         wks.append_table(values=values_to_insert, start='A1', end=None, dimension='ROWS', overwrite=False)
         print("Successfully wrote to Google Sheet.")
     except Exception as e:
+        # Start from a fresh authorization next time.
+        _worksheet = None
         print(f'Unable to write to gsheets because of:\n{e}')
\ No newline at end of file
@@ -1,29 +1,52 @@
-import requests 
+import hmac
 import json     
-import pygsheets
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.conf import settings 
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.core.exceptions import PermissionDenied
-from django.db.models import Q, Count
-from django.http import JsonResponse
+from django.db.models import F, Q, Count
+from django.http import JsonResponse, HttpResponse, Http404, FileResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
 from allauth.socialaccount.models import SocialAccount
-from celery.result import AsyncResult
+from asgiref.sync import sync_to_async
 import os
+from urllib.parse import quote
 
 from . import flag_processor
-from .models import Preset, UserPermission, FeaturedPreset, SeedLog
+from .wc_api import get_client, WCApiError, render_api_prometheus
+from .models import Preset, FeaturedPreset, SeedLog, SeedArtifact, BulkRollBatch
 from .forms import PresetForm
-from .decorators import discord_login_required
-from .tasks import create_local_seed_task
-from .utils import write_to_gsheets
+from .decorators import discord_login_required, bot_admin_required, get_user_permissions, client_ip
+from celery import chord
+from .tasks import create_local_seed_task, generate_bulk_seed_task, finalize_bulk_roll_task, fail_bulk_roll_task
+from .rolling import record_roll
+from .seed_pool import claim_pooled_seed
+from .trending import order_by_trending
+from .flag_index import presets_with_flag, similar_presets, diff_flags
+from .task_status import get_task_state
+from .catalog import conditional_catalog_page, catalog_cache_key
+from .caching import PAGES, cache_get, cache_set, get_or_compute, rate_limited, record as record_cache_read, render_cache_prometheus
+from .timing import RollTimer, stage_summaries, render_prometheus
+from .profiling import list_profiles, load_profile
+from .dashboard import dashboard_snapshot
+from .cleanup import render_cleanup_prometheus
+from .exports import EXPORT_FORMATS, stream_rolls
+from .media import resolve_legacy_seed, seed_url, seed_path, download_url_for, is_safe_relpath
 
 # --- Constants ---
 SORT_OPTIONS = {
     'name': 'preset_name', '-name': '-preset_name',
     'creator': 'creator_name', '-creator': '-creator_name',
     'count': 'gen_count', '-count': '-gen_count',
+    # Re-ordered by trending score after the query; see presets.trending.
+    'trending': '-gen_count',
 }
 DEFAULT_SORT = '-gen_count'
 
@@ -40,56 +63,77 @@ def get_silly_things_list():
 
 def user_is_official(user_id):
     """Helper function to check if a user can create 'Official' presets."""
-    try:
-        permissions = UserPermission.objects.get(user_id=user_id)
-        return permissions.bot_admin == 1 or permissions.race_admin == 1
-    except UserPermission.DoesNotExist:
-        return False
+    permissions = get_user_permissions(user_id)
+    return permissions is not None and any(permissions)
 
 def user_is_race_admin(user_id):
     """Helper function to check if a user can feature presets."""
-    try:
-        permissions = UserPermission.objects.get(user_id=user_id)
-        return permissions.race_admin == 1
-    except UserPermission.DoesNotExist:
-        return False
+    permissions = get_user_permissions(user_id)
+    return permissions is not None and permissions[1]
     
-def write_to_gsheets(metrics_data):
-    """Writes a row of data to the SeedBot Metrics Google Sheet."""
-    try:
-        keyfile_path = settings.BASE_DIR.parent / 'seedbot2000' / 'db' / 'seedbot-metrics-56ffc0ce1d4f.json'
-        gc = pygsheets.authorize(service_file=str(keyfile_path))
-        sh = gc.open('SeedBot Metrics')
-        wks = sh[0]
-        values_to_insert = [
-            metrics_data.get('creator_id'), metrics_data.get('creator_name'),
-            metrics_data.get('seed_type'), metrics_data.get('random_sprites', 'N/A'),
-            metrics_data.get('share_url'), metrics_data.get('timestamp'),
-            metrics_data.get('server_name', 'WebApp'), metrics_data.get('server_id', 'N/A'),
-            metrics_data.get('channel_name', 'N/A'), metrics_data.get('channel_id', 'N/A'),
-        ]
-        wks.append_table(values=values_to_insert, start='A1', end=None, dimension='ROWS', overwrite=False)
-    except Exception as e:
-        print(f'Unable to write to gsheets because of:\n{e}')
-
 # --- Main Views ---
 
-def preset_list_view(request):
-    sort_key = request.GET.get('sort', DEFAULT_SORT)
+def _parse_flag_filter(flag_filter):
+    """'-cspr' or 'cspr' matches any value; '-cspr 0.1.2' only that value."""
+    flag, _, value = flag_filter.strip().partition(' ')
+    if not flag.startswith('-'):
+        flag = '-' + flag
+    return flag, value.strip() or None
+
+def _render_catalog_grids(query, sort_key, flag_filter=''):
+    """
+    Renders the featured and regular preset grids. The markup is the same
+    for every visitor (owner and pin buttons are revealed client-side), so it
+    is cached per catalog version, search, flag filter and sort.
+    """
     order_by_field = SORT_OPTIONS.get(sort_key, DEFAULT_SORT)
-    
+
     featured_preset_pks = list(FeaturedPreset.objects.values_list('preset_name', flat=True))
     featured_presets = Preset.objects.filter(pk__in=featured_preset_pks).order_by(order_by_field)
     queryset = Preset.objects.exclude(pk__in=featured_preset_pks).exclude(preset_name='').order_by(order_by_field)
-    
-    query = request.GET.get('q')
+
     if query:
         queryset = queryset.filter(
             Q(preset_name__icontains=query) |
             Q(description__icontains=query) |
             Q(creator_name__icontains=query)
         )
-        
+    if flag_filter:
+        matching = presets_with_flag(*_parse_flag_filter(flag_filter))
+        featured_presets = featured_presets.filter(pk__in=matching)
+        queryset = queryset.filter(pk__in=matching)
+    if sort_key == 'trending':
+        featured_presets = order_by_trending(featured_presets)
+        queryset = order_by_trending(queryset)
+
+    featured_presets = list(featured_presets)
+    return {
+        'has_featured': bool(featured_presets),
+        'featured': render_to_string('presets/_catalog_grid.html', {'presets': featured_presets}),
+        'presets': render_to_string('presets/_catalog_grid.html', {'presets': queryset}),
+    }
+
+@conditional_catalog_page
+def preset_list_view(request):
+    sort_key = request.GET.get('sort', DEFAULT_SORT)
+    query = request.GET.get('q')
+    flag_filter = request.GET.get('flag', '').strip()
+    cache_parts = (query or '', sort_key if sort_key in SORT_OPTIONS else '', flag_filter)
+
+    # Anonymous visitors all see the same page, so it is cached whole.
+    anonymous = not request.user.is_authenticated
+    page_key = catalog_cache_key('page', *cache_parts)
+    if anonymous:
+        page = cache_get(PAGES, page_key)
+        record_cache_read(PAGES, 'miss' if page is None else 'hit')
+        if page is not None:
+            return HttpResponse(page)
+
+    grids = get_or_compute(
+        PAGES, catalog_cache_key('grids', *cache_parts),
+        lambda: _render_catalog_grids(query, sort_key, flag_filter), settings.CATALOG_HTML_CACHE_SECONDS,
+    )
+
     is_race_admin = False
     user_discord_id = None
     if request.user.is_authenticated:
@@ -104,36 +148,62 @@ def preset_list_view(request):
     silly_things_json = json.dumps(silly_things)
 
     context = {
-        'featured_presets': featured_presets,
-        'presets': queryset,
+        'has_featured': grids['has_featured'],
+        'featured_html': grids['featured'],
+        'presets_html': grids['presets'],
         'search_query': query if query else '',
+        'flag_filter': flag_filter,
         'user_discord_id': user_discord_id,
         'silly_things_json': silly_things_json,
         'current_sort': sort_key,
         'is_race_admin': is_race_admin, 
     }
-    return render(request, 'presets/preset_list.html', context)
-
+    response = render(request, 'presets/preset_list.html', context)
+    if anonymous:
+        cache_set(PAGES, page_key, response.content, settings.CATALOG_HTML_CACHE_SECONDS)
+    return response
+
+def _similar_presets(preset_name):
+    similar = []
+    for other, score in similar_presets(preset_name):
+        differences = diff_flags(preset_name, other)
+        similar.append({
+            'preset_name': other,
+            'similarity': round(score * 100),
+            'differences': differences['changed'] + differences['added'] + differences['removed'],
+        })
+    return similar
+
+@conditional_catalog_page
 def preset_detail_view(request, pk):
     preset = get_object_or_404(Preset, pk=pk)
     is_owner = False
+    is_race_admin = False
     if request.user.is_authenticated:
         try:
             discord_id = request.user.socialaccount_set.get(provider='discord').uid
             if preset.creator_id == int(discord_id):
                 is_owner = True
+            is_race_admin = user_is_race_admin(discord_id)
         except SocialAccount.DoesNotExist:
             pass
 
     silly_things = get_silly_things_list()
     silly_things_json = json.dumps(silly_things)
-    back_url = request.META.get('HTTP_REFERER', '/')
+    similar = []
+    if not preset.hidden:
+        similar = get_or_compute(
+            PAGES, catalog_cache_key('similar', preset.pk),
+            lambda: _similar_presets(preset.pk), settings.CATALOG_HTML_CACHE_SECONDS,
+        )
 
     context = {
         'preset': preset,
+        'similar_presets': similar,
         'is_owner': is_owner,
+        'is_race_admin': is_race_admin,
+        'bulk_roll_max': settings.BULK_ROLL_MAX_SEEDS,
         'silly_things_json': silly_things_json,
-        'back_url': back_url,
     }
     return render(request, 'presets/preset_detail.html', context)
 
@@ -157,6 +227,8 @@ def my_presets_view(request):
     all_rolls_list = list(all_user_rolls)
     sorted_rolls = sorted(all_rolls_list, key=parse_timestamp, reverse=True)
     recent_rolls = sorted_rolls[:10]
+    for roll in recent_rolls:
+        roll.download_url = download_url_for(roll.share_url)
 
     sort_key = request.GET.get('sort', 'name')
     order_by_field = SORT_OPTIONS.get(sort_key, 'preset_name')
@@ -238,12 +310,23 @@ def preset_delete_view(request, pk):
     return render(request, 'presets/preset_confirm_delete.html', context)
 
 # --- API / AJAX Views ---
-
-def roll_seed_dispatcher_view(request, pk):
+@never_cache
+@ensure_csrf_cookie
+def csrf_token_view(request):
+    """Hands anonymous visitors a CSRF token, which cacheable pages don't embed."""
+    return JsonResponse({'token': get_token(request)})
+
+
+async def roll_seed_dispatcher_view(request, pk):
+    """
+    Async so that rolls waiting on the WorldsCollide API don't each hold a
+    worker thread; blocking helpers (ORM writes, broker publishes) are
+    handed to sync_to_async.
+    """
     if request.method != 'POST':
         return JsonResponse({'error': 'Invalid request method'}, status=405)
 
-    preset = get_object_or_404(Preset, pk=pk)
+    preset = await aget_object_or_404(Preset, pk=pk)
     args_list = [arg.strip() for arg in preset.arguments.split()] if preset.arguments else []
     
     local_roll_args = {
@@ -251,68 +334,195 @@ def roll_seed_dispatcher_view(request, pk):
         'mapx', 'lg1', 'lg2', 'ws', 'csi', 'tunes', 'ctunes'
     }
     
-    if request.user.is_authenticated:
-        social_account = request.user.socialaccount_set.get(provider='discord')
+    user = await request.auser()
+    if user.is_authenticated:
+        social_account = await user.socialaccount_set.aget(provider='discord')
         discord_id = int(social_account.uid)
-        user_name = social_account.extra_data.get('username', request.user.username)
+        user_name = social_account.extra_data.get('username', user.username)
     else:
-        discord_id = 000000000000000000 
+        discord_id = 000000000000000000
         user_name = "Anonymous"
 
-    if any(arg in local_roll_args for arg in args_list):
-        task = create_local_seed_task.delay(pk, discord_id, user_name)
+    # Anonymous rolls are limited per client address (see TRUSTED_PROXIES), not per proxy.
+    requester = discord_id or client_ip(request)
+    if await sync_to_async(rate_limited)('roll', requester, settings.ROLL_RATE_LIMIT, 60):
+        return JsonResponse({'error': 'You are rolling too fast. Please wait a minute and try again.'}, status=429)
+
+    if settings.SEED_POOL_ENABLED:
+        pooled = await sync_to_async(claim_pooled_seed)(preset)
+        if pooled:
+            share_url = seed_url(pooled.relpath)
+            await sync_to_async(record_roll)(preset, share_url, discord_id, user_name, RollTimer(None, preset.preset_name))
+            return JsonResponse({'method': 'pool', 'seed_url': download_url_for(share_url)})
+
+    api_client = get_client()
+    # Standard presets also go to the local pipeline while the API is degraded.
+    if any(arg in local_roll_args for arg in args_list) or await sync_to_async(api_client.should_use_local)():
+        task = await sync_to_async(create_local_seed_task.delay)(pk, discord_id, user_name)
         return JsonResponse({'method': 'local', 'task_id': task.id})
     else:
         final_flags = flag_processor.apply_args(preset.flags, preset.arguments)
-        api_url = "https://api.ff6worldscollide.com/api/seed"
-        payload = {"key": settings.WC_API_KEY, "flags": final_flags}
-        headers = {"Content-Type": "application/json"}
         try:
-            response = requests.post(api_url, data=json.dumps(payload), headers=headers, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            seed_url = data.get('url')
-            
-            preset.gen_count += 1
-            preset.save(update_fields=['gen_count'])
-
-            timestamp = datetime.now().strftime('%b %d %Y %H:%M:%S')
-
-            SeedLog.objects.create(
-                creator_id=discord_id, creator_name=user_name,
-                seed_type=preset.preset_name, share_url=seed_url,
-                timestamp=timestamp, server_name='WebApp'
-            )
-            
-            metrics_data = {
-                'creator_id': discord_id, 'creator_name': user_name,
-                'seed_type': preset.preset_name, 'share_url': seed_url,
-                'timestamp': timestamp,
-            }
-            write_to_gsheets(metrics_data)
-            
-            return JsonResponse({'method': 'api', 'seed_url': seed_url})
-        except requests.exceptions.RequestException as e:
+            data = await api_client.agenerate_seed(final_flags)
+            share_url = data.get('url')
+            await sync_to_async(record_roll)(preset, share_url, discord_id, user_name, RollTimer(None, preset.preset_name))
+            return JsonResponse({'method': 'api', 'seed_url': share_url})
+        except WCApiError as e:
+            if e.upstream_failure:
+                # The API is down, not the flags: generate this one locally instead.
+                task = await sync_to_async(create_local_seed_task.delay)(pk, discord_id, user_name)
+                return JsonResponse({'method': 'local', 'task_id': task.id})
             error_message = "The FF6WC API returned an error. Please check your flags."
             return JsonResponse({'error': error_message}, status=400)
 
-def get_local_seed_roll_status_view(request, task_id):
-    task_result = AsyncResult(task_id)
+@discord_login_required
+def bulk_roll_view(request, pk):
+    """Starts a batch of seeds for one preset, generated in parallel across the workers."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=405)
+
+    social_account = request.user.socialaccount_set.get(provider='discord')
+    discord_id = int(social_account.uid)
+    if not user_is_race_admin(discord_id):
+        raise PermissionDenied("Only race admins can bulk roll seeds.")
+
+    preset = get_object_or_404(Preset, pk=pk)
+    try:
+        count = int(request.POST.get('count', ''))
+    except ValueError:
+        count = 0
+    if not 1 <= count <= settings.BULK_ROLL_MAX_SEEDS:
+        return JsonResponse({'error': f'Choose between 1 and {settings.BULK_ROLL_MAX_SEEDS} seeds.'}, status=400)
+
+    batch = BulkRollBatch.objects.create(
+        preset_name=preset.preset_name, creator_id=discord_id,
+        creator_name=social_account.extra_data.get('username', request.user.username),
+        requested=count,
+    )
+    final_flags = flag_processor.apply_args(preset.flags, preset.arguments)
+    seeds = [generate_bulk_seed_task.s(batch.pk, preset.pk, final_flags) for _ in range(count)]
+    chord(seeds)(finalize_bulk_roll_task.s(batch.pk).on_error(fail_bulk_roll_task.si(batch.pk)))
+    return JsonResponse({'batch_id': batch.pk, 'status_url': reverse('bulk-roll-status', args=[batch.pk])})
+
+@discord_login_required
+def bulk_roll_status_view(request, batch_id):
+    discord_id = int(request.user.socialaccount_set.get(provider='discord').uid)
+    batch = get_object_or_404(BulkRollBatch, pk=batch_id, creator_id=discord_id)
+    response_data = {
+        'batch_id': batch.pk,
+        'status': batch.status,
+        'requested': batch.requested,
+        'completed': batch.completed,
+        'failed': batch.failed,
+        'archive_url': None,
+        'manifest': batch.manifest,
+    }
+    if batch.archive_relpath:
+        response_data['archive_url'] = reverse('seed-download', args=[batch.archive_relpath])
+    return JsonResponse(response_data)
+
+async def get_local_seed_roll_status_view(request, task_id):
+    state, info = await get_task_state(task_id)
     response_data = {
         'task_id': task_id,
-        'status': task_result.status,
+        'status': state,
         'result': None
     }
 
-    if task_result.state == 'SUCCESS':
-        response_data['result'] = task_result.result
-    elif task_result.state == 'FAILURE':
-        response_data['result'] = str(task_result.info)
-    elif task_result.state == 'PROGRESS':
-        response_data['result'] = task_result.info.get('status', 'Processing...')
+    if state == 'SUCCESS':
+        response_data['result'] = download_url_for(info)
+    elif state == 'FAILURE':
+        response_data['result'] = str(info)
+    elif state == 'PROGRESS':
+        response_data['result'] = info.get('status', 'Processing...')
     
     return JsonResponse(response_data)
 
+def legacy_seed_view(request, filename):
+    """
+    Resolves pre-sharding seed links (/media/<name>.zip) still stored in
+    SeedLog.share_url by sending them through the tracked download view.
+    """
+    relpath = resolve_legacy_seed(filename)
+    if relpath is None:
+        raise Http404("Seed not found.")
+    return redirect('seed-download', relpath=relpath)
+
+def _get_seed_artifact(relpath):
+    """
+    Looks up the SeedArtifact for a stored seed. Seeds rolled before artifacts
+    were tracked get one on first download, built from their roll log entry.
+    """
+    artifact = SeedArtifact.objects.filter(relpath=relpath).first()
+    if artifact:
+        return artifact
+    filename = relpath.rsplit('/', 1)[-1]
+    roll = SeedLog.objects.filter(
+        Q(share_url=seed_url(relpath)) | Q(share_url=seed_url(filename))
+    ).first()
+    if roll is None:
+        return None
+    artifact, created = SeedArtifact.objects.get_or_create(
+        relpath=relpath, defaults={'preset_name': roll.seed_type, 'creator_id': roll.creator_id},
+    )
+    rolled_at = _legacy_rolled_at(relpath, roll) if created else None
+    if rolled_at:
+        # created_at is auto_now_add, so the real roll time is set afterwards; expiry counts from it.
+        SeedArtifact.objects.filter(pk=artifact.pk).update(created_at=rolled_at)
+        artifact.created_at = rolled_at
+    return artifact
+
+def _legacy_rolled_at(relpath, roll):
+    """When an untracked seed was rolled: its file's mtime, else its roll log timestamp."""
+    try:
+        return timezone.make_aware(datetime.fromtimestamp(seed_path(relpath).stat().st_mtime))
+    except OSError:
+        pass
+    try:
+        return timezone.make_aware(datetime.strptime(roll.timestamp, '%b %d %Y %H:%M:%S'))
+    except (TypeError, ValueError):
+        return None
+
+def seed_download_view(request, relpath):
+    if not is_safe_relpath(relpath):
+        raise Http404("Seed not found.")
+    artifact = _get_seed_artifact(relpath)
+    if artifact is None:
+        raise Http404("Seed not found.")
+
+    # Seeds rolled anonymously or in a bulk roll are shared by link; everything else is owner-only.
+    if artifact.creator_id and not artifact.shared:
+        try:
+            discord_id = int(request.user.socialaccount_set.get(provider='discord').uid)
+        except (AttributeError, SocialAccount.DoesNotExist):
+            discord_id = None
+        if discord_id != artifact.creator_id:
+            raise PermissionDenied("This seed belongs to another user.")
+
+    path = seed_path(relpath)
+    expires_at = artifact.created_at + timedelta(days=settings.SEED_RETENTION_DAYS)
+    if timezone.now() > expires_at or not path.is_file():
+        return HttpResponse("This seed has expired.", status=410)
+
+    SeedArtifact.objects.filter(pk=artifact.pk).update(
+        download_count=F('download_count') + 1, last_downloaded_at=timezone.now(),
+    )
+
+    filename = path.name
+    backend = settings.SEED_DOWNLOAD_BACKEND
+    if backend == 'python':
+        # FileResponse hands the file to wsgi.file_wrapper, which Gunicorn serves with os.sendfile.
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type='application/zip')
+
+    response = HttpResponse(content_type='application/zip')
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    if backend == 'x-accel':
+        # nginx takes a URI here and decodes it before matching the internal location.
+        response['X-Accel-Redirect'] = f'{settings.SEED_ACCEL_PREFIX}{quote(relpath)}'
+    else:
+        response['X-Sendfile'] = str(path)
+    return response
+
 @discord_login_required
 def toggle_feature_view(request, pk):
     if request.method != 'POST':
@@ -329,4 +539,83 @@ def toggle_feature_view(request, pk):
         return JsonResponse({'status': 'success', 'featured': True})
     else:
         featured_obj.delete()
-        return JsonResponse({'status': 'success', 'featured': False})
\ No newline at end of file
+        return JsonResponse({'status': 'success', 'featured': False})
+
+@discord_login_required
+def my_rolls_export_view(request):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponse("Unknown export format.", status=400)
+    discord_account = request.user.socialaccount_set.get(provider='discord')
+    return stream_rolls(request, 'my-rolls', export_format, creator_id=int(discord_account.uid))
+
+# --- Operator Views ---
+
+@bot_admin_required
+def ops_dashboard_view(request):
+    context = {'refresh_seconds': settings.OPS_DASHBOARD_REFRESH_SECONDS}
+    return render(request, 'presets/ops_dashboard.html', context)
+
+@bot_admin_required
+def ops_dashboard_data_view(request):
+    """Queue, worker, task and failure stats for the dashboard, in one response."""
+    return JsonResponse(dashboard_snapshot())
+
+@bot_admin_required
+def roll_export_view(request):
+    """Every logged roll from `start` up to (not including) `end`, both YYYY-MM-DD."""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponse("Unknown export format.", status=400)
+    try:
+        start = datetime.strptime(request.GET['start'], '%Y-%m-%d')
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d')
+    except (KeyError, ValueError):
+        return HttpResponse("start and end must be dates (YYYY-MM-DD).", status=400)
+    filename = f"rolls-{start:%Y-%m-%d}-to-{end:%Y-%m-%d}"
+    return stream_rolls(request, filename, export_format, start=start, end=end)
+
+@bot_admin_required
+def roll_timings_view(request):
+    try:
+        hours = max(1, min(int(request.GET.get('hours', 24)), 24 * 30))
+    except ValueError:
+        hours = 24
+    preset_name = request.GET.get('preset', '')
+    script_dir = request.GET.get('script_dir', '')
+
+    context = {
+        'summaries': stage_summaries(hours=hours, preset_name=preset_name, script_dir=script_dir),
+        'hours': hours,
+        'preset_filter': preset_name,
+        'script_dir_filter': script_dir,
+    }
+    return render(request, 'presets/ops_roll_timings.html', context)
+
+def _metrics_authorized(request):
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').encode('utf-8')
+        return hmac.compare_digest(supplied, f'Bearer {settings.METRICS_TOKEN}'.encode('utf-8'))
+    return client_ip(request) in settings.METRICS_ALLOWED_IPS
+
+def metrics_view(request):
+    """Prometheus scrape endpoint. Needs METRICS_TOKEN, or an allow-listed client address without one."""
+    if not _metrics_authorized(request):
+        raise PermissionDenied
+    body = render_prometheus(stage_summaries(hours=settings.METRICS_WINDOW_HOURS))
+    body += render_cleanup_prometheus()
+    body += render_api_prometheus()
+    body += render_cache_prometheus()
+    return HttpResponse(body, content_type='text/plain; version=0.0.4')
+
+@bot_admin_required
+def profile_list_view(request):
+    context = {'profiles': list_profiles()}
+    return render(request, 'presets/ops_profile_list.html', context)
+
+@bot_admin_required
+def profile_detail_view(request, profile_id):
+    profile = load_profile(profile_id)
+    if profile is None:
+        raise Http404("Profile not found.")
+    return render(request, 'presets/ops_profile_detail.html', {'profile': profile})
@@ -0,0 +1,250 @@
+# presets/wc_api.py
+import asyncio
+import json
+import os
+import threading
+import time
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from django.core.cache import cache
+
+from .loop_clients import LoopClients
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class WCApiError(Exception):
+    """The WorldsCollide API rejected a request or could not be reached."""
+    def __init__(self, msg, response=None):
+        self.msg = msg
+        self.response = response
+        super().__init__(self.msg)
+
+    @property
+    def status_code(self):
+        return self.response.status_code if self.response is not None else None
+
+    @property
+    def upstream_failure(self):
+        """True when the API itself is at fault (unreachable, 5xx, 429) rather than the flags."""
+        return self.response is None or self.response.status_code in RETRY_STATUSES
+
+class CircuitOpenError(WCApiError):
+    """Raised without contacting the API while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `threshold` consecutive upstream failures. After
+    `reset_after` seconds a single trial request is let through; success
+    closes the circuit again, failure re-opens it.
+    """
+    def __init__(self, threshold, reset_after):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.reset_after
+
+    def allow_request(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                # Half-open: let this request through as the trial.
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class ApiHealth:
+    """
+    Exponentially weighted latency and error rate of recent API calls, kept
+    in the cache so every worker sharing it routes on the same picture.
+    """
+    CACHE_KEY = 'wc_api:health'
+    PROBE_KEY = 'wc_api:probe'
+    ALPHA = 0.2
+    MIN_SAMPLES = 5
+
+    def snapshot(self):
+        return cache.get(self.CACHE_KEY) or {'latency': 0.0, 'error_rate': 0.0, 'samples': 0}
+
+    def record(self, latency, failed):
+        stats = self.snapshot()
+        if stats['samples'] == 0:
+            stats['latency'], stats['error_rate'] = latency, float(failed)
+        else:
+            stats['latency'] += self.ALPHA * (latency - stats['latency'])
+            stats['error_rate'] += self.ALPHA * (float(failed) - stats['error_rate'])
+        stats['samples'] += 1
+        cache.set(self.CACHE_KEY, stats, settings.WC_API_HEALTH_WINDOW_SECONDS)
+
+    def is_degraded(self):
+        stats = self.snapshot()
+        if stats['samples'] < self.MIN_SAMPLES:
+            return False
+        return (stats['error_rate'] > settings.WC_API_DEGRADED_ERROR_RATE
+                or stats['latency'] > settings.WC_API_DEGRADED_LATENCY_SECONDS)
+
+    def claim_probe(self):
+        """Lets one request per probe interval through to a degraded API so recovery is noticed."""
+        return cache.add(self.PROBE_KEY, True, settings.WC_API_PROBE_INTERVAL_SECONDS)
+
+
+class WCApiClient:
+    """
+    Per-process client for the WorldsCollide seed API. Reuses pooled
+    keep-alive connections, retries connection errors and 429/5xx with
+    backoff and trips a circuit breaker when the API keeps failing.
+    """
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        # A POST that timed out reading the response may already be generating
+        # a seed; sending it again would only multiply the wait, so read
+        # errors are never retried (like the async path).
+        retry = Retry(
+            total=settings.WC_API_RETRIES, read=0, backoff_factor=0.5,
+            status_forcelist=RETRY_STATUSES, allowed_methods=frozenset(['POST']),
+            respect_retry_after_header=True, raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.WC_API_POOL_SIZE, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.breaker = CircuitBreaker(settings.WC_API_BREAKER_THRESHOLD, settings.WC_API_BREAKER_RESET_SECONDS)
+        self.health = ApiHealth()
+        self._async_clients = LoopClients(self._new_async_client)
+
+    def should_use_local(self):
+        """True when standard presets should be rolled locally instead of through the API."""
+        if self.breaker.is_open:
+            return True
+        return self.health.is_degraded() and not self.health.claim_probe()
+
+    def generate_seed(self, flags):
+        """Asks the API to generate a seed and returns its JSON payload (which includes 'url')."""
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("The FF6WC API is temporarily unavailable.")
+
+        payload = {"key": settings.WC_API_KEY, "flags": flags}
+        started = time.monotonic()
+        try:
+            response = self.session.post(
+                settings.WC_API_URL, data=json.dumps(payload),
+                timeout=(settings.WC_API_CONNECT_TIMEOUT, settings.WC_API_READ_TIMEOUT),
+            )
+        except requests.exceptions.RequestException as e:
+            self._record_unreachable(started)
+            raise WCApiError(f"Could not reach the FF6WC API: {e}") from e
+        return self._handle_response(response, started)
+
+    async def agenerate_seed(self, flags):
+        """
+        Async counterpart of generate_seed for async views: waits on the API
+        without holding a thread. Shares the breaker and health tracking,
+        whose cache calls are blocking and so run off the event loop.
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("The FF6WC API is temporarily unavailable.")
+
+        payload = {"key": settings.WC_API_KEY, "flags": flags}
+        client = await self._async_clients.get()
+        started = time.monotonic()
+        try:
+            for attempt in range(settings.WC_API_RETRIES + 1):
+                response = await client.post(settings.WC_API_URL, content=json.dumps(payload))
+                if response.status_code not in RETRY_STATUSES or attempt == settings.WC_API_RETRIES:
+                    break
+                await asyncio.sleep(_retry_delay(response, attempt))
+        except httpx.HTTPError as e:
+            await sync_to_async(self._record_unreachable)(started)
+            raise WCApiError(f"Could not reach the FF6WC API: {e}") from e
+        return await sync_to_async(self._handle_response)(response, started)
+
+    def _new_async_client(self):
+        """httpx clients are bound to an event loop, so each loop gets its own pool (see LoopClients)."""
+        return httpx.AsyncClient(
+            headers={"Content-Type": "application/json"},
+            timeout=httpx.Timeout(settings.WC_API_READ_TIMEOUT, connect=settings.WC_API_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=settings.WC_API_POOL_SIZE),
+            transport=httpx.AsyncHTTPTransport(retries=settings.WC_API_RETRIES),
+        )
+
+    def _record_unreachable(self, started):
+        self.breaker.record_failure()
+        self.health.record(time.monotonic() - started, failed=True)
+
+    def _handle_response(self, response, started):
+        """Shared by the sync (requests) and async (httpx) paths; both responses expose the same API."""
+        if response.status_code in RETRY_STATUSES:
+            self._record_unreachable(started)
+            raise WCApiError(f"The FF6WC API returned HTTP {response.status_code}.", response)
+        # Anything else means the API is up, even if it rejected these flags.
+        self.breaker.record_success()
+        self.health.record(time.monotonic() - started, failed=False)
+        if not 200 <= response.status_code < 400:
+            raise WCApiError(f"The FF6WC API rejected the request (HTTP {response.status_code}).", response)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise WCApiError("The FF6WC API returned an unreadable response.", response) from e
+
+
+def _retry_delay(response, attempt):
+    """Honours Retry-After when the API sends one, otherwise backs off like the sync client."""
+    retry_after = response.headers.get('Retry-After', '')
+    if retry_after.isdigit():
+        return min(int(retry_after), settings.WC_API_READ_TIMEOUT)
+    return 0.5 * (2 ** attempt)
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Returns this process's shared client, building a fresh one after a fork."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = WCApiClient()
+            _client_pid = os.getpid()
+        return _client
+
+def render_api_prometheus():
+    """API health gauges in the Prometheus text exposition format."""
+    client = get_client()
+    stats = client.health.snapshot()
+    degraded = client.breaker.is_open or client.health.is_degraded()
+    return '\n'.join([
+        '# HELP seedbot_wc_api_latency_seconds Smoothed WorldsCollide API latency.',
+        '# TYPE seedbot_wc_api_latency_seconds gauge',
+        f"seedbot_wc_api_latency_seconds {stats['latency']:.6f}",
+        '# HELP seedbot_wc_api_error_rate Smoothed share of failed WorldsCollide API calls.',
+        '# TYPE seedbot_wc_api_error_rate gauge',
+        f"seedbot_wc_api_error_rate {stats['error_rate']:.4f}",
+        '# HELP seedbot_wc_api_degraded Whether standard rolls are being routed to local generation.',
+        '# TYPE seedbot_wc_api_degraded gauge',
+        f"seedbot_wc_api_degraded {int(degraded)}",
+    ]) + '\n'
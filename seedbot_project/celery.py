@@ -3,6 +3,10 @@ from celery import Celery
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'seedbot_project.settings')
+# Celery's Django fixup runs the system checks when a worker starts, and the
+# URL checks import every view (requests, httpx, allauth). Workers never
+# serve pages, so they skip them; `manage.py check` still runs them on deploy.
+os.environ.setdefault('CELERY_SKIP_CHECKS', 'true')
 
 app = Celery('seedbot_project')
 
@@ -1,6 +1,8 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
+from celery.schedules import crontab
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -11,6 +13,7 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 WC_API_KEY = os.getenv('new_api_key')
 BOT_TOKEN = os.getenv('DISCORD_TOKEN')
 ENV_TYPE = os.getenv('ENVIRONMENT', 'dev')
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
 # --- Environment-Specific Settings ---
 if ENV_TYPE == "prod":
@@ -20,29 +23,59 @@ if ENV_TYPE == "prod":
     CSRF_COOKIE_SECURE = True
     SESSION_COOKIE_SECURE = True
     SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
-    CELERY_BROKER_URL = 'redis://localhost:6379/0'
-    CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+    CELERY_BROKER_URL = REDIS_URL
+    CELERY_RESULT_BACKEND = REDIS_URL
     MEDIA_ROOT = '/var/www/seedbot_media/seeds/' # Production media path
 else:
     DEBUG = True
     ALLOWED_HOSTS = []
-    CELERY_BROKER_URL = 'redis://localhost:6379/0'
-    CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+    CELERY_BROKER_URL = REDIS_URL
+    CELERY_RESULT_BACKEND = REDIS_URL
     # Development media path
     MEDIA_ROOT = BASE_DIR.parent / 'seedbot2000' / 'WorldsCollide' / 'seeds'
 
+# --- Client Addresses ---
+# Reverse proxies in front of the app (Apache in production). Each one
+# appends the address it saw to X-Forwarded-For, so the client is that many
+# entries from the end; anything earlier was sent by the client itself.
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', '1' if ENV_TYPE == 'prod' else '0'))
+
 
 # --- Celery Configuration Options ---
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+CELERY_BEAT_SCHEDULE = {
+    'cleanup-seeds': {
+        'task': 'presets.tasks.cleanup_seeds_task',
+        'schedule': crontab(minute=15),
+    },
+    'flush-roll-log': {
+        'task': 'presets.tasks.flush_roll_log_task',
+        'schedule': 5.0,
+    },
+    'update-trending-scores': {
+        'task': 'presets.tasks.update_trending_scores_task',
+        'schedule': 300.0,
+    },
+    'refill-seed-pool': {
+        'task': 'presets.tasks.refill_seed_pool_task',
+        'schedule': 120.0,
+    },
+    'sync-flag-index': {
+        'task': 'presets.tasks.sync_flag_index_task',
+        'schedule': 600.0,
+    },
+}
 
 
 # --- Application Definition ---
 INSTALLED_APPS = [
     'django.contrib.admin', 'django.contrib.auth', 'django.contrib.contenttypes',
-    'django.contrib.sessions', 'django.contrib.messages', 'django.contrib.staticfiles',
+    'django.contrib.sessions', 'django.contrib.messages',
+    # Lets runserver serve static files through WhiteNoise, as production does.
+    'whitenoise.runserver_nostatic', 'django.contrib.staticfiles',
     'django.contrib.sites', 'django.contrib.redirects',
     'presets',
     'allauth', 'allauth.account', 'allauth.socialaccount',
@@ -51,6 +84,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'presets.middleware.AsyncWhiteNoiseMiddleware',
+    'presets.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -65,7 +100,8 @@ ROOT_URLCONF = 'seedbot_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Stock DjangoTemplates plus render timing for profiled requests.
+        'BACKEND': 'presets.profiling.ProfilingDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -80,6 +116,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'seedbot_project.wsgi.application'
+ASGI_APPLICATION = 'seedbot_project.asgi.application'
 
 # --- Database Configuration ---
 DATABASES = {
@@ -91,6 +128,36 @@ DATABASES = {
 }
 DATABASE_ROUTERS = ['seedbot_project.db_router.SeedBotRouter']
 
+# --- Caching ---
+# Shared by every Gunicorn and Celery worker. Celery uses Redis database 0, the
+# cache defaults to database 1, and each alias gets its own key prefix.
+# CACHE_BACKEND=locmem keeps everything in process memory (tests, no Redis).
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis')
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/1')
+CACHE_ALIASES = ['default', 'pages', 'permissions', 'validation', 'ratelimit']
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+        for alias in CACHE_ALIASES
+    }
+else:
+    CACHES = {
+        alias: {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': f'seedbot:{alias}',
+            'OPTIONS': {'socket_connect_timeout': 1, 'socket_timeout': 2},
+        }
+        for alias in CACHE_ALIASES
+    }
+# Expired entries are still served for this long while one worker recomputes them.
+CACHE_STALE_SECONDS = 60
+CACHE_LOCK_SECONDS = 30
+CACHE_LOCK_WAIT_SECONDS = 2
+PERMISSION_CACHE_SECONDS = 300
+FLAG_VALIDATION_CACHE_SECONDS = 24 * 3600
+ROLL_RATE_LIMIT = int(os.getenv('ROLL_RATE_LIMIT', '30'))  # rolls per minute, per user or anonymous client address
+
 # --- Password validation, Internationalization, etc. ---
 AUTH_PASSWORD_VALIDATORS=[{'NAME':'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},{'NAME':'django.contrib.auth.password_validation.MinimumLengthValidator'},{'NAME':'django.contrib.auth.password_validation.CommonPasswordValidator'},{'NAME':'django.contrib.auth.password_validation.NumericPasswordValidator'}]
 LANGUAGE_CODE = 'en-us'
@@ -98,14 +165,147 @@ TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 
+# --- WorldsCollide API ---
+WC_API_URL = os.getenv('WC_API_URL', 'https://api.ff6worldscollide.com/api/seed')
+WC_API_CONNECT_TIMEOUT = 3.05
+WC_API_READ_TIMEOUT = 30
+# Retries of connection errors and 429/5xx responses; a read timeout is not retried.
+WC_API_RETRIES = 2
+WC_API_POOL_SIZE = 10
+# Consecutive upstream failures before failing fast, and how long to wait before retrying.
+WC_API_BREAKER_THRESHOLD = 5
+WC_API_BREAKER_RESET_SECONDS = 30
+# Standard presets are rolled locally while the API looks unhealthy.
+WC_API_DEGRADED_LATENCY_SECONDS = 10
+WC_API_DEGRADED_ERROR_RATE = 0.5
+WC_API_HEALTH_WINDOW_SECONDS = 15 * 60
+WC_API_PROBE_INTERVAL_SECONDS = 30
+
+# --- Metrics ---
+# When set, /metrics/ (Prometheus text format) requires
+# `Authorization: Bearer <METRICS_TOKEN>`. Otherwise only client addresses
+# in METRICS_ALLOWED_IPS may scrape it.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+METRICS_WINDOW_HOURS = 24
+
+# --- Roll Failures ---
+# Failed rolls are grouped by error; the least recently seen groups are
+# dropped beyond this many, and each keeps only the tail of its stderr.
+ROLL_FAILURE_MAX_GROUPS = 500
+ROLL_FAILURE_STDERR_CHARS = 4000
+
+# --- Ops Dashboard ---
+# Worker broadcasts wait this long for replies; snapshots are shared for OPS_DASHBOARD_CACHE_SECONDS.
+OPS_INSPECT_TIMEOUT = 1.0
+OPS_DASHBOARD_CACHE_SECONDS = 5
+OPS_DASHBOARD_REFRESH_SECONDS = 10
+OPS_DASHBOARD_WINDOW_MINUTES = 60
+OPS_DASHBOARD_FAILURES = 10
+
+# --- Request Profiling (opt-in) ---
+# Send `X-Seedbot-Profile: <PROFILING_TOKEN>` to profile a single request,
+# or set PROFILING_SAMPLE_RATE (0.0-1.0) to profile a random share of traffic.
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_DIR = BASE_DIR / 'var' / 'profiles'
+PROFILING_MAX_RECORDS = 200
+
 # --- Static and Media Files ---
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# collectstatic writes content-hashed copies plus .gz/.br sidecars; WhiteNoise serves
+# the hashed names with far-future, immutable Cache-Control headers.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
 
 MEDIA_URL = '/media/'
 # MEDIA_ROOT is defined in the environment-specific section above
 
+# --- Generator Sandbox ---
+# Limits applied to every wc.py / JohnnyDMad run so one pathological flag set
+# can't starve the host. Zero or empty disables a limit.
+GENERATOR_MEMORY_LIMIT = os.getenv('GENERATOR_MEMORY_LIMIT', '2G')  # address space
+GENERATOR_CPU_SECONDS = int(os.getenv('GENERATOR_CPU_SECONDS', '120'))
+GENERATOR_OPEN_FILES = 256
+GENERATOR_NICE = int(os.getenv('GENERATOR_NICE', '10'))
+# Optional cgroup directory (e.g. /sys/fs/cgroup/seedbot-generators). Each run
+# gets a child cgroup under it, so its limits cap all runs together.
+GENERATOR_CGROUP = os.getenv('GENERATOR_CGROUP', '')
+
+# --- Scratch Space ---
+# Generator output is staged here before the finished zip moves to MEDIA_ROOT.
+# tmpfs keeps the intermediate ROMs and logs off the disk; below
+# SEED_SCRATCH_MIN_FREE free bytes, runs fall back to the regular temp dir.
+SEED_SCRATCH_DIR = os.getenv('SEED_SCRATCH_DIR') or (
+    '/dev/shm/seedbot' if os.path.isdir('/dev/shm') else os.path.join(tempfile.gettempdir(), 'seedbot-scratch')
+)
+SEED_SCRATCH_MIN_FREE = os.getenv('SEED_SCRATCH_MIN_FREE', '256M')
+
+# --- Seed Retention ---
+SEED_RETENTION_DAYS = 30
+# Optional cap on the total size of MEDIA_ROOT in bytes; oldest seeds are evicted first.
+SEED_MEDIA_MAX_BYTES = os.getenv('SEED_MEDIA_MAX_BYTES')
+SEED_CLEANUP_WORKERS = 8
+
+# --- Seed Downloads ---
+# How /download/ hands the file off once access is checked:
+#   'python'     - FileResponse from the app worker (local development)
+#   'x-sendfile' - X-Sendfile header for Apache mod_xsendfile
+#   'x-accel'    - X-Accel-Redirect header for nginx, under SEED_ACCEL_PREFIX
+SEED_DOWNLOAD_BACKEND = os.getenv('SEED_DOWNLOAD_BACKEND', 'python')
+SEED_ACCEL_PREFIX = '/protected-seeds/'
+
+# --- Seed Pool ---
+# Keeps pre-generated seeds for the most rolled presets so they are served instantly.
+SEED_POOL_ENABLED = os.getenv('SEED_POOL_ENABLED', 'False') == 'True'
+SEED_POOL_TOP_N = 10
+# Each pooled preset keeps between MIN and MAX seeds, sized to the demand forecast
+# for the next SEED_POOL_HORIZON_MINUTES based on the last SEED_POOL_DEMAND_HOURS of rolls.
+SEED_POOL_MIN_SIZE = 1
+SEED_POOL_MAX_SIZE = 5
+SEED_POOL_HORIZON_MINUTES = 30
+SEED_POOL_DEMAND_HOURS = 24
+SEED_POOL_MAX_AGE_HOURS = 24
+# Refills only run while the Celery queue is at most this deep.
+SEED_POOL_IDLE_QUEUE_DEPTH = 0
+
+# --- Roll Log ---
+# Rolls are staged in Redis and written to the shared SeedBot database in
+# batches by flush_roll_log_task, instead of one write transaction per roll.
+ROLL_LOG_BUFFERED = os.getenv('ROLL_LOG_BUFFERED', 'True') == 'True'
+ROLL_LOG_BATCH_SIZE = 500
+
+# --- Roll Exports ---
+# Rows fetched per query while streaming a roll history export.
+EXPORT_CHUNK_SIZE = 2000
+
+# --- Catalog Pages ---
+# How long browsers and a reverse proxy may reuse the list/detail pages for
+# anonymous visitors before revalidating them.
+CATALOG_CACHE_MAX_AGE = 60
+# Rendered list pages are cached per catalog version; this bounds how long
+# entries for old versions linger, and how long roll counts may lag on them.
+CATALOG_HTML_CACHE_SECONDS = 600
+
+# --- Trending Sort ---
+# A roll counts half as much towards a preset's trending score after each half-life.
+TRENDING_HALF_LIFE_HOURS = 72
+TRENDING_LOOKBACK_DAYS = 30
+
+# --- Flag Index ---
+# Presets sharing at least this fraction of their flags (Jaccard) are listed as similar.
+SIMILAR_PRESETS_MIN_SCORE = 0.5
+SIMILAR_PRESETS_SHOWN = 5
+# Saving a preset this close to an existing one asks the creator to confirm.
+DUPLICATE_PRESET_MIN_SCORE = 0.9
+
+# --- Bulk Rolls ---
+BULK_ROLL_MAX_SEEDS = 50
+
 
 # --- Django-Allauth & Sites Framework ---
 AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend', 'allauth.account.auth_backends.AuthenticationBackend']
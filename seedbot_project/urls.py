@@ -3,10 +3,13 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from presets.views import legacy_seed_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('allauth.urls')),
+    # Flat seed URLs from before the sharded media layout; sharded paths never match.
+    path(f"{settings.MEDIA_URL.strip('/')}/<str:filename>", legacy_seed_view, name='legacy-seed'),
     path('', include('presets.urls')), # Changed from 'presets.views.preset_list_view'
 ]
 